@@ -0,0 +1,655 @@
+"""Benchmarks for the fleet management system (teste.py)
+
+Usage:
+    python fleet_benchmarks.py <benchmark> [sizes...]
+
+Examples:
+    python fleet_benchmarks.py memory 1000000 10000000
+    python fleet_benchmarks.py import 100000
+    python fleet_benchmarks.py query 1000000
+    python fleet_benchmarks.py search 1000000
+    python fleet_benchmarks.py groupby 1000000
+    python fleet_benchmarks.py backends 100000
+    python fleet_benchmarks.py journal 100000
+    python fleet_benchmarks.py replay 1000000
+    python fleet_benchmarks.py threads 400000
+    python fleet_benchmarks.py stress 100000
+    python fleet_benchmarks.py parallel 1000000
+    python fleet_benchmarks.py topk 1000000
+    python fleet_benchmarks.py export 200000
+"""
+import datetime
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from teste import (Vehicle, ElectricCar, Truck, Fleet, ColumnarFleet, SQLiteFleet, FleetJournal,
+                   ConcurrentFleet, Scenario, SharedFleetColumns)
+
+
+BRANDS = {
+    "Toyota": ["Corolla", "Yaris", "RAV4"],
+    "Ford": ["Focus", "Fiesta", "Transit"],
+    "Tesla": ["Model 3", "Model Y"],
+    "Nissan": ["Leaf", "Qashqai"],
+    "Mercedes": ["Actros", "Sprinter", "C-Class"],
+    "Volvo": ["FH", "XC40"],
+    "BMW": ["3 Series", "i4"],
+    "Volkswagen": ["Golf", "ID.3"],
+    "MAN": ["TGX", "TGS"],
+    "Hyundai": ["Kauai Electric", "Ioniq 5"],
+}
+
+
+# ============================================
+# SYNTHETIC DATA
+# ============================================
+def synthetic_rows(count, seed=42):
+    """Yield (type, brand, model, price, year, extra1, extra2) tuples"""
+    rng = random.Random(seed)
+    brands = list(BRANDS)
+    for _ in range(count):
+        brand = rng.choice(brands)
+        model = rng.choice(BRANDS[brand])
+        price = round(rng.uniform(15000, 120000), 2)
+        year = rng.randint(2010, 2025)
+        vehicle_type = rng.choice(("Vehicle", "ElectricCar", "Truck"))
+        if vehicle_type == "ElectricCar":
+            extra = (rng.choice((40, 64, 75, 100)), rng.randint(250, 600))
+        elif vehicle_type == "Truck":
+            extra = (rng.randint(8, 40), round(rng.uniform(8, 16), 1))
+        else:
+            extra = (None, None)
+        yield (vehicle_type, brand, model, price, year) + extra
+
+
+def make_vehicle(row):
+    """Build a Vehicle/ElectricCar/Truck from a synthetic row"""
+    vehicle_type, brand, model, price, year, extra1, extra2 = row
+    if vehicle_type == "ElectricCar":
+        return ElectricCar(brand, model, price, year, extra1, extra2)
+    if vehicle_type == "Truck":
+        return Truck(brand, model, price, year, extra1, extra2)
+    return Vehicle(brand, model, price, year)
+
+
+def synthetic_vehicles(count, seed=42):
+    """Yield synthetic vehicles"""
+    return map(make_vehicle, synthetic_rows(count, seed))
+
+
+# ============================================
+# MEMORY: __dict__ objects vs __slots__ objects
+# ============================================
+class DictVehicle:
+    """Vehicle layout before __slots__ (kept only for comparison)"""
+    def __init__(self, brand, model, price, year, **extra):
+        # Copies, like strings parsed from a form or a file
+        self.brand = brand.encode().decode()
+        self.model = model.encode().decode()
+        self.price = price
+        self.year = year
+        self.registration_date = datetime.datetime.now()
+        self.__dict__.update(extra)
+
+
+def make_dict_vehicle(row):
+    vehicle_type, brand, model, price, year, extra1, extra2 = row
+    if vehicle_type == "ElectricCar":
+        return DictVehicle(brand, model, price, year, battery_capacity=extra1, autonomy=extra2)
+    if vehicle_type == "Truck":
+        return DictVehicle(brand, model, price, year, load_capacity=extra1, length=extra2)
+    return DictVehicle(brand, model, price, year)
+
+
+def bytes_per_vehicle(factory, count):
+    """Traced memory used by `count` vehicles, divided by count"""
+    rows = list(synthetic_rows(count))
+    vehicles = [None] * count
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i, row in enumerate(rows):
+        vehicles[i] = factory(row)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    return (after - before) / count
+
+
+def benchmark_memory(sizes=(1_000_000, 10_000_000)):
+    """Report bytes per vehicle before and after the compact representation"""
+    print(f"{'Vehicles':>12} {'Before (B)':>12} {'After (B)':>12} {'Saved':>8}")
+    for count in sizes:
+        before = bytes_per_vehicle(make_dict_vehicle, count)
+        after = bytes_per_vehicle(make_vehicle, count)
+        print(f"{count:>12,} {before:>12.1f} {after:>12.1f} {1 - after / before:>8.1%}")
+
+
+# ============================================
+# IMPORT THROUGHPUT
+# ============================================
+def build_fleet(count, fleet_class=Fleet):
+    """Fleet filled with synthetic vehicles"""
+    fleet = fleet_class()
+    fleet.add_vehicles(synthetic_vehicles(count))
+    return fleet
+
+
+def benchmark_import(sizes=(100_000, 1_000_000)):
+    """Report rows per second of Fleet.import_inventory for csv and json"""
+    print(f"{'Vehicles':>12} {'Format':>8} {'Seconds':>10} {'Rows/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            source = build_fleet(count)
+            for format_type in ("csv", "json"):
+                filename = os.path.join(directory, f"fleet.{format_type}")
+                source.export_inventory(filename, format_type)
+                
+                fleet = Fleet()
+                start = time.perf_counter()
+                success, message = fleet.import_inventory(filename)
+                elapsed = time.perf_counter() - start
+                
+                if not success:
+                    print(message)
+                    continue
+                print(f"{count:>12,} {format_type:>8} {elapsed:>10.2f} {count / elapsed:>12,.0f}")
+
+
+# ============================================
+# QUERIES: index-aware query vs chained comprehensions
+# ============================================
+QUERIES = {
+    "brand+year+price": (
+        lambda fleet: fleet.query().brand("Tesla").year(2020).price(max_price=40000),
+        lambda vehicles: [v for v in [v for v in [v for v in vehicles
+                          if v.brand.lower() == "tesla"] if v.year >= 2020] if v.price <= 40000],
+    ),
+    "type+battery": (
+        lambda fleet: fleet.query().types("ElectricCar").min_battery(75),
+        lambda vehicles: [v for v in [v for v in vehicles if v.__class__.__name__ == "ElectricCar"]
+                          if v.battery_capacity >= 75],
+    ),
+    "prefix top 10 by price": (
+        lambda fleet: fleet.query().brand_prefix("m").order_by("price", descending=True).limit(10),
+        lambda vehicles: sorted([v for v in vehicles if v.brand.lower().startswith("m")],
+                                key=lambda v: v.price, reverse=True)[:10],
+    ),
+    "recent years, first 20": (
+        lambda fleet: fleet.query().year(2024, 2025).order_by("year").limit(20),
+        lambda vehicles: sorted([v for v in vehicles if 2024 <= v.year <= 2025],
+                                key=lambda v: v.year)[:20],
+    ),
+}
+
+
+def best_time(function, repeat=5):
+    """Fastest of `repeat` runs, in seconds"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_query(sizes=(100_000, 1_000_000)):
+    """Report Fleet.query() against naive chained list comprehensions"""
+    print(f"{'Vehicles':>12} {'Query':<24} {'Naive (ms)':>11} {'Query (ms)':>11} {'Speedup':>8}  Plan")
+    for count in sizes:
+        fleet = build_fleet(count)
+        vehicles = fleet.vehicles
+        for name, (make_query, naive) in QUERIES.items():
+            query = make_query(fleet)
+            if len(query.all()) != len(naive(vehicles)):
+                print(f"{count:>12,} {name:<24} results differ!")
+                continue
+            
+            naive_time = best_time(lambda: naive(vehicles))
+            query_time = best_time(query.all)
+            print(f"{count:>12,} {name:<24} {naive_time * 1000:>11.2f} {query_time * 1000:>11.2f} "
+                  f"{naive_time / query_time:>7.1f}x  {query.explain()}")
+
+
+# ============================================
+# SEARCH AS YOU TYPE: one search per keystroke
+# ============================================
+def naive_search(vehicles, text):
+    words = text.lower().split()
+    return [v for v in vehicles
+            if all(any(part.startswith(word) for part in f"{v.brand} {v.model}".lower().split())
+                   for word in words)]
+
+
+def benchmark_search(sizes=(100_000, 1_000_000), typed="toyota cor"):
+    """Report Fleet.search() latency for each keystroke of `typed` against a full scan"""
+    print(f"{'Vehicles':>12} {'Text':<12} {'Matches':>9} {'Naive (ms)':>11} {'Search (ms)':>12}")
+    for count in sizes:
+        fleet = build_fleet(count)
+        vehicles = fleet.vehicles
+        for end in range(1, len(typed) + 1):
+            text = typed[:end]
+            naive_time = best_time(lambda: naive_search(vehicles, text), repeat=1)
+            # Typing replays the previous keystroke's search, as in the GUI
+            fleet.search(typed[:end - 1])
+            start = time.perf_counter()
+            result = fleet.search(text)
+            search_time = time.perf_counter() - start
+            print(f"{count:>12,} {text!r:<12} {len(result):>9,} {naive_time * 1000:>11.2f} "
+                  f"{search_time * 1000:>12.3f}")
+
+
+# ============================================
+# GROUP BY: Fleet.group_by() per key and fleet layout
+# ============================================
+GROUPINGS = {
+    "brand": {"key": "brand"},
+    "year": {"key": "year"},
+    "5 years": {"key": "year", "bucket": 5},
+    "type": {"key": "type"},
+    "model": {"key": "model"},
+}
+
+
+def benchmark_groupby(sizes=(100_000, 1_000_000)):
+    """Report Fleet.group_by() time (price and tax, median and p90) per grouping"""
+    print(f"{'Vehicles':>12} {'Fleet':<14} {'Group by':<10} {'Groups':>7} {'Seconds':>9}")
+    for count in sizes:
+        for fleet_class in (Fleet, ColumnarFleet):
+            fleet = build_fleet(count, fleet_class)
+            for name, options in GROUPINGS.items():
+                groups = fleet.group_by(**options)
+                elapsed = best_time(lambda: fleet.group_by(**options), repeat=3)
+                print(f"{count:>12,} {fleet_class.__name__:<14} {name:<10} {len(groups):>7} {elapsed:>9.2f}")
+
+
+# ============================================
+# BACKENDS: the same workload on every Fleet implementation
+# ============================================
+BACKENDS = {
+    "memory": lambda directory: Fleet(),
+    "columnar": lambda directory: ColumnarFleet(),
+    "sqlite": lambda directory: SQLiteFleet(os.path.join(directory, "fleet.db")),
+}
+
+# Filter results are listed, as Fleet returns lazy views
+BACKEND_OPERATIONS = {
+    "filter_by_brand": lambda fleet: list(fleet.filter_by_brand("Tesla")),
+    "filter_by_year": lambda fleet: list(fleet.filter_by_year(2024)),
+    "filter_by_type": lambda fleet: list(fleet.filter_by_type("Truck")),
+    "get_summary": lambda fleet: fleet.get_summary(),
+}
+
+
+def benchmark_backends(sizes=(100_000, 1_000_000)):
+    """Report insert throughput and query times of each Fleet backend"""
+    operations = dict(BACKEND_OPERATIONS)
+    for name, (make_query, _) in QUERIES.items():
+        operations[name] = lambda fleet, make_query=make_query: make_query(fleet).all()
+    
+    print(f"{'Vehicles':>12} {'Backend':<10} {'Operation':<24} {'Result':>12}")
+    for count in sizes:
+        vehicles = list(synthetic_vehicles(count))
+        for backend, make_fleet in BACKENDS.items():
+            with tempfile.TemporaryDirectory() as directory:
+                fleet = make_fleet(directory)
+                start = time.perf_counter()
+                fleet.add_vehicles(vehicles)
+                elapsed = time.perf_counter() - start
+                print(f"{count:>12,} {backend:<10} {'add_vehicles':<24} {count / elapsed:>8,.0f} r/s")
+                
+                for name, operation in operations.items():
+                    elapsed = best_time(lambda: operation(fleet), repeat=3)
+                    print(f"{count:>12,} {backend:<10} {name:<24} {elapsed * 1000:>9.2f} ms")
+                fleet.close()
+
+
+# ============================================
+# JOURNAL: write throughput and replay speed
+# ============================================
+SYNC_EACH_LIMIT = 2_000  # one fsync per change is slow, so time fewer changes
+
+
+def journaled_adds(vehicles, journal=None, sync_each=False):
+    """Seconds to add vehicles one by one, with an optional journal attached"""
+    fleet = Fleet() if journal is None else journal.recover()
+    start = time.perf_counter()
+    for vehicle in vehicles:
+        fleet.add_vehicle(vehicle)
+        if sync_each:
+            journal.commit()
+    if journal is not None:
+        journal.close()
+    return time.perf_counter() - start
+
+
+def benchmark_journal(sizes=(10_000, 100_000)):
+    """Report add_vehicle throughput without a journal, with an fsync per change and with group commit"""
+    print(f"{'Changes':>12} {'Mode':<14} {'Seconds':>10} {'Changes/s':>12} {'fsyncs':>8}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            modes = {
+                "no journal": (None, False, count),
+                "fsync each": (FleetJournal(os.path.join(directory, "each.journal"),
+                                            os.path.join(directory, "each.snapshot")),
+                               True, min(count, SYNC_EACH_LIMIT)),
+                "group commit": (FleetJournal(os.path.join(directory, "group.journal"),
+                                              os.path.join(directory, "group.snapshot")),
+                                 False, count),
+            }
+            for mode, (journal, sync_each, changes) in modes.items():
+                elapsed = journaled_adds(synthetic_vehicles(changes), journal, sync_each)
+                commits = journal.commits if journal is not None else 0
+                print(f"{changes:>12,} {mode:<14} {elapsed:>10.2f} {changes / elapsed:>12,.0f} {commits:>8,}")
+
+
+def benchmark_replay(sizes=(100_000, 1_000_000)):
+    """Report how fast FleetJournal.recover() replays a journal, against loading a checkpoint"""
+    print(f"{'Records':>12} {'Journal MB':>11} {'Replay (s)':>11} {'Records/s':>12} {'Checkpoint (s)':>15}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            journal_file = os.path.join(directory, "fleet.journal")
+            snapshot_file = os.path.join(directory, "fleet.snapshot")
+            journal = FleetJournal(journal_file, snapshot_file)
+            fleet = journal.recover()
+            fleet.add_vehicles(synthetic_vehicles(count))
+            journal.close()
+            size = os.path.getsize(journal_file) / 1e6
+            
+            start = time.perf_counter()
+            journal = FleetJournal(journal_file, snapshot_file)
+            journal.recover()
+            replay = time.perf_counter() - start
+            
+            journal.checkpoint()
+            journal.close()
+            start = time.perf_counter()
+            journal = FleetJournal(journal_file, snapshot_file)
+            len(journal.recover().vehicles)
+            checkpoint = time.perf_counter() - start
+            journal.close()
+            print(f"{count:>12,} {size:>11.1f} {replay:>11.2f} {count / replay:>12,.0f} {checkpoint:>15.2f}")
+
+
+# ============================================
+# CONCURRENCY: ingestion threads and readers
+# ============================================
+class LockedFleet(Fleet):
+    """Baseline: a plain Fleet with every add_vehicle serialized on one lock"""
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+    
+    def add_vehicle(self, vehicle):
+        with self._lock:
+            return super().add_vehicle(vehicle)
+
+
+def run_threads(target, count):
+    """Run target(i) on `count` threads and wait for all of them"""
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def benchmark_threads(sizes=(400_000,), thread_counts=(1, 2, 4, 8)):
+    """Report add_vehicle throughput across thread counts, single lock vs ConcurrentFleet"""
+    print(f"{'Vehicles':>12} {'Threads':>8} {'Fleet':<16} {'Seconds':>10} {'Adds/s':>12}")
+    for count in sizes:
+        vehicles = list(synthetic_vehicles(count))
+        for threads in thread_counts:
+            shards = [vehicles[i::threads] for i in range(threads)]
+            for fleet_class in (LockedFleet, ConcurrentFleet):
+                fleet = fleet_class()
+                
+                def ingest(i):
+                    for vehicle in shards[i]:
+                        fleet.add_vehicle(vehicle)
+                
+                start = time.perf_counter()
+                run_threads(ingest, threads)
+                assert len(fleet) == count
+                elapsed = time.perf_counter() - start
+                print(f"{count:>12,} {threads:>8} {fleet_class.__name__:<16} {elapsed:>10.2f} {count / elapsed:>12,.0f}")
+
+
+def stress_concurrent_fleet(sizes=(100_000,), writers=4, readers=2):
+    """Add, remove, reprice and read a ConcurrentFleet from many threads and check it stays consistent"""
+    for count in sizes:
+        fleet = ConcurrentFleet()
+        vehicles = list(synthetic_vehicles(count))
+        done = threading.Event()
+        errors = []
+        reads = [0] * readers
+        removed = []
+        
+        def write(i):
+            for vehicle in vehicles[i::writers]:
+                fleet.add_vehicle(vehicle)
+        
+        def read(i):
+            try:
+                while not done.is_set():
+                    with fleet._lock:  # the check itself must see the same state
+                        fleet._check_summary(fleet.get_summary())
+                    trucks = fleet.filter_by_type("Truck")
+                    assert sum(1 for _ in trucks) == len(trucks)
+                    fleet.query().brand("Tesla").year(2020).all()
+                    reads[i] += 1
+            except Exception as error:
+                errors.append(error)
+        
+        def change(_):
+            generator = random.Random(1)
+            try:
+                while not done.is_set():
+                    sample = generator.sample(fleet.vehicles, min(10, len(fleet)))
+                    removed.extend(fleet.remove_vehicles(vehicle.vehicle_id for vehicle in sample[:5]))
+                    for vehicle in sample[5:]:
+                        vehicle.price = round(generator.uniform(5_000, 90_000), 2)
+                    fleet.apply_global_discount(generator.choice((-1, 1)))
+            except Exception as error:
+                errors.append(error)
+        
+        start = time.perf_counter()
+        background = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        background.append(threading.Thread(target=change, args=(0,)))
+        for thread in background:
+            thread.start()
+        run_threads(write, writers)
+        done.set()
+        for thread in background:
+            thread.join()
+        fleet.flush()
+        fleet._check_summary(fleet.get_summary())
+        elapsed = time.perf_counter() - start
+        
+        ids = [vehicle.vehicle_id for vehicle in fleet]
+        if len(set(ids)) != len(ids):
+            errors.append(AssertionError("Duplicate vehicle IDs"))
+        if len(fleet) != count - len(removed):
+            errors.append(AssertionError(f"{len(fleet)} vehicles, expected {count - len(removed)}"))
+        status = "OK" if not errors else f"FAILED: {errors[0]!r}"
+        print(f"{count:,} vehicles from {writers} writers, {sum(reads):,} consistent reads, "
+              f"{len(removed):,} removed in {elapsed:.2f}s: {status}")
+
+
+# ============================================
+# PARALLEL ANALYTICS: shared memory workers vs one process
+# ============================================
+PERCENTAGE_SCENARIOS = [-5, 5, 10, 20]  # totals per type are enough for these
+REPORT_SCENARIOS = [-5, 5, 10, Scenario("Brand deals", 0, {"Truck": 8}, {"Tesla": 12, "Toyota": 3})]
+
+
+def run_report(analytics):
+    """A report made of a summary, two breakdowns and two sets of scenario pricing"""
+    analytics.get_summary()
+    analytics.group_by("brand", metrics=("price", "tax", "autonomy"))
+    analytics.group_by("year", bucket=5)
+    analytics.evaluate_scenarios(PERCENTAGE_SCENARIOS)
+    analytics.evaluate_scenarios(REPORT_SCENARIOS)
+
+
+class SerialReport:
+    """The same report from the fleet itself, in this process"""
+    def __init__(self, fleet):
+        self.fleet = fleet
+    
+    def get_summary(self):
+        return self.fleet._recompute_summary()
+    
+    def group_by(self, key, metrics=("price", "tax"), bucket=None):
+        return self.fleet.group_by(key, metrics, percentiles=(), bucket=bucket)
+    
+    def evaluate_scenarios(self, scenarios):
+        return self.fleet.evaluate_scenarios(scenarios)
+
+
+def benchmark_parallel(sizes=(1_000_000,), worker_counts=None):
+    """Report the time of a full report in one process and with SharedFleetColumns workers"""
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, cpus})
+    
+    print(f"{'Vehicles':>12} {'Fleet':<14} {'Workers':>8} {'Copy (s)':>9} {'Report (s)':>11} {'Speedup':>8}")
+    for count in sizes:
+        for fleet_class in (Fleet, ColumnarFleet):
+            fleet = build_fleet(count, fleet_class)
+            serial = best_time(lambda: run_report(SerialReport(fleet)), repeat=1)
+            print(f"{count:>12,} {fleet_class.__name__:<14} {'-':>8} {'-':>9} {serial:>11.2f} {1:>7.1f}x")
+            
+            for workers in worker_counts:
+                start = time.perf_counter()
+                with SharedFleetColumns(fleet, workers=workers) as shared:
+                    copy = time.perf_counter() - start
+                    elapsed = best_time(lambda: run_report(shared), repeat=3)
+                print(f"{count:>12,} {fleet_class.__name__:<14} {workers:>8} {copy:>9.2f} "
+                      f"{elapsed:>11.2f} {serial / elapsed:>7.1f}x")
+
+
+# ============================================
+# TOP-K: ordered indexes vs sorting the matches
+# ============================================
+TOP_K_QUERIES = {
+    "10 most expensive trucks": (
+        lambda fleet: fleet.query().types("Truck").order_by("price", descending=True).limit(10),
+        lambda vehicles: sorted([v for v in vehicles if v.__class__.__name__ == "Truck"],
+                                key=lambda v: v.price, reverse=True)[:10],
+    ),
+    "top tax from 2022": (
+        lambda fleet: fleet.query().year(2022).order_by("tax", descending=True).limit(10),
+        lambda vehicles: sorted([v for v in vehicles if v.year >= 2022],
+                                key=lambda v: v.calculate_tax(), reverse=True)[:10],
+    ),
+    "5 newest": (
+        lambda fleet: fleet.query().order_by("registration_date", descending=True).limit(5),
+        lambda vehicles: sorted(vehicles, key=lambda v: v.registered_at, reverse=True)[:5],
+    ),
+    "Tesla by price, page 50": (
+        lambda fleet: fleet.query().brand("Tesla").order_by("price").limit(20, offset=1000),
+        lambda vehicles: sorted([v for v in vehicles if v.brand.lower() == "tesla"],
+                                key=lambda v: v.price)[1000:1020],
+    ),
+}
+
+
+def benchmark_topk(sizes=(100_000, 1_000_000)):
+    """Report ordered, limited queries with the order indexes against a full sort"""
+    print(f"{'Vehicles':>12} {'Query':<26} {'Sort (ms)':>10} {'Build (ms)':>11} {'Index (ms)':>11} {'Speedup':>8}")
+    for count in sizes:
+        fleet = build_fleet(count)
+        vehicles = fleet.vehicles
+        for name, (make_query, naive) in TOP_K_QUERIES.items():
+            sort_time = best_time(lambda: naive(vehicles), repeat=3)
+            start = time.perf_counter()
+            make_query(fleet).all()  # builds the index the first time
+            build_time = time.perf_counter() - start
+            index_time = best_time(lambda: make_query(fleet).all())
+            print(f"{count:>12,} {name:<26} {sort_time * 1000:>10.1f} {build_time * 1000:>11.1f} "
+                  f"{index_time * 1000:>11.3f} {sort_time / index_time:>7.0f}x")
+        
+        # Keeping the indexes current while the fleet changes
+        extra = list(synthetic_vehicles(1000, seed=7))
+        start = time.perf_counter()
+        for vehicle in extra:
+            fleet.add_vehicle(vehicle)
+        fleet.remove_vehicles(vehicle.vehicle_id for vehicle in extra)
+        fleet.apply_global_discount(5)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>12,} 1,000 adds + removes + a discount with {len(fleet._order_indexes)} "
+              f"indexes: {elapsed * 1000:.1f} ms")
+
+
+# ============================================
+# EXPORT: one file at a time vs every format in one pass
+# ============================================
+EXPORT_FORMATS = ("csv", "json", "txt")
+
+
+def benchmark_export(sizes=(100_000, 1_000_000)):
+    """Report single exports, three separate exports and one export_inventories() pass"""
+    print(f"{'Vehicles':>12} {'Export':<24} {'Seconds':>10} {'Rows/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            fleet = build_fleet(count)
+            
+            def report(name, elapsed):
+                print(f"{count:>12,} {name:<24} {elapsed:>10.2f} {count / elapsed:>12,.0f}")
+            
+            separate = 0
+            for format_type in EXPORT_FORMATS:
+                filename = os.path.join(directory, f"single.{format_type}")
+                elapsed = best_time(lambda: fleet.export_inventory(filename, format_type), repeat=1)
+                report(f"{format_type} only", elapsed)
+                separate += elapsed
+            report("3 separate exports", separate)
+            
+            targets = {os.path.join(directory, f"all.{format_type}"): format_type
+                       for format_type in EXPORT_FORMATS}
+            report("3 formats, one pass", best_time(lambda: fleet.export_inventories(targets), repeat=1))
+
+
+# ============================================
+# MAIN
+# ============================================
+BENCHMARKS = {
+    "memory": benchmark_memory,
+    "import": benchmark_import,
+    "query": benchmark_query,
+    "search": benchmark_search,
+    "groupby": benchmark_groupby,
+    "backends": benchmark_backends,
+    "journal": benchmark_journal,
+    "replay": benchmark_replay,
+    "threads": benchmark_threads,
+    "stress": stress_concurrent_fleet,
+    "parallel": benchmark_parallel,
+    "topk": benchmark_topk,
+    "export": benchmark_export,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        print("Available benchmarks:", ", ".join(BENCHMARKS))
+        return
+    
+    benchmark = BENCHMARKS[sys.argv[1]]
+    sizes = [int(size) for size in sys.argv[2:]]
+    if sizes:
+        benchmark(sizes)
+    else:
+        benchmark()
+
+
+if __name__ == "__main__":
+    main()
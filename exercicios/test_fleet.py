@@ -0,0 +1,313 @@
+"""Tests for the fleet storage backends, snapshots and journal (teste.py)
+
+Usage:
+    python -m pytest test_fleet.py
+"""
+import math
+import os
+import random
+
+import pytest
+
+# teste.py also holds the GUI, so it needs customtkinter and Pillow to import
+pytest.importorskip("customtkinter")
+pytest.importorskip("PIL")
+
+from teste import Vehicle, ElectricCar, Truck, Fleet, ColumnarFleet, SQLiteFleet, FleetJournal
+
+
+BRANDS = ["Toyota", "Ford", "Tesla", "Volvo", "volvo"]
+MODELS = ["Corolla", "Focus", "Model 3", "XC90"]
+BACKENDS = [Fleet, ColumnarFleet, SQLiteFleet]
+
+
+def make_vehicles(count, seed=1):
+    """Random mix of vehicles, the same for the same seed"""
+    rng = random.Random(seed)
+    vehicles = []
+    for _ in range(count):
+        brand = rng.choice(BRANDS)
+        model = rng.choice(MODELS)
+        price = round(rng.uniform(1000, 100000), 2)
+        year = rng.randrange(2010, 2025)
+        kind = rng.randrange(3)
+        if kind == 0:
+            vehicle = Vehicle(brand, model, price, year)
+        elif kind == 1:
+            vehicle = ElectricCar(brand, model, price, year, rng.randrange(40, 100), rng.randrange(200, 600))
+        else:
+            vehicle = Truck(brand, model, price, year, rng.randrange(5, 30), rng.randrange(8, 15))
+        vehicle.registered_at = 1700000000 + rng.randrange(10 ** 6)
+        vehicles.append(vehicle)
+    return vehicles
+
+
+def state(fleet):
+    """Everything that identifies the vehicles of a fleet, by vehicle ID"""
+    return {vehicle.vehicle_id: (vehicle.to_record(), round(vehicle.price, 6)) for vehicle in fleet}
+
+
+def assert_summaries_match(summary, expected):
+    assert summary['total'] == expected['total']
+    assert summary['by_type'] == expected['by_type']
+    assert math.isclose(summary['total_value'], expected['total_value'], rel_tol=1e-9)
+    assert math.isclose(summary['total_tax'], expected['total_tax'], rel_tol=1e-9)
+    for key in ('value_by_type', 'tax_by_type'):
+        for name, value in expected[key].items():
+            assert math.isclose(summary[key][name], value, rel_tol=1e-9)
+
+
+def change_fleet(fleet, rng, steps=200):
+    """Apply a random sequence of adds, removals, price changes and discounts
+    
+    Prices are only changed on a Fleet: the other backends hand out copies.
+    """
+    for _ in range(steps):
+        operation = rng.randrange(6)
+        vehicle_ids = [vehicle.vehicle_id for vehicle in fleet]
+        if operation == 0 or not vehicle_ids:
+            fleet.add_vehicle(make_vehicles(1, rng.randrange(10 ** 6))[0])
+        elif operation == 1:
+            fleet.add_vehicles(make_vehicles(rng.randrange(1, 20), rng.randrange(10 ** 6)))
+        elif operation == 2:
+            fleet.remove_vehicle_by_id(rng.choice(vehicle_ids))
+        elif operation == 3:
+            fleet.remove_vehicles(rng.sample(vehicle_ids, min(3, len(vehicle_ids))))
+        elif operation == 4 and type(fleet) is Fleet:
+            fleet.get_vehicle(rng.choice(vehicle_ids)).price = rng.choice([1500, 2345.5])
+        else:
+            fleet.apply_global_discount(rng.choice([5, -3, 10]))
+
+
+# ============================================
+# SNAPSHOTS
+# ============================================
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_snapshot_round_trip(tmp_path, backend):
+    fleet = backend()
+    fleet.add_vehicles(make_vehicles(500))
+    fleet.remove_vehicles([3, 10, 250])
+    fleet.apply_global_discount(10)
+    filename = str(tmp_path / "fleet.snapshot")
+    
+    success, message = fleet.save_snapshot(filename)
+    assert success, message
+    
+    loaded = backend.load_snapshot(filename)
+    assert len(loaded) == len(fleet)
+    assert_summaries_match(loaded.get_summary(), fleet.get_summary())
+    assert state(loaded) == state(fleet)
+    
+    # New vehicles keep getting IDs after the saved ones
+    loaded.add_vehicle(make_vehicles(1, seed=2)[0])
+    assert max(state(loaded)) == max(state(fleet)) + 1
+    loaded.close()
+
+
+def test_sqlite_snapshot_ids_survive_restart(tmp_path):
+    fleet = Fleet()
+    fleet.add_vehicles(make_vehicles(100))
+    fleet.remove_vehicles([99, 100])
+    filename = str(tmp_path / "fleet.snapshot")
+    fleet.save_snapshot(filename)
+    
+    path = str(tmp_path / "fleet.db")
+    SQLiteFleet.load_snapshot(filename, path).close()
+    reopened = SQLiteFleet(path)
+    assert state(reopened) == state(fleet)
+    reopened.add_vehicle(make_vehicles(1, seed=2)[0])
+    assert max(state(reopened)) == 101  # IDs of removed vehicles are not reused
+    reopened.close()
+
+
+def test_snapshot_summary_before_materializing(tmp_path):
+    fleet = Fleet()
+    fleet.add_vehicles(make_vehicles(300))
+    filename = str(tmp_path / "fleet.snapshot")
+    fleet.save_snapshot(filename)
+    
+    loaded = Fleet.load_snapshot(filename)
+    assert_summaries_match(loaded.get_summary(), fleet.get_summary())  # read from the file
+    assert_summaries_match(loaded._recompute_summary(), fleet.get_summary())
+    loaded.close()
+
+
+# ============================================
+# JOURNAL RECOVERY
+# ============================================
+def test_journal_recovery(tmp_path):
+    journal_file, snapshot_file = str(tmp_path / "fleet.journal"), str(tmp_path / "fleet.snapshot")
+    journal = FleetJournal(journal_file, snapshot_file)
+    fleet = journal.recover()
+    change_fleet(fleet, random.Random(3))
+    expected = state(fleet)
+    journal.close()
+    
+    journal = FleetJournal(journal_file, snapshot_file)
+    recovered = journal.recover()
+    assert state(recovered) == expected
+    assert_summaries_match(recovered.get_summary(), fleet.get_summary())
+    
+    # After a checkpoint the journal only holds the changes made since
+    journal.checkpoint()
+    assert os.path.getsize(journal_file) == 0
+    change_fleet(recovered, random.Random(4), steps=50)
+    expected = state(recovered)
+    journal.close()
+    
+    journal = FleetJournal(journal_file, snapshot_file)
+    assert state(journal.recover()) == expected
+    journal.close()
+
+
+@pytest.mark.parametrize("cut", [1, 5, 20])
+def test_journal_torn_tail(tmp_path, cut):
+    journal_file, snapshot_file = str(tmp_path / "fleet.journal"), str(tmp_path / "fleet.snapshot")
+    journal = FleetJournal(journal_file, snapshot_file)
+    fleet = journal.recover()
+    fleet.add_vehicles(make_vehicles(50))
+    journal.commit()
+    committed = state(fleet)
+    committed_size = os.path.getsize(journal_file)
+    
+    # The last record is only partly written when the process dies
+    fleet.add_vehicle(make_vehicles(1, seed=2)[0])
+    journal.close()
+    with open(journal_file, 'r+b') as file:
+        file.truncate(os.path.getsize(journal_file) - cut)
+    
+    journal = FleetJournal(journal_file, snapshot_file)
+    recovered = journal.recover()
+    assert state(recovered) == committed
+    assert os.path.getsize(journal_file) == committed_size  # torn record cut off
+    
+    # New records go after the last good one and replay cleanly
+    recovered.add_vehicle(make_vehicles(1, seed=3)[0])
+    expected = state(recovered)
+    journal.close()
+    
+    journal = FleetJournal(journal_file, snapshot_file)
+    assert state(journal.recover()) == expected
+    journal.close()
+
+
+def test_journal_corrupt_tail(tmp_path):
+    journal_file, snapshot_file = str(tmp_path / "fleet.journal"), str(tmp_path / "fleet.snapshot")
+    journal = FleetJournal(journal_file, snapshot_file)
+    fleet = journal.recover()
+    fleet.add_vehicles(make_vehicles(50))
+    expected = state(fleet)
+    journal.close()
+    with open(journal_file, 'ab') as file:
+        file.write(os.urandom(64))
+    
+    journal = FleetJournal(journal_file, snapshot_file)
+    assert state(journal.recover()) == expected
+    journal.close()
+
+
+# ============================================
+# BACKEND PARITY
+# ============================================
+@pytest.fixture(scope="module")
+def fleets():
+    result = []
+    for backend in BACKENDS:
+        fleet = backend()
+        fleet.add_vehicles(make_vehicles(2000))
+        fleet.remove_vehicles(range(1, 2001, 7))
+        fleet.apply_global_discount(15)
+        result.append(fleet)
+    yield result
+    for fleet in result:
+        fleet.close()
+
+
+def ids(vehicles):
+    return [vehicle.vehicle_id for vehicle in vehicles]
+
+
+def test_backends_hold_the_same_vehicles(fleets):
+    expected = state(fleets[0])
+    for fleet in fleets[1:]:
+        assert state(fleet) == expected
+
+
+@pytest.mark.parametrize("brand", ["volvo", "TESLA", "Ford", "Nissan"])
+def test_backend_parity_filter_by_brand(fleets, brand):
+    expected = sorted(ids(fleets[0].filter_by_brand(brand)))
+    for fleet in fleets[1:]:
+        assert sorted(ids(fleet.filter_by_brand(brand))) == expected
+
+
+@pytest.mark.parametrize("min_year", [2009, 2018, 2024, 2030])
+def test_backend_parity_filter_by_year(fleets, min_year):
+    expected = sorted(ids(fleets[0].filter_by_year(min_year)))
+    for fleet in fleets[1:]:
+        assert sorted(ids(fleet.filter_by_year(min_year))) == expected
+
+
+@pytest.mark.parametrize("vehicle_type", ["Vehicle", "ElectricCar", "Truck"])
+def test_backend_parity_filter_by_type(fleets, vehicle_type):
+    expected = sorted(ids(fleets[0].filter_by_type(vehicle_type)))
+    assert expected
+    for fleet in fleets[1:]:
+        assert sorted(ids(fleet.filter_by_type(vehicle_type))) == expected
+
+
+@pytest.mark.parametrize("field", ["price", "tax", "registration_date"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_backend_parity_ordered_query(fleets, field, descending):
+    def run(fleet):
+        query = fleet.query().year(min_year=2015).order_by(field, descending).limit(25, offset=5)
+        return ids(query.all())
+    
+    expected = run(fleets[0])
+    assert len(expected) == 25
+    for fleet in fleets[1:]:
+        assert run(fleet) == expected
+
+
+def test_backend_parity_filtered_query(fleets):
+    def run(fleet):
+        query = fleet.query().brand("volvo").types("ElectricCar", "Truck").price(max_price=50000)
+        return sorted(ids(query)), query.count()
+    
+    expected = run(fleets[0])
+    for fleet in fleets[1:]:
+        assert run(fleet) == expected
+
+
+def test_backend_parity_compute_taxes(fleets):
+    expected = dict(zip(ids(fleets[0]), fleets[0].compute_taxes()))
+    for fleet in fleets[1:]:
+        taxes = dict(zip(ids(fleet), fleet.compute_taxes()))
+        assert taxes.keys() == expected.keys()
+        for vehicle_id, tax in expected.items():
+            assert math.isclose(taxes[vehicle_id], tax, rel_tol=1e-9)
+        assert_summaries_match(fleet.get_summary(), fleets[0].get_summary())
+
+
+# ============================================
+# RUNNING TOTALS
+# ============================================
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_running_totals_match_recompute(backend):
+    fleet = backend(debug=True)  # get_summary() checks itself against _recompute_summary()
+    rng = random.Random(5)
+    for _ in range(5):
+        change_fleet(fleet, rng, steps=60)
+        assert_summaries_match(fleet.get_summary(), fleet._recompute_summary())
+    
+    fleet.clear()
+    assert fleet.get_summary()['total'] == 0
+    assert fleet.get_summary()['total_value'] == 0
+    fleet.close()
+
+
+def test_running_totals_detect_drift():
+    fleet = Fleet(debug=True)
+    fleet.add_vehicles(make_vehicles(100))
+    fleet._total_value += 1
+    with pytest.raises(AssertionError):
+        fleet.get_summary()
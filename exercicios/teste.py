@@ -1,7 +1,29 @@
 import datetime
+import gzip
+import heapq
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+import io
+import math
+import mmap
+from multiprocessing import shared_memory
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
 import csv
 import json
-from tkinter import ttk, messagebox
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache, partial, wraps
+from itertools import chain, compress, islice
+from operator import attrgetter, ge, is_not, le, methodcaller, mul
+from time import perf_counter_ns
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 from PIL import Image
 
@@ -13,29 +35,198 @@ ctk.set_default_color_theme("blue")  # Temas: "blue", "dark-blue", "green"
 # ============================================
 # 1. DECORATOR @log_operation
 # ============================================
+class OperationMetrics:
+    """Call counters and latency histograms per operation
+    
+    Latencies are measured with perf_counter_ns and counted in power-of-two
+    buckets (bucket i holds calls that took less than 2**i ns), so recording
+    a call is a few integer operations. Counts are not locked and may be
+    slightly off when many threads record the same operation at once.
+    """
+    BUCKETS = 64
+    
+    def __init__(self):
+        self.stats = {}  # operation -> [calls, total ns, max ns, histogram]
+        self.sink = None  # optional log sink, see BufferedLogSink
+    
+    def record(self, name, elapsed_ns):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = [0, 0, 0, [0] * self.BUCKETS]
+        stats[0] += 1
+        stats[1] += elapsed_ns
+        if elapsed_ns > stats[2]:
+            stats[2] = elapsed_ns
+        stats[3][min(elapsed_ns.bit_length(), self.BUCKETS - 1)] += 1
+        
+        if self.sink is not None:
+            self.sink.log(name, elapsed_ns)
+    
+    @staticmethod
+    def _percentile(histogram, calls, fraction):
+        """Upper bound (ns) of the bucket holding the given fraction of calls"""
+        target = calls * fraction
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if seen >= target:
+                return 2 ** bucket
+        return 2 ** (len(histogram) - 1)
+    
+    def get_stats(self):
+        """Per-operation statistics (times in microseconds)"""
+        return {
+            name: {
+                'calls': calls,
+                'total_us': total / 1000,
+                'mean_us': total / calls / 1000,
+                'p50_us': min(self._percentile(histogram, calls, 0.5), maximum) / 1000,
+                'p99_us': min(self._percentile(histogram, calls, 0.99), maximum) / 1000,
+                'max_us': maximum / 1000
+            }
+            for name, (calls, total, maximum, histogram) in self.stats.items()
+        }
+    
+    def dump(self, file=None):
+        """Print a table with the statistics of every operation"""
+        lines = [f"{'Operation':<24}{'Calls':>10}{'Mean µs':>12}{'p50 µs':>12}{'p99 µs':>12}{'Max µs':>12}"]
+        for name, stats in sorted(self.get_stats().items()):
+            lines.append(f"{name:<24}{stats['calls']:>10}{stats['mean_us']:>12.1f}"
+                         f"{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}{stats['max_us']:>12.1f}")
+        print("\n".join(lines), file=file)
+    
+    def reset(self):
+        """Forget all recorded calls"""
+        self.stats.clear()
+
+
+class BufferedLogSink:
+    """Background log of operations, written in batches
+    
+    Only one in every `sample_every` calls is logged. Lines are queued by
+    log() and written by a daemon thread every `interval` seconds, so the
+    operation itself never waits for the console.
+    """
+    def __init__(self, stream=None, sample_every=1, interval=1.0):
+        self.stream = stream if stream is not None else sys.stdout
+        self.sample_every = sample_every
+        self.interval = interval
+        self._seen = 0
+        self._pending = deque()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def log(self, name, elapsed_ns):
+        self._seen += 1
+        if self._seen % self.sample_every == 0:
+            self._pending.append((time.time(), name, elapsed_ns))
+    
+    def flush(self):
+        """Write every queued line now"""
+        lines = []
+        while self._pending:
+            timestamp, name, elapsed_ns = self._pending.popleft()
+            lines.append(f"[{format_timestamp(timestamp)}] Executing: {name} ({elapsed_ns / 1000:.1f} µs)\n")
+        if lines:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+    
+    def close(self):
+        """Stop the background thread and write what is left"""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+
+
+# Metrics of every operation decorated with @log_operation
+METRICS = OperationMetrics()
+
+
 def log_operation(func):
-    """Decorator para registrar data e hora de operações"""
+    """Decorator para registrar chamadas e latência de operações (ver METRICS)"""
+    name = func.__name__
+    
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        now = datetime.datetime.now()
-        print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] Executing: {func.__name__}")
-        return func(*args, **kwargs)
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            METRICS.record(name, perf_counter_ns() - start)
     return wrapper
 
 # ============================================
 # 2. CLASSES
 # ============================================
+def format_timestamp(timestamp):
+    """Format a POSIX timestamp as used in exports"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
 class Vehicle:
     """Base class for all vehicles"""
+    # No per-instance __dict__, so large fleets take much less memory
+    __slots__ = ('brand', 'model', '_price', '_tax', '_epoch', 'year', 'registered_at',
+                 'vehicle_id', '_fleet', '_price_key')
+    
+    VAT_RATE = 0.23  # 23% VAT
+    TAX_MULTIPLIER = 1.0  # Scales the base VAT for each subclass
+    
     def __init__(self, brand, model, price, year):
-        self.brand = brand
-        self.model = model
-        self.price = price
+        # Interned: every vehicle of the same brand/model shares one string
+        self.brand = sys.intern(brand)
+        self.model = sys.intern(model)
+        self.vehicle_id = None  # Stable ID, given by the fleet the vehicle is in
+        self._fleet = None  # Fleet that keeps running totals for this vehicle
+        self._epoch = 0  # global adjustments of _fleet already folded into _price
+        self._price = price
+        self._tax = None  # calculate_tax() cache, reset whenever the price changes
         self.year = year
-        self.registration_date = datetime.datetime.now()
+        self.registered_at = int(time.time())  # POSIX timestamp (seconds)
+    
+    @property
+    def price(self):
+        fleet = self._fleet
+        if fleet is not None and self._epoch != len(fleet._adjustments):
+            fleet._fold(self)
+        return self._price
+    
+    @price.setter
+    def price(self, value):
+        if self._fleet is None:
+            self._price = value
+            self._tax = None
+        else:
+            self._fleet._set_price(self, value)
+    
+    @property
+    def registration_date(self):
+        """Registration date as a datetime (built on demand)"""
+        return datetime.datetime.fromtimestamp(self.registered_at)
+    
+    @registration_date.setter
+    def registration_date(self, value):
+        self.registered_at = int(value.timestamp())
     
     def calculate_tax(self):
-        """Calculate base tax on vehicle"""
-        return self.price * 0.23  # 23% VAT
+        """Calculate tax on vehicle: VAT scaled by the class TAX_MULTIPLIER
+        
+        Subclasses only set TAX_MULTIPLIER, so there's no super() chain to
+        walk. The result is cached until the price changes.
+        """
+        fleet = self._fleet
+        if fleet is not None and self._epoch != len(fleet._adjustments):
+            fleet._fold(self)  # a global discount is pending: the cached tax is stale
+        tax = self._tax
+        if tax is None:
+            # Same operation order as before: (price * VAT) * multiplier
+            tax = self._tax = self.price * self.VAT_RATE * self.TAX_MULTIPLIER
+        return tax
     
     def __str__(self):
         return f"{self.brand} {self.model} - €{self.price:.2f} (Year: {self.year})"
@@ -49,23 +240,25 @@ class Vehicle:
             'price': self.price,
             'year': self.year,
             'tax': self.calculate_tax(),
-            'registration_date': self.registration_date.strftime('%Y-%m-%d %H:%M:%S')
+            'registration_date': format_timestamp(self.registered_at)
         }
+    
+    def to_record(self):
+        """Convert vehicle to a plain tuple (cheap to pickle, see vehicle_from_record)"""
+        return (self.__class__.__name__, self.brand, self.model, self.price,
+                self.year, self.registered_at)
 
 
 class ElectricCar(Vehicle):
     """Subclass for electric cars"""
+    __slots__ = ('battery_capacity', 'autonomy')
+    TAX_MULTIPLIER = 0.5  # Electric cars get 50% tax discount
+    
     def __init__(self, brand, model, price, year, battery_capacity, autonomy):
         super().__init__(brand, model, price, year)
         self.battery_capacity = battery_capacity  # in kWh
         self.autonomy = autonomy  # in km
     
-    def calculate_tax(self):
-        """Calculate tax with discount for electric vehicles"""
-        base_tax = super().calculate_tax()
-        # Electric cars get 50% tax discount
-        return base_tax * 0.5
-    
     def __str__(self):
         return f"{self.brand} {self.model} (Electric) - €{self.price:.2f} - Battery: {self.battery_capacity}kWh - Autonomy: {self.autonomy}km"
     
@@ -78,21 +271,21 @@ class ElectricCar(Vehicle):
             'tax_discount': '50%'
         })
         return data
+    
+    def to_record(self):
+        return super().to_record() + (self.battery_capacity, self.autonomy)
 
 
 class Truck(Vehicle):
     """Subclass for trucks"""
+    __slots__ = ('load_capacity', 'length')
+    TAX_MULTIPLIER = 1.3  # Trucks pay 30% more tax
+    
     def __init__(self, brand, model, price, year, load_capacity, length):
         super().__init__(brand, model, price, year)
         self.load_capacity = load_capacity  # in tons
         self.length = length  # in meters
     
-    def calculate_tax(self):
-        """Calculate tax with additional fee for trucks"""
-        base_tax = super().calculate_tax()
-        # Trucks pay 30% more tax
-        return base_tax * 1.3
-    
     def __str__(self):
         return f"{self.brand} {self.model} (Truck) - €{self.price:.2f} - Load: {self.load_capacity}t - Length: {self.length}m"
     
@@ -105,162 +298,3601 @@ class Truck(Vehicle):
             'extra_tax': '30%'
         })
         return data
+    
+    def to_record(self):
+        return super().to_record() + (self.load_capacity, self.length)
+
+
+def vehicle_from_record(record):
+    """Build a vehicle back from Vehicle.to_record()"""
+    cls = VEHICLE_TYPES[record[0]]
+    vehicle = cls(record[1], record[2], record[3], record[4], *record[6:])
+    vehicle.registered_at = record[5]
+    return vehicle
+
+
+# Type codes used by the columnar store and snapshots (index in this list)
+VEHICLE_CLASSES = [Vehicle, ElectricCar, Truck]
+VEHICLE_TYPES = {cls.__name__: cls for cls in VEHICLE_CLASSES}
+VEHICLE_TYPE_CODES = {cls.__name__: code for code, cls in enumerate(VEHICLE_CLASSES)}
 
 
 # ============================================
 # 3. FLEET MANAGEMENT CLASS
 # ============================================
+class FilterResult:
+    """Lazy view over one or more index buckets
+    
+    Iterating walks the buckets directly, nothing is copied. The view
+    follows the live fleet, so don't add/remove vehicles while iterating it.
+    """
+    def __init__(self, buckets):
+        self._buckets = buckets
+    
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+    
+    def __len__(self):
+        return sum(map(len, self._buckets))
+    
+    def __bool__(self):
+        return any(self._buckets)
+
+
+def name_matches(name, words):
+    """Does every search word start some word of name, a (brand, model) pair?"""
+    name_words = ' '.join(name).split()
+    return all(any(name_word.startswith(word) for name_word in name_words) for word in words)
+
+
+class SearchResult(FilterResult):
+    """Vehicles found by Fleet.search(), with the (brand, model) names that matched"""
+    def __init__(self, text, names, buckets):
+        super().__init__(buckets)
+        self.text = text
+        self.names = names
+
+
+class OperationCancelled(Exception):
+    """Raised by a progress callback to stop a long fleet operation"""
+
+
+# A what-if pricing scenario for Fleet.evaluate_scenarios(): a percentage
+# discount (negative for a tax increase) for every vehicle, overridden per
+# type ({class name: percentage}) and, more specific still, per brand
+Scenario = namedtuple('Scenario', 'name percentage by_type by_brand', defaults=(0, None, None))
+
+
+def as_scenarios(scenarios):
+    """Scenario tuples for a mix of Scenarios and plain percentages"""
+    return [scenario if isinstance(scenario, Scenario) else Scenario(f"{scenario:g}%", scenario)
+            for scenario in scenarios]
+
+
+def price_scenarios(scenarios, groups):
+    """Results of Fleet.evaluate_scenarios from {(class name, lowercase brand or None): (value, tax)}"""
+    current_value = sum(value for value, _ in groups.values())
+    
+    results = []
+    for scenario in scenarios:
+        by_type = scenario.by_type or {}
+        by_brand = {brand.lower(): percentage for brand, percentage in (scenario.by_brand or {}).items()}
+        value_by_type = {}
+        tax_by_type = {}
+        
+        for (vehicle_type, brand), (value, tax) in groups.items():
+            percentage = by_brand.get(brand, by_type.get(vehicle_type, scenario.percentage))
+            factor = 1 - percentage/100
+            value_by_type[vehicle_type] = value_by_type.get(vehicle_type, 0) + value * factor
+            tax_by_type[vehicle_type] = tax_by_type.get(vehicle_type, 0) + tax * factor
+        
+        total_value = sum(value_by_type.values())
+        results.append({
+            'name': scenario.name,
+            'total_value': total_value,
+            'total_tax': sum(tax_by_type.values()),
+            'change': total_value - current_value,
+            'value_by_type': value_by_type,
+            'tax_by_type': tax_by_type,
+        })
+    
+    return results
+
+# Fleet.group_by(): what vehicles can be grouped by, and the metrics it
+# aggregates ({metric: class name of the only vehicles that have it, or None})
+GROUP_KEYS = ('brand', 'model', 'year', 'type')
+GROUP_METRICS = {'price': None, 'tax': None, 'autonomy': 'ElectricCar', 'load_capacity': 'Truck'}
+
+# Aggregates of one metric over one group; percentiles is {percent: value}
+MetricStats = namedtuple('MetricStats', 'count total mean min max percentiles')
+
+
+def percentile(values, percent):
+    """Linear interpolation between the closest ranks of sorted `values`"""
+    position = (len(values) - 1) * percent / 100
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def metric_stats(values, percentiles=()):
+    """MetricStats of some values, or None if there are none"""
+    values = sorted(values)
+    if not values:
+        return None
+    total = sum(values)
+    return MetricStats(len(values), total, total / len(values), values[0], values[-1],
+                       {percent: percentile(values, percent) for percent in percentiles})
+
+
+def hash_groups(keys, rows):
+    """{key: [rows with that key]} for parallel iterables of keys and rows"""
+    groups = {}
+    for key, row in zip(keys, rows):
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = []
+        group.append(row)
+    return groups
+
+
+def merge_groups(groups, rename):
+    """Combine the groups whose keys have the same rename(key)"""
+    merged = {}
+    for key, rows in groups.items():
+        merged.setdefault(rename(key), []).append(rows)
+    return {key: FilterResult(parts) for key, parts in merged.items()}
+
+
+def first_spelling(strings):
+    """rename() for merge_groups: strings that only differ in case become the first one"""
+    spellings = {}
+    for string in strings:
+        spellings.setdefault(string.lower(), string)
+    return lambda string: spellings[string.lower()]
+
+
+# Fields Fleet keeps ordered indexes for (see Fleet._order_index), and how
+# many of those indexes (one per field, type and brand asked for) it keeps
+ORDER_INDEX_FIELDS = ('price', 'tax', 'registration_date')
+MAX_ORDER_INDEXES = 12
+
+
+class OrderIndex:
+    """Sorted (key, vehicle ID) pairs, kept in chunks of about LOAD pairs
+    
+    A single sorted list would shift every later pair on each insert. Here
+    add() and remove() only touch one chunk (O(log n + LOAD)), and a page
+    starting at any position skips whole chunks to get there, so K pairs
+    from any offset cost O(n / LOAD + K).
+    """
+    LOAD = 1000
+    
+    def __init__(self, items=()):
+        self.reset(items)
+    
+    def reset(self, items):
+        """Replace the contents with `items` (sorted here)"""
+        items = sorted(items)
+        self._chunks = [items[start:start + self.LOAD] for start in range(0, len(items), self.LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]  # last pair of every chunk
+        self._len = len(items)
+    
+    def __len__(self):
+        return self._len
+    
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+    
+    def add(self, item):
+        if not self._chunks:
+            self._chunks.append([item])
+            self._maxes.append(item)
+            self._len = 1
+            return
+        
+        position = bisect_left(self._maxes, item)
+        if position == len(self._maxes):
+            position -= 1
+            self._maxes[position] = item
+        chunk = self._chunks[position]
+        insort(chunk, item)
+        self._len += 1
+        
+        if len(chunk) > 2 * self.LOAD:
+            self._chunks[position:position + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+            self._maxes.insert(position, chunk[self.LOAD - 1])
+    
+    def update(self, items):
+        """Add many pairs; a large batch is merged with one sort instead"""
+        items = list(items)
+        if len(items) > self._len // 8:
+            self.reset(chain(self, items))
+        else:
+            for item in items:
+                self.add(item)
+    
+    def remove(self, item):
+        position = bisect_left(self._maxes, item)
+        chunk = self._chunks[position]
+        del chunk[bisect_left(chunk, item)]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[position]
+            del self._maxes[position]
+        else:
+            self._maxes[position] = chunk[-1]
+    
+    def page(self, offset=0, descending=False):
+        """Iterate the pairs in order (largest first if descending) from position `offset`"""
+        chunks = reversed(self._chunks) if descending else iter(self._chunks)
+        for chunk in chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            if descending:
+                yield from reversed(chunk[:len(chunk) - offset])
+            else:
+                yield from chunk[offset:]
+            offset = 0
+
+
 class Fleet:
-    """Class to manage fleet vehicles"""
-    def __init__(self):
-        self.vehicles = []
+    """Class to manage fleet vehicles
+    
+    Every vehicle added gets a stable `vehicle_id`. Removing a vehicle
+    leaves a tombstone (None) in its slot, so removal by ID is O(1); the
+    tombstones are dropped by compact(), which runs automatically once they
+    make up half of the slots (and can be called periodically).
+    
+    apply_global_discount() only queues a price factor; each vehicle folds
+    the queued factors into its price the next time it is read or changed,
+    and the whole fleet folds them before it is exported or saved.
+    
+    Queries ordered by price, tax or registration date with a limit read
+    an OrderIndex, built on first use and kept current afterwards. Prices
+    are indexed divided by the product of every global adjustment so far
+    (_price_scale): a discount scales every price alike, so it leaves those
+    keys, and the order, as they are.
+    
+    With debug=True every get_summary() call is cross-checked against a
+    full recompute of the running totals.
+    """
+    COMPACT_THRESHOLD = 1024  # minimum tombstones before compacting by itself
+    MAX_ADJUSTMENTS = 32  # queued global adjustments before folding them all
+    
+    def __init__(self, debug=False):
+        self._vehicles = []  # vehicles in insertion order, None for removed ones
+        self._positions = {}  # vehicle_id -> index in _vehicles
+        self._tombstones = 0
+        self._next_id = 1
+        self._adjustments = []  # queued apply_global_discount() price factors
+        self._price_scale = 1  # product of every global adjustment (see _order_key)
+        self.debug = debug
+        self.journal = None  # FleetJournal that records every change, if any
+        
+        # Snapshot loaded by load_snapshot() but not turned into vehicles yet
+        self._snapshot = None
+        
+        # Running totals, so get_summary() doesn't walk the fleet
+        self._total_value = 0
+        self._total_tax = 0
+        self._type_stats = {}  # class name -> [count, value, tax]
+        
+        # Secondary indexes: key -> {vehicle: None} (an insertion-ordered set)
+        self._brand_index = {}  # normalized brand
+        self._name_index = {}  # normalized (brand, model)
+        self._name_words = []  # sorted (word, brand, model) for every word of every name
+        self._last_search = None  # SearchResult narrowed when the search text grows
+        self._year_index = {}
+        self._years = []  # sorted keys of _year_index, for range queries
+        self._type_index = {}  # class name
+        # (field, class name or None, lowercase brand or None) -> OrderIndex,
+        # least recently used first
+        self._order_indexes = {}
+    
+    @property
+    def vehicles(self):
+        """List of vehicles in the fleet (don't modify it directly)"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        if self._tombstones:
+            self.compact()
+        return self._vehicles
+    
+    def __len__(self):
+        if self._snapshot is not None:
+            return len(self._snapshot)
+        return len(self._positions)
+    
+    def __iter__(self):
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        if self._tombstones:
+            return filter(None, self._vehicles)
+        return iter(self._vehicles)
+    
+    def read_vehicles(self):
+        """Iterate the vehicles only to read them
+        
+        A pending snapshot is unpacked straight from the file instead of
+        being materialized, so the vehicles are detached copies: this is for
+        exports and previews, never for code that changes them.
+        """
+        if self._snapshot is not None:
+            return iter(self._snapshot)
+        return iter(self)
+    
+    def get_vehicle(self, vehicle_id):
+        """Vehicle with the given ID, or None"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        position = self._positions.get(vehicle_id)
+        return None if position is None else self._vehicles[position]
+    
+    def compact(self):
+        """Drop the tombstones left by removed vehicles (O(n))"""
+        if self._tombstones:
+            self._vehicles = [vehicle for vehicle in self._vehicles if vehicle is not None]
+            self._positions = {vehicle.vehicle_id: position
+                               for position, vehicle in enumerate(self._vehicles)}
+            self._tombstones = 0
+    
+    def clear(self):
+        """Remove all vehicles from the fleet"""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+        self._fold_adjustments()
+        for vehicle in self:
+            vehicle._fleet = None
+        self._vehicles.clear()
+        self._positions.clear()
+        self._tombstones = 0
+        self._brand_index.clear()
+        self._name_index.clear()
+        self._name_words.clear()
+        self._last_search = None
+        self._year_index.clear()
+        self._years.clear()
+        self._type_index.clear()
+        self._order_indexes.clear()
+        self._price_scale = 1
+        self._total_value = 0
+        self._total_tax = 0
+        self._type_stats.clear()
+        if self.journal is not None:
+            self.journal.record_clear()
+    
+    def close(self):
+        """Release what the fleet holds open (the file of a pending snapshot)"""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+    
+    def _index(self, vehicle):
+        """Add a vehicle to the secondary indexes"""
+        self._brand_index.setdefault(vehicle.brand.lower(), {})[vehicle] = None
+        
+        name = (vehicle.brand.lower(), vehicle.model.lower())
+        bucket = self._name_index.get(name)
+        if bucket is None:
+            bucket = self._name_index[name] = {}
+            self._add_name_words(name)
+        bucket[vehicle] = None
+        
+        self._type_index.setdefault(vehicle.__class__.__name__, {})[vehicle] = None
+        
+        bucket = self._year_index.get(vehicle.year)
+        if bucket is None:
+            bucket = self._year_index[vehicle.year] = {}
+            insort(self._years, vehicle.year)
+        bucket[vehicle] = None
+        
+        if self._order_indexes:
+            self._add_ordered([vehicle])
+    
+    def _unindex(self, vehicle):
+        """Remove a vehicle from the secondary indexes"""
+        for index, key in ((self._brand_index, vehicle.brand.lower()),
+                           (self._name_index, (vehicle.brand.lower(), vehicle.model.lower())),
+                           (self._type_index, vehicle.__class__.__name__),
+                           (self._year_index, vehicle.year)):
+            bucket = index[key]
+            del bucket[vehicle]
+            if not bucket:
+                del index[key]
+                if index is self._year_index:
+                    del self._years[bisect_left(self._years, key)]
+                elif index is self._name_index:
+                    self._remove_name_words(key)
+        
+        if self._order_indexes:
+            self._remove_ordered(vehicle)
+    
+    # Ordered indexes (see OrderIndex)
+    def _order_key(self, field, vehicle):
+        """(key, vehicle ID) of a vehicle in an index ordered by `field`"""
+        if field == 'registration_date':
+            return (vehicle.registered_at, vehicle.vehicle_id)
+        if field == 'tax':
+            # Same operation order as calculate_tax, so tax order matches it
+            return (vehicle._price_key * vehicle.VAT_RATE * vehicle.TAX_MULTIPLIER, vehicle.vehicle_id)
+        return (vehicle._price_key, vehicle.vehicle_id)
+    
+    def _has_price_order(self):
+        return any(field != 'registration_date' for field, _, _ in self._order_indexes)
+    
+    def _add_ordered(self, vehicles):
+        """Add vehicles to the ordered indexes they belong in"""
+        if self._has_price_order():
+            for vehicle in vehicles:
+                vehicle._price_key = vehicle.price / self._price_scale
+        for (field, vehicle_type, brand), index in self._order_indexes.items():
+            index.update(self._order_key(field, vehicle) for vehicle in vehicles
+                         if (vehicle_type is None or vehicle.__class__.__name__ == vehicle_type)
+                         and (brand is None or vehicle.brand.lower() == brand))
+    
+    def _remove_ordered(self, vehicle):
+        """Take a vehicle out of the ordered indexes it is in"""
+        name = vehicle.__class__.__name__
+        for (field, vehicle_type, brand), index in self._order_indexes.items():
+            if (vehicle_type is None or name == vehicle_type) and (brand is None or vehicle.brand.lower() == brand):
+                index.remove(self._order_key(field, vehicle))
+    
+    def _order_index(self, field, vehicle_type=None, brand=None):
+        """OrderIndex of the vehicles of a type and/or brand by `field`, built on first use
+        
+        Within one type tax is a fixed multiple of price, so the price index
+        serves both. Only the MAX_ORDER_INDEXES most recently used indexes
+        are kept up to date; older ones are dropped.
+        """
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        if field == 'tax' and vehicle_type is not None:
+            field = 'price'
+        key = (field, vehicle_type, brand)
+        
+        index = self._order_indexes.pop(key, None)
+        if index is None:
+            if field != 'registration_date' and not self._has_price_order():
+                for vehicle in self:
+                    vehicle._price_key = vehicle.price / self._price_scale
+            if brand is not None:
+                vehicles = self._brand_index.get(brand, ())
+                if vehicle_type is not None:
+                    vehicles = [vehicle for vehicle in vehicles if vehicle.__class__.__name__ == vehicle_type]
+            elif vehicle_type is not None:
+                vehicles = self._type_index.get(vehicle_type, ())
+            else:
+                vehicles = self
+            index = OrderIndex(self._order_key(field, vehicle) for vehicle in vehicles)
+            if len(self._order_indexes) >= MAX_ORDER_INDEXES:
+                del self._order_indexes[next(iter(self._order_indexes))]
+        self._order_indexes[key] = index
+        return index
+    
+    def _add_name_words(self, name):
+        """Add the words of a new (brand, model) name to the search index"""
+        for word in set(' '.join(name).split()):
+            insort(self._name_words, (word,) + name)
+        self._last_search = None
+    
+    def _remove_name_words(self, name):
+        """Remove the words of a (brand, model) name nobody has any more"""
+        for word in set(' '.join(name).split()):
+            del self._name_words[bisect_left(self._name_words, (word,) + name)]
+        self._last_search = None
+    
+    def _count(self, vehicle, sign=1):
+        """Add (sign=1) or subtract (sign=-1) a vehicle from the running totals"""
+        vehicle_type = vehicle.__class__.__name__
+        price = vehicle.price
+        tax = vehicle.calculate_tax()
+        
+        stats = self._type_stats.get(vehicle_type)
+        if stats is None:
+            stats = self._type_stats[vehicle_type] = [0, 0, 0]
+        stats[0] += sign
+        
+        if stats[0] == 0:
+            del self._type_stats[vehicle_type]
+        else:
+            stats[1] += sign * price
+            stats[2] += sign * tax
+        
+        if self._type_stats:
+            self._total_value += sign * price
+            self._total_tax += sign * tax
+        else:
+            # Don't leave rounding leftovers behind in an empty fleet
+            self._total_value = 0
+            self._total_tax = 0
+    
+    def _register(self, vehicle, vehicle_id=None):
+        """Give a vehicle its ID (a new one unless vehicle_id is given) and a slot at the end of the fleet"""
+        if vehicle._fleet is not None:
+            vehicle._fleet._fold(vehicle)  # keep discounts queued by a previous fleet
+        if vehicle_id is None:
+            vehicle_id = self._next_id
+            self._next_id += 1
+        else:
+            self._next_id = max(self._next_id, vehicle_id + 1)
+        vehicle.vehicle_id = vehicle_id
+        self._positions[vehicle.vehicle_id] = len(self._vehicles)
+        self._vehicles.append(vehicle)
+        vehicle._fleet = self
+        vehicle._epoch = len(self._adjustments)
+    
+    def _remove(self, vehicle_id):
+        """Replace a vehicle by a tombstone and take it out of indexes and totals"""
+        position = self._positions.pop(vehicle_id, None)
+        if position is None:
+            return None
+        
+        vehicle = self._vehicles[position]
+        self._vehicles[position] = None
+        self._tombstones += 1
+        self._unindex(vehicle)
+        self._count(vehicle, -1)  # reads vehicle.price, which folds the adjustments
+        vehicle._fleet = None
+        if self.journal is not None:
+            self.journal.record_remove(vehicle_id)
+        return vehicle
+    
+    def _maybe_compact(self):
+        if self._tombstones > self.COMPACT_THRESHOLD and self._tombstones * 2 > len(self._vehicles):
+            self.compact()
+    
+    def _set_price(self, vehicle, price):
+        """Change the price of a vehicle in this fleet (see Vehicle.price)"""
+        self._count(vehicle, -1)
+        if self._order_indexes:
+            self._remove_ordered(vehicle)
+        vehicle._price = price
+        vehicle._tax = None
+        vehicle._epoch = len(self._adjustments)
+        self._count(vehicle)
+        if self._order_indexes:
+            self._add_ordered([vehicle])
+        if self.journal is not None:
+            self.journal.record_price(vehicle.vehicle_id, price)
     
     @log_operation
     def add_vehicle(self, vehicle):
         """Add a vehicle to the fleet"""
-        self.vehicles.append(vehicle)
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        self._register(vehicle)
+        self._index(vehicle)
+        self._count(vehicle)
+        if self.journal is not None:
+            self.journal.record_add([vehicle])
         return True
     
+    @log_operation
+    def add_vehicles(self, vehicles):
+        """Add many vehicles at once
+        
+        The vehicles are grouped by brand, name, year and type first, so each
+        index bucket and running total is updated once per batch.
+        """
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        vehicles = list(vehicles)
+        self._add_batch(vehicles)
+        if self.journal is not None:
+            self.journal.record_add(vehicles)
+        return len(vehicles)
+    
+    def _add_batch(self, vehicles, keep_ids=False):
+        """Register, index and count a list of vehicles (see add_vehicles)"""
+        by_brand = {}
+        by_name = {}
+        by_year = {}
+        by_type = {}
+        lowered = {}  # brands are interned, so lower() each one only once
+        for vehicle in vehicles:
+            brand = lowered.get(vehicle.brand)
+            if brand is None:
+                brand = lowered[vehicle.brand] = vehicle.brand.lower()
+            by_brand.setdefault(brand, []).append(vehicle)
+            by_name.setdefault((brand, vehicle.model), []).append(vehicle)
+            by_year.setdefault(vehicle.year, []).append(vehicle)
+            by_type.setdefault(vehicle.__class__.__name__, []).append(vehicle)
+            self._register(vehicle, vehicle.vehicle_id if keep_ids else None)
+        
+        for brand, group in by_brand.items():
+            self._brand_index.setdefault(brand, {}).update(dict.fromkeys(group))
+        
+        for (brand, model), group in by_name.items():
+            name = (brand, model.lower())
+            bucket = self._name_index.get(name)
+            if bucket is None:
+                bucket = self._name_index[name] = {}
+                self._add_name_words(name)
+            bucket.update(dict.fromkeys(group))
+        
+        for year, group in by_year.items():
+            bucket = self._year_index.get(year)
+            if bucket is None:
+                bucket = self._year_index[year] = {}
+                insort(self._years, year)
+            bucket.update(dict.fromkeys(group))
+        
+        for vehicle_type, group in by_type.items():
+            self._type_index.setdefault(vehicle_type, {}).update(dict.fromkeys(group))
+            
+            value = sum(vehicle.price for vehicle in group)
+            tax = sum(vehicle.calculate_tax() for vehicle in group)
+            stats = self._type_stats.setdefault(vehicle_type, [0, 0, 0])
+            stats[0] += len(group)
+            stats[1] += value
+            stats[2] += tax
+            self._total_value += value
+            self._total_tax += tax
+        
+        if self._order_indexes:
+            self._add_ordered(vehicles)
+    
     @log_operation
     def remove_vehicle(self, index):
-        """Remove a vehicle from the fleet by index"""
-        if 0 <= index < len(self.vehicles):
-            return self.vehicles.pop(index)
+        """Remove a vehicle from the fleet by index (position in fleet.vehicles)"""
+        vehicles = self.vehicles
+        if 0 <= index < len(vehicles):
+            vehicle = self._remove(vehicles[index].vehicle_id)
+            self._maybe_compact()
+            return vehicle
         return None
     
+    @log_operation
+    def remove_vehicle_by_id(self, vehicle_id):
+        """Remove a vehicle by its ID in O(1); returns it, or None"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        vehicle = self._remove(vehicle_id)
+        self._maybe_compact()
+        return vehicle
+    
+    @log_operation
+    def remove_vehicles(self, vehicle_ids):
+        """Remove many vehicles by ID; returns the ones that were removed"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        removed = [vehicle for vehicle in map(self._remove, vehicle_ids) if vehicle is not None]
+        self._maybe_compact()
+        return removed
+    
     # LAMBDA FUNCTION FOR DISCOUNTS/TAXES
     def apply_global_discount(self, percentage):
-        """Apply a percentage discount/adjustment to all vehicles"""
+        """Apply a percentage discount/adjustment to all vehicles (O(1))
+        
+        The factor is queued and folded into each price lazily (see _fold).
+        """
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        
         # Using lambda to apply discount
         adjust_price = lambda price, perc: price * (1 - perc/100)
         
-        for vehicle in self.vehicles:
-            vehicle.price = adjust_price(vehicle.price, percentage)
+        # Every price scales alike, so the ordered indexes keep their order
+        # (see _order_key); a factor of 0 or less would collapse or reverse it
+        factor = adjust_price(1, percentage)
+        if factor > 0:
+            self._price_scale *= factor
+        else:
+            self._order_indexes = {key: index for key, index in self._order_indexes.items()
+                                   if key[0] == 'registration_date'}
+            self._price_scale = 1
+        self._adjustments.append(factor)
+        if len(self._adjustments) > self.MAX_ADJUSTMENTS:
+            self._fold_adjustments()
+        
+        # Every price (and tax) scales by the same factor, so do the totals
+        self._total_value = adjust_price(self._total_value, percentage)
+        self._total_tax = adjust_price(self._total_tax, percentage)
+        for stats in self._type_stats.values():
+            stats[1] = adjust_price(stats[1], percentage)
+            stats[2] = adjust_price(stats[2], percentage)
+        
+        if self.journal is not None:
+            self.journal.record_discount(percentage)
+        return len(self)
+    
+    def preview_discount(self, percentage):
+        """Totals apply_global_discount(percentage) would give, from the summary"""
+        adjust_price = lambda price, perc: price * (1 - perc/100)
+        summary = self.get_summary()
+        return {
+            'total': summary['total'],
+            'total_value': summary['total_value'],
+            'new_total_value': adjust_price(summary['total_value'], percentage),
+            'total_tax': summary['total_tax'],
+            'new_total_tax': adjust_price(summary['total_tax'], percentage),
+        }
+    
+    def evaluate_scenarios(self, scenarios):
+        """Totals for many discount scenarios at once, without changing the fleet
+        
+        `scenarios` holds Scenario tuples or plain percentages. The fleet is
+        reduced once to value/tax totals per type (and per brand, if any
+        scenario needs it); each scenario then only scales those group totals.
+        Returns one dict per scenario with the name, total_value, total_tax,
+        change and value_by_type/tax_by_type.
+        """
+        scenarios = as_scenarios(scenarios)
+        groups = self._scenario_groups(any(scenario.by_brand for scenario in scenarios))
+        return price_scenarios(scenarios, groups)
+    
+    def group_by(self, key, metrics=('price', 'tax'), percentiles=(50, 90), bucket=None):
+        """Aggregate statistics of the vehicles per group
+        
+        `key` is one of GROUP_KEYS or a function of a vehicle; brands and
+        models that only differ in case are one group. With bucket=N years are
+        grouped N at a time (2020 holds 2020-2024 for N=5).
+        
+        Groups come from the indexes where there is one (brand, year, type)
+        and from a single hashing pass otherwise; each group's values of a
+        metric (see GROUP_METRICS) are then sorted once for min, max and
+        percentiles.
+        
+        Returns {group: {'count': vehicles, metric: MetricStats}} ordered by
+        group; a metric is None in groups where no vehicle has it.
+        """
+        if not callable(key) and key not in GROUP_KEYS:
+            raise ValueError(f"Cannot group by {key!r}, use one of: {', '.join(GROUP_KEYS)}")
+        unknown = [metric for metric in metrics if metric not in GROUP_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+        if bucket is not None and key != 'year':
+            raise ValueError("Only years can be grouped in buckets")
+        
+        groups = self._group_rows(key)
+        if bucket is not None:
+            groups = merge_groups(groups, lambda year: year - year % bucket)
+        getters = {metric: self._metric_getter(metric) for metric in metrics}
+        
+        results = {}
+        for group in sorted(groups):
+            rows = groups[group]
+            stats = results[group] = {'count': len(rows)}
+            for metric, getter in getters.items():
+                values = map(getter, rows)
+                if GROUP_METRICS[metric] is not None:
+                    values = filter(partial(is_not, None), values)
+                stats[metric] = metric_stats(values, percentiles)
+        return results
+    
+    def _group_rows(self, key):
+        """{group: vehicles} for group_by, straight from the indexes when possible"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        if key == 'year':
+            return self._year_index
+        if key == 'type':
+            return self._type_index
+        if key == 'brand':
+            # Index keys are lowercase: show the spelling of the first vehicle
+            return {next(iter(bucket)).brand: bucket for bucket in self._brand_index.values()}
+        
+        groups = hash_groups(map(attrgetter(key) if key == 'model' else key, self), self)
+        if key == 'model':
+            groups = merge_groups(groups, first_spelling(groups))
+        return groups
+    
+    def _metric_getter(self, metric):
+        """getter(vehicle) for a GROUP_METRICS metric (None if the vehicle has none)"""
+        self._fold_adjustments()
+        if metric == 'price':
+            return attrgetter('_price')
+        if metric == 'tax':
+            return methodcaller('calculate_tax')
+        return lambda vehicle: getattr(vehicle, metric, None)
+    
+    def _scenario_groups(self, by_brand):
+        """{(class name, lowercase brand or None): (value, tax)} for evaluate_scenarios"""
+        if not by_brand:
+            # Straight from the running totals (O(1))
+            summary = self.get_summary()
+            return {(vehicle_type, None): (value, summary['tax_by_type'][vehicle_type])
+                    for vehicle_type, value in summary['value_by_type'].items()}
+        
+        groups = {}
+        for vehicle in self:
+            key = (vehicle.__class__.__name__, vehicle.brand.lower())
+            value, tax = groups.get(key, (0, 0))
+            groups[key] = (value + vehicle.price, tax + vehicle.calculate_tax())
+        return groups
+    
+    def _shared_columns(self):
+        """({column: array} for SHARED_COLUMNS, brand names, model names)"""
+        self._fold_adjustments()
+        vehicles = self.vehicles
+        brands = StringDictionary()
+        models = StringDictionary()
+        columns = {
+            'price': array('d', map(attrgetter('_price'), vehicles)),
+            'autonomy': array('d', (getattr(vehicle, 'autonomy', 0) for vehicle in vehicles)),
+            'load_capacity': array('d', (getattr(vehicle, 'load_capacity', 0) for vehicle in vehicles)),
+            'year': array('i', map(attrgetter('year'), vehicles)),
+            'brand': array('I', map(brands.encode, map(attrgetter('brand'), vehicles))),
+            'model': array('I', map(models.encode, map(attrgetter('model'), vehicles))),
+            'type': array('b', (VEHICLE_TYPE_CODES[vehicle.__class__.__name__] for vehicle in vehicles)),
+        }
+        return columns, brands.values, models.values
+    
+    def _fold(self, vehicle):
+        """Apply the queued global adjustments the vehicle hasn't seen yet
+        
+        Factors are multiplied in one at a time, in order, so the price ends up
+        exactly as if every discount had been applied to it right away.
+        """
+        adjustments = self._adjustments
+        if vehicle._epoch == len(adjustments):
+            return
+        price = vehicle._price
+        for factor in adjustments[vehicle._epoch:]:
+            price = price * factor
+        vehicle._price = price
+        vehicle._tax = None
+        vehicle._epoch = len(adjustments)
+    
+    def _fold_adjustments(self):
+        """Fold the queued global adjustments into every vehicle (O(n))"""
+        if not self._adjustments:
+            return
+        for vehicle in self:
+            self._fold(vehicle)
+            vehicle._epoch = 0
+        self._adjustments = []
+    
+    def compute_taxes(self):
+        """Tax of every vehicle in fleet order, as an array('d')
+        
+        Computed in one pass straight from the prices, with the same
+        operations as Vehicle.calculate_tax (the per-vehicle cache is skipped).
+        """
+        self._fold_adjustments()
+        vehicles = self.vehicles
+        base_taxes = map(mul, map(attrgetter('_price'), vehicles), map(attrgetter('VAT_RATE'), vehicles))
+        return array('d', map(mul, base_taxes, map(attrgetter('TAX_MULTIPLIER'), vehicles)))
+    
+    # INDEXED FILTERING
+    def filter_by_brand(self, brand):
+        """Filter vehicles by brand (case-insensitive hash lookup)"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        bucket = self._brand_index.get(brand.lower())
+        return FilterResult([bucket] if bucket else [])
+    
+    def filter_by_year(self, min_year):
+        """Filter vehicles by minimum year (ordered by year)"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        start = bisect_left(self._years, min_year)
+        return FilterResult([self._year_index[year] for year in self._years[start:]])
+    
+    def filter_by_type(self, vehicle_type):
+        """Filter vehicles by type (class)"""
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        bucket = self._type_index.get(vehicle_type)
+        return FilterResult([bucket] if bucket else [])
+    
+    def search(self, text):
+        """Vehicles whose brand/model words start with every word of `text`
+        
+        Meant to run on every keystroke: the work only depends on the number
+        of distinct (brand, model) names, never on the number of vehicles.
+        The first word is looked up in a sorted word list with bisect, and
+        when `text` extends the previous search only its names are rechecked.
+        """
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        text = text.lower()
+        words = text.split()
+        
+        last = self._last_search
+        if not words:
+            names = sorted(self._name_index)
+        elif last is not None and text.startswith(last.text):
+            names = [name for name in last.names if name_matches(name, words)]
+        else:
+            prefix = max(words, key=len)
+            start = bisect_left(self._name_words, (prefix,))
+            stop = bisect_left(self._name_words, (prefix + '\U0010ffff',))
+            names = sorted({(brand, model) for _, brand, model in self._name_words[start:stop]
+                            if name_matches((brand, model), words)})
+        
+        result = self._last_search = SearchResult(
+            text, names, [self._name_index[name] for name in names])
+        return result
+    
+    def query(self):
+        """Start a FleetQuery over this fleet"""
+        return FleetQuery(self)
+    
+    def _query_plan(self, query):
+        """Start a query from the index with the fewest candidates
+        
+        The brand, name, year and type index bucket sizes give the exact number
+        of candidates each index would produce, so picking the smallest is cheap.
+        Without a usable index the plan is a full scan.
+        """
+        if self._snapshot is not None:
+            self._materialize_snapshot()
+        plans = [QueryPlan("full scan", len(self), self, (), False)]
+        
+        if query.brand_name is not None:
+            bucket = self._brand_index.get(query.brand_name)
+            buckets = [bucket] if bucket and query.brand_matches(query.brand_name) else []
+            plans.append(QueryPlan("brand index", sum(map(len, buckets)),
+                                   FilterResult(buckets), ('brand',), False))
+        elif query.prefix is not None:
+            buckets = [bucket for brand, bucket in self._brand_index.items()
+                       if brand.startswith(query.prefix)]
+            plans.append(QueryPlan("brand prefix index", sum(map(len, buckets)),
+                                   FilterResult(buckets), ('brand',), False))
+        
+        if query.search_text is not None:
+            found = self.search(query.search_text)
+            plans.append(QueryPlan("name index", len(found), found, ('search',), False))
+        
+        if query.min_year is not None or query.max_year is not None:
+            start = 0 if query.min_year is None else bisect_left(self._years, query.min_year)
+            stop = None if query.max_year is None else bisect_right(self._years, query.max_year)
+            years = self._years[start:stop]
+            if query.descending:
+                years.reverse()
+            buckets = [self._year_index[year] for year in years]
+            plans.append(QueryPlan("year index", sum(map(len, buckets)), FilterResult(buckets),
+                                   ('year',), query.order_field == 'year'))
+        
+        allowed = query.allowed_types()
+        if allowed is not None:
+            buckets = [self._type_index[name] for name in allowed if name in self._type_index]
+            plans.append(QueryPlan("type index", sum(map(len, buckets)),
+                                   FilterResult(buckets), ('type',), False))
+        
+        best = min(plans, key=attrgetter('estimate'))
+        if query.order_field in ORDER_INDEX_FIELDS and query.max_rows is not None:
+            ordered = self._ordered_plan(query, best.estimate)
+            if ordered.estimate < best.estimate:
+                return ordered
+        return best
+    
+    def _ordered_plan(self, query, matches):
+        """Plan that reads an ordered index and stops after the rows a limited query needs
+        
+        With about `matches` candidates spread evenly over the index, it
+        reads (offset + limit) * size / matches entries, which is its
+        estimate. The index is restricted to the query's type and brand when
+        it asks for a single one.
+        """
+        allowed = query.allowed_types()
+        vehicle_type = next(iter(allowed)) if allowed is not None and len(allowed) == 1 else None
+        brand = query.brand_name
+        
+        covered = []
+        if vehicle_type is not None:
+            size = len(self._type_index.get(vehicle_type, ()))
+            covered.append('type')
+        else:
+            size = len(self)
+        if brand is not None:
+            size = min(size, len(self._brand_index.get(brand, ())))
+            if query.prefix is None or brand.startswith(query.prefix):
+                covered.append('brand')
+        
+        wanted = query.offset + query.max_rows
+        estimate = min(size, -(-wanted * size // max(matches, 1)))
+        
+        def candidates():
+            index = self._order_index(query.order_field, vehicle_type, brand)
+            vehicles = self._vehicles
+            positions = self._positions
+            for _, vehicle_id in index.page(descending=query.descending):
+                yield vehicles[positions[vehicle_id]]
+        
+        description = f"{query.order_field} order index"
+        return QueryPlan(description, estimate, candidates(), tuple(covered), True)
+    
+    # FILE WRITING
+    def export_inventory(self, filename, format_type='csv', chunk_size=1000, workers=1, progress=None):
+        """Export inventory to file (txt, csv, or json)
+        
+        Vehicles are streamed to the file chunk_size at a time and the totals
+        are gathered in the same pass, so memory use doesn't grow with the
+        fleet. Filenames ending in '.gz' are written gzip-compressed.
+        
+        With workers > 1 the rows are formatted by a process pool in shards
+        of chunk_size vehicles; the file is byte-identical to a serial export.
+        
+        progress(done, total) is called after every chunk; it can raise
+        OperationCancelled to stop the export.
+        """
+        return self.export_inventories({filename: format_type}, chunk_size, workers, progress)
+    
+    def export_inventories(self, targets, chunk_size=1000, workers=1, progress=None):
+        """Export the inventory to several files at once, in a single pass
+        
+        `targets` maps each filename to its format (txt, csv or json). Each
+        chunk of vehicle rows (to_dict(), which computes the tax) and the
+        totals are built once and formatted by the writer of every file, so
+        the files match what separate export_inventory() calls would write.
+        With workers > 1 each shard is formatted in every format by the same
+        worker process, from the same rows.
+        
+        progress(done, total) is called after every chunk; it can raise
+        OperationCancelled to stop the export.
+        """
+        if not len(self):
+            return False, "No vehicles to export!"
+        
+        format_types = list(targets.values())
+        writer_classes = [EXPORT_WRITERS.get(format_type) for format_type in format_types]
+        if None in writer_classes:
+            return False, "Unsupported format!"
+        
+        names = ", ".join(f"'{filename}'" for filename in targets)
+        try:
+            self._fold_adjustments()
+            export_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            with ExitStack() as stack:
+                outputs = []
+                for filename, writer_class in zip(targets, writer_classes):
+                    file = stack.enter_context(open_export_file(filename, writer_class.newline))
+                    writer = writer_class(export_date)
+                    file.write(writer.header())
+                    outputs.append((file, writer))
+                
+                if workers > 1:
+                    count, total_value, total_tax = self._export_parallel(
+                        [file for file, _ in outputs], format_types, export_date, chunk_size, workers, progress)
+                    for file, writer in outputs:
+                        file.write(writer.footer(count, total_value, total_tax))
+                    return True, f"Inventory exported successfully to {names}!"
+                
+                count = 0
+                total_value = 0
+                total_tax = 0
+                chunk = []
+                
+                for vehicle in self.read_vehicles():
+                    row = vehicle.to_dict()
+                    total_value += row['price']
+                    total_tax += row['tax']
+                    chunk.append(row)
+                    
+                    if len(chunk) == chunk_size:
+                        for file, writer in outputs:
+                            file.write(writer.format_chunk(count + 1, chunk))
+                        count += len(chunk)
+                        chunk = []
+                        if progress is not None:
+                            progress(count, len(self))
+                
+                if chunk:
+                    for file, writer in outputs:
+                        file.write(writer.format_chunk(count + 1, chunk))
+                    count += len(chunk)
+                
+                for file, writer in outputs:
+                    file.write(writer.footer(count, total_value, total_tax))
+            
+            return True, f"Inventory exported successfully to {names}!"
+        
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return False, f"Error exporting inventory: {str(e)}"
+    
+    def _export_parallel(self, files, format_types, export_date, shard_size, workers, progress=None):
+        """Format shards of the fleet in worker processes and write them in order
+        
+        Every shard comes back formatted once per file (see
+        format_export_shard). Returns (count, total_value, total_tax). The
+        totals are summed here, in fleet order, so they match a serial export
+        to the last digit.
+        """
+        count = 0
+        total_value = 0
+        total_tax = 0
+        
+        def write(texts):
+            for file, text in zip(files, texts):
+                file.write(text)
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            shard = []
+            
+            for vehicle in self.read_vehicles():
+                shard.append(vehicle.to_record())
+                total_value += vehicle.price
+                total_tax += vehicle.calculate_tax()
+                
+                if len(shard) == shard_size:
+                    pending.append(executor.submit(
+                        format_export_shard, format_types, export_date, count + 1, shard))
+                    count += len(shard)
+                    shard = []
+                    
+                    # Keep a bounded number of shards in flight
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                        if progress is not None:
+                            progress(count - len(pending) * shard_size, len(self))
+            
+            if shard:
+                pending.append(executor.submit(
+                    format_export_shard, format_types, export_date, count + 1, shard))
+                count += len(shard)
+            
+            while pending:
+                write(pending.popleft().result())
+                if progress is not None:
+                    progress(max(0, count - len(pending) * shard_size), len(self))
+        
+        return count, total_value, total_tax
+    
+    # FILE READING
+    def import_inventory(self, filename, format_type=None, batch_size=1000, progress=None):
+        """Import vehicles from a csv or json file written by export_inventory
+        
+        The file is read as a stream and vehicles are added batch_size at a
+        time through add_vehicles(). The format is taken from the file
+        extension ('.gz' files are decompressed) unless format_type is given.
+        
+        progress(done, 0) is called after every batch (the total isn't known
+        up front); it can raise OperationCancelled to stop the import, keeping
+        the batches already added.
+        """
+        if format_type is None:
+            format_type = filename.removesuffix('.gz').rpartition('.')[2]
+        
+        if format_type not in ('csv', 'json'):
+            return False, "Unsupported format!"
+        
+        try:
+            count = 0
+            with open_import_file(filename) as file:
+                rows = csv.DictReader(file) if format_type == 'csv' else iter_json_vehicles(file)
+                vehicles = map(vehicle_from_dict, rows)
+                
+                while True:
+                    batch = list(islice(vehicles, batch_size))
+                    if not batch:
+                        break
+                    count += self.add_vehicles(batch)
+                    if progress is not None:
+                        progress(count, 0)
+            
+            return True, f"Imported {count} vehicles from '{filename}'!"
+        
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return False, f"Error importing inventory: {str(e)}"
+    
+    # BINARY SNAPSHOTS
+    def save_snapshot(self, filename):
+        """Save the fleet to a binary snapshot file (see write_snapshot)
+        
+        The file is written under a temporary name and renamed over
+        `filename`, as in FleetJournal.checkpoint(), so the file is never
+        left half written.
+        """
+        temporary = filename + '.tmp'
+        try:
+            if self._snapshot is not None:
+                self._materialize_snapshot()  # it may map the file about to be replaced
+            self._fold_adjustments()
+            write_snapshot(temporary, self)
+            os.replace(temporary, filename)
+            return True, f"Snapshot saved to '{filename}'!"
+        except Exception as e:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False, f"Error saving snapshot: {str(e)}"
+    
+    @classmethod
+    def load_snapshot(cls, filename):
+        """Load a fleet saved with save_snapshot()
+        
+        The file is only mapped in memory: len(), exports and get_summary()
+        read it directly, and vehicle objects (with their indexes and
+        running totals) are built the first time something needs them, e.g.
+        iteration, a filter or a change to the fleet.
+        """
+        fleet = cls()
+        fleet._snapshot = FleetSnapshot(filename)
+        fleet._next_id = fleet._snapshot.next_id
+        return fleet
+    
+    def _materialize_snapshot(self):
+        """Turn the pending snapshot into regular vehicles"""
+        snapshot = self._snapshot
+        self._snapshot = None
+        self._add_batch(list(snapshot), keep_ids=True)  # saved IDs (None in old files)
+        snapshot.close()
+    
+    def get_summary(self):
+        """Get fleet summary statistics from the running totals (O(1))"""
+        if self._snapshot is not None:
+            return self._snapshot.get_summary()
+        
+        summary = {
+            'total': len(self),
+            'total_value': self._total_value,
+            'total_tax': self._total_tax,
+            'by_type': {name: stats[0] for name, stats in self._type_stats.items()},
+            'value_by_type': {name: stats[1] for name, stats in self._type_stats.items()},
+            'tax_by_type': {name: stats[2] for name, stats in self._type_stats.items()}
+        }
+        
+        if self.debug:
+            self._check_summary(summary)
+        
+        return summary
+    
+    def _recompute_summary(self):
+        """Get fleet summary statistics by walking every vehicle"""
+        taxes = self.compute_taxes()
+        summary = {
+            'total': len(self.vehicles),
+            'total_value': sum(v.price for v in self.vehicles),
+            'total_tax': sum(taxes),
+            'by_type': {},
+            'value_by_type': {},
+            'tax_by_type': {}
+        }
+        
+        for vehicle, tax in zip(self.vehicles, taxes):
+            vehicle_type = vehicle.__class__.__name__
+            if vehicle_type not in summary['by_type']:
+                summary['by_type'][vehicle_type] = 0
+                summary['value_by_type'][vehicle_type] = 0
+                summary['tax_by_type'][vehicle_type] = 0
+            summary['by_type'][vehicle_type] += 1
+            summary['value_by_type'][vehicle_type] += vehicle.price
+            summary['tax_by_type'][vehicle_type] += tax
+        
+        return summary
+    
+    def _check_summary(self, summary):
+        """Raise AssertionError if the running totals drifted from a full recompute"""
+        expected = self._recompute_summary()
+        
+        if summary['total'] != expected['total'] or summary['by_type'] != expected['by_type']:
+            raise AssertionError(f"Vehicle counts out of sync: {summary} != {expected}")
+        
+        values = [(summary['total_value'], expected['total_value']),
+                  (summary['total_tax'], expected['total_tax'])]
+        for key in ('value_by_type', 'tax_by_type'):
+            values += [(summary[key][name], expected[key][name]) for name in expected[key]]
+        
+        for value, expected_value in values:
+            if not math.isclose(value, expected_value, rel_tol=1e-9, abs_tol=1e-6):
+                raise AssertionError(f"Running totals out of sync: {summary} != {expected}")
+
+
+# ============================================
+# 3.1 COLUMNAR FLEET (array-backed storage)
+# ============================================
+class StringDictionary:
+    """Dictionary encoding for repeated strings (brand/model columns)"""
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+    
+    def encode(self, value):
+        """Return the integer code for a string, adding it if needed"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+    
+    def clear(self):
+        self.values.clear()
+        self.codes.clear()
+
+
+class ColumnarFleet(Fleet):
+    """Fleet that stores vehicles as contiguous typed columns
+    
+    Each attribute lives in its own array (one entry per vehicle) and
+    brand/model are dictionary-encoded, so no Vehicle object is kept per
+    row. Vehicles are only materialized when they are read back through
+    `vehicles` or the filter methods (changes to those copies are not
+    written back to the fleet, and numeric attributes come back as floats).
+    
+    As in Fleet, every vehicle added gets a new `vehicle_id` (an ID it had
+    in another fleet is replaced); only load_snapshot() keeps the saved IDs.
+    _positions maps each ID to its row.
+    """
+    def __init__(self, debug=False):
+        super().__init__(debug=debug)
+        # The `vehicles` list of Fleet is replaced by the columns below
+        self.brands = StringDictionary()
+        self.models = StringDictionary()
+        self._type = array('b')
+        self._brand = array('I')
+        self._model = array('I')
+        self._price = array('d')
+        self._year = array('i')
+        self._tax_multiplier = array('d')
+        self._battery_capacity = array('d')
+        self._autonomy = array('d')
+        self._load_capacity = array('d')
+        self._length = array('d')
+        self._registration = array('q')  # POSIX timestamps
+        self._ids = array('q')  # stable vehicle IDs
+    
+    def _columns(self):
+        return (self._type, self._brand, self._model, self._price, self._year,
+                self._tax_multiplier, self._battery_capacity, self._autonomy,
+                self._load_capacity, self._length, self._registration, self._ids)
+    
+    def __len__(self):
+        return len(self._type)
+    
+    @property
+    def vehicles(self):
+        """Materialize every vehicle (O(n), prefer the columnar methods)"""
+        return [self._materialize(i) for i in range(len(self))]
+    
+    def __iter__(self):
+        """Materialize the vehicles one at a time"""
+        return map(self._materialize, range(len(self)))
+    
+    def _materialize(self, i):
+        """Build a Vehicle object from row i"""
+        cls = VEHICLE_CLASSES[self._type[i]]
+        brand = self.brands.values[self._brand[i]]
+        model = self.models.values[self._model[i]]
+        if cls is ElectricCar:
+            vehicle = ElectricCar(brand, model, self._price[i], self._year[i],
+                                  self._battery_capacity[i], self._autonomy[i])
+        elif cls is Truck:
+            vehicle = Truck(brand, model, self._price[i], self._year[i],
+                            self._load_capacity[i], self._length[i])
+        else:
+            vehicle = Vehicle(brand, model, self._price[i], self._year[i])
+        vehicle.registered_at = self._registration[i]
+        vehicle.vehicle_id = self._ids[i]
+        return vehicle
+    
+    def _select(self, mask):
+        """Materialize the rows where mask is true"""
+        return [self._materialize(i) for i in compress(range(len(self)), mask)]
+    
+    def clear(self):
+        """Remove all vehicles from the fleet"""
+        for column in self._columns():
+            del column[:]
+        self.brands.clear()
+        self.models.clear()
+        self._positions.clear()
+        if self.journal is not None:
+            self.journal.record_clear()
+    
+    @classmethod
+    def load_snapshot(cls, filename):
+        """Load a fleet saved with save_snapshot() straight into columns"""
+        fleet = cls()
+        snapshot = FleetSnapshot(filename)
+        try:
+            for vehicle in snapshot:
+                fleet._append(vehicle, vehicle.vehicle_id)  # saved IDs (None in old files)
+        finally:
+            snapshot.close()
+        return fleet
+    
+    @log_operation
+    def add_vehicle(self, vehicle):
+        """Add a vehicle to the fleet"""
+        self._append(vehicle)
+        if self.journal is not None:
+            self.journal.record_add([vehicle])
+        return True
+    
+    @log_operation
+    def add_vehicles(self, vehicles):
+        """Add many vehicles at once"""
+        vehicles = list(vehicles)
+        for vehicle in vehicles:
+            self._append(vehicle)
+        if self.journal is not None:
+            self.journal.record_add(vehicles)
+        return len(vehicles)
+    
+    def _append(self, vehicle, vehicle_id=None):
+        """Append a vehicle to the columns, with a new ID unless vehicle_id is given"""
+        code = VEHICLE_TYPE_CODES.get(vehicle.__class__.__name__)
+        if code is None:
+            raise TypeError(f"Unsupported vehicle type: {vehicle.__class__.__name__}")
+        
+        self._type.append(code)
+        self._brand.append(self.brands.encode(vehicle.brand))
+        self._model.append(self.models.encode(vehicle.model))
+        self._price.append(vehicle.price)
+        self._year.append(vehicle.year)
+        self._tax_multiplier.append(vehicle.TAX_MULTIPLIER)
+        self._battery_capacity.append(getattr(vehicle, 'battery_capacity', 0.0))
+        self._autonomy.append(getattr(vehicle, 'autonomy', 0.0))
+        self._load_capacity.append(getattr(vehicle, 'load_capacity', 0.0))
+        self._length.append(getattr(vehicle, 'length', 0.0))
+        self._registration.append(vehicle.registered_at)
+        if vehicle_id is None:
+            vehicle_id = self._next_id
+            self._next_id += 1
+        else:
+            self._next_id = max(self._next_id, vehicle_id + 1)
+        self._positions[vehicle_id] = len(self._ids)
+        self._ids.append(vehicle_id)
+        vehicle.vehicle_id = vehicle_id
+    
+    def _delete_row(self, index):
+        """Delete row `index` from every column; returns the vehicle it held"""
+        vehicle = self._materialize(index)
+        for column in self._columns():
+            del column[index]
+        # Rows after it moved up by one
+        positions = self._positions
+        del positions[vehicle.vehicle_id]
+        for row in range(index, len(self._ids)):
+            positions[self._ids[row]] = row
+        if self.journal is not None:
+            self.journal.record_remove(vehicle.vehicle_id)
+        return vehicle
+    
+    def get_vehicle(self, vehicle_id):
+        """Vehicle with the given ID, or None"""
+        index = self._positions.get(vehicle_id)
+        return None if index is None else self._materialize(index)
+    
+    def compact(self):
+        """Nothing to do: removed rows are deleted from the columns right away"""
+    
+    def close(self):
+        """Nothing to do: the columns are plain arrays"""
+    
+    def _fold_adjustments(self):
+        """Nothing to do: discounts are applied to the price column right away"""
+    
+    @log_operation
+    def remove_vehicle(self, index):
+        """Remove a vehicle from the fleet by index"""
+        if 0 <= index < len(self):
+            return self._delete_row(index)
+        return None
+    
+    @log_operation
+    def remove_vehicle_by_id(self, vehicle_id):
+        """Remove a vehicle by its ID; returns it, or None"""
+        index = self._positions.get(vehicle_id)
+        return None if index is None else self._delete_row(index)
+    
+    @log_operation
+    def remove_vehicles(self, vehicle_ids):
+        """Remove many vehicles by ID, rebuilding each column only once"""
+        vehicle_ids = set(vehicle_ids)
+        removed = list(map(vehicle_ids.__contains__, self._ids))
+        vehicles = self._select(removed)
+        
+        keep = [not flag for flag in removed]
+        for name in ('_type', '_brand', '_model', '_price', '_year', '_tax_multiplier',
+                     '_battery_capacity', '_autonomy', '_load_capacity', '_length',
+                     '_registration', '_ids'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, compress(column, keep)))
+        self._positions = {vehicle_id: row for row, vehicle_id in enumerate(self._ids)}
+        if self.journal is not None:
+            for vehicle in vehicles:
+                self.journal.record_remove(vehicle.vehicle_id)
+        return vehicles
+    
+    def apply_global_discount(self, percentage):
+        """Apply a percentage discount/adjustment to all vehicles"""
+        factor = 1 - percentage/100
+        self._price = array('d', map(factor.__rmul__, self._price))
+        if self.journal is not None:
+            self.journal.record_discount(percentage)
+        return len(self)
+    
+    def filter_by_brand(self, brand):
+        """Filter vehicles by brand (compares brand codes, not strings)"""
+        brand = brand.lower()
+        codes = {code for code, value in enumerate(self.brands.values)
+                 if value.lower() == brand}
+        return self._select(map(codes.__contains__, self._brand))
+    
+    def filter_by_year(self, min_year):
+        """Filter vehicles by minimum year"""
+        return self._select(map(min_year.__le__, self._year))
+    
+    def filter_by_type(self, vehicle_type):
+        """Filter vehicles by type (class)"""
+        code = VEHICLE_TYPE_CODES.get(vehicle_type)
+        if code is None:
+            return []
+        return self._select(map(code.__eq__, self._type))
+    
+    def _query_plan(self, query):
+        """No indexes here: every criterion is checked over the columns"""
+        masks = []
+        if query.brand_name is not None or query.prefix is not None:
+            codes = {code for code, value in enumerate(self.brands.values)
+                     if query.brand_matches(value.lower())}
+            masks.append(map(codes.__contains__, self._brand))
+        if query.search_text is not None:
+            masks.append(self._search_mask(query.search_text.split()))
+        
+        for column, low, high in ((self._year, query.min_year, query.max_year),
+                                  (self._price, query.min_price, query.max_price)):
+            if low is not None:
+                masks.append(map(partial(le, low), column))
+            if high is not None:
+                masks.append(map(partial(ge, high), column))
+        
+        allowed = query.allowed_types()
+        if allowed is not None:
+            codes = {VEHICLE_TYPE_CODES[name] for name in allowed if name in VEHICLE_TYPE_CODES}
+            masks.append(map(codes.__contains__, self._type))
+        for column, capacity in ((self._battery_capacity, query.min_battery_capacity),
+                                 (self._load_capacity, query.min_load_capacity)):
+            if capacity is not None:
+                masks.append(map(partial(le, capacity), column))
+        
+        if not masks:
+            return QueryPlan("column scan", len(self), self, (), False)
+        vehicles = self._select(map(all, zip(*masks)))
+        return QueryPlan("column scan", len(vehicles), vehicles, tuple(query.predicates()), False)
+    
+    def _search_mask(self, words):
+        """Per row: does every word start a word of the brand or the model?"""
+        def codes(strings, word):
+            return {code for code, value in enumerate(strings.values)
+                    if any(part.startswith(word) for part in value.lower().split())}
+        
+        word_codes = [(codes(self.brands, word), codes(self.models, word)) for word in words]
+        return (all(brand in brands or model in models for brands, models in word_codes)
+                for brand, model in zip(self._brand, self._model))
+    
+    def search(self, text):
+        """Vehicles whose brand/model words start with every word of `text`"""
+        words = text.lower().split()
+        if not words:
+            return self.vehicles
+        return self._select(self._search_mask(words))
+    
+    def compute_taxes(self):
+        """Tax of every vehicle, computed over the price and multiplier columns"""
+        # Same operation order as Vehicle.calculate_tax: price * VAT * multiplier
+        return array('d', map(mul, map(Vehicle.VAT_RATE.__rmul__, self._price), self._tax_multiplier))
+    
+    def _scenario_groups(self, by_brand):
+        """Group totals for evaluate_scenarios, summed over the columns"""
+        if not by_brand:
+            return super()._scenario_groups(by_brand)
+        
+        brands = [brand.lower() for brand in self.brands.values]
+        groups = {}
+        for code, brand, price, tax in zip(self._type, self._brand, self._price, self.compute_taxes()):
+            key = (VEHICLE_CLASSES[code].__name__, brands[brand])
+            value, total_tax = groups.get(key, (0, 0))
+            groups[key] = (value + price, total_tax + tax)
+        return groups
+    
+    def _shared_columns(self):
+        """The columns themselves: nothing to convert"""
+        columns = {'price': self._price, 'autonomy': self._autonomy, 'load_capacity': self._load_capacity,
+                   'year': self._year, 'brand': self._brand, 'model': self._model, 'type': self._type}
+        return columns, self.brands.values, self.models.values
+    
+    def _group_rows(self, key):
+        """{group: row numbers} for group_by, hashing the code/year columns"""
+        if callable(key):
+            return hash_groups(map(key, self), range(len(self)))
+        if key == 'year':
+            return hash_groups(self._year, range(len(self)))
+        if key == 'type':
+            groups = hash_groups(self._type, range(len(self)))
+            return {VEHICLE_CLASSES[code].__name__: rows for code, rows in groups.items()}
+        
+        strings = (self.brands if key == 'brand' else self.models).values
+        groups = hash_groups(getattr(self, '_' + key), range(len(self)))
+        rename = first_spelling(strings[code] for code in groups)
+        return merge_groups(groups, lambda code: rename(strings[code]))
+    
+    def _metric_getter(self, metric):
+        """getter(row) for a GROUP_METRICS metric, reading its column"""
+        column = self.compute_taxes() if metric == 'tax' else getattr(self, '_' + metric)
+        vehicle_type = GROUP_METRICS[metric]
+        if vehicle_type is None:
+            return column.__getitem__
+        code = VEHICLE_TYPE_CODES[vehicle_type]
+        return lambda row: column[row] if self._type[row] == code else None
+    
+    def get_summary(self):
+        """Get fleet summary statistics straight from the columns"""
+        taxes = self.compute_taxes()
+        
+        summary = {
+            'total': len(self),
+            'total_value': sum(self._price),
+            'total_tax': sum(taxes),
+            'by_type': {},
+            'value_by_type': {},
+            'tax_by_type': {}
+        }
+        
+        # Keep the by_type order of Fleet (first appearance in the fleet)
+        present = sorted((code for code in range(len(VEHICLE_CLASSES)) if code in self._type),
+                         key=self._type.index)
+        
+        for code in present:
+            name = VEHICLE_CLASSES[code].__name__
+            mask = list(map(code.__eq__, self._type))
+            prices = list(compress(self._price, mask))
+            summary['by_type'][name] = len(prices)
+            summary['value_by_type'][name] = sum(prices)
+            summary['tax_by_type'][name] = sum(compress(taxes, mask))
+        
+        return summary
+
+
+# ============================================
+# 3.2 STREAMING EXPORT
+# ============================================
+class InventoryWriter:
+    """Formats an inventory export piece by piece
+    
+    Fleet.export_inventory() writes header(), then format_chunk() for each
+    fixed-size chunk of vehicle rows (Vehicle.to_dict() dicts), then
+    footer() with the totals gathered along the way.
+    """
+    newline = None  # `newline` argument used to open the file
+    
+    def __init__(self, export_date):
+        self.export_date = export_date
+    
+    def header(self):
+        return ""
+    
+    def format_chunk(self, first_number, rows):
+        """Format rows numbered first_number, first_number + 1, ..."""
+        raise NotImplementedError
+    
+    def footer(self, total_vehicles, total_value, total_tax):
+        return ""
+
+
+class TxtInventoryWriter(InventoryWriter):
+    """Human readable report"""
+    def header(self):
+        return ("=" * 50 + "\n"
+                "FLEET INVENTORY\n"
+                f"Export date: {self.export_date}\n"
+                + "=" * 50 + "\n\n")
+    
+    def format_vehicle(self, number, row):
+        text = (f"VEHICLE {number}:\n"
+                f"  Type: {row['type']}\n"
+                f"  Brand: {row['brand']}\n"
+                f"  Model: {row['model']}\n"
+                f"  Price: €{row['price']:.2f}\n"
+                f"  Tax: €{row['tax']:.2f}\n"
+                f"  Year: {row['year']}\n")
+        
+        if 'battery_capacity' in row:
+            text += (f"  Battery capacity: {row['battery_capacity']}kWh\n"
+                     f"  Autonomy: {row['autonomy']}km\n")
+        elif 'load_capacity' in row:
+            text += (f"  Load capacity: {row['load_capacity']}t\n"
+                     f"  Length: {row['length']}m\n")
+        
+        return text + "\n" + "-" * 40 + "\n\n"
+    
+    def format_chunk(self, first_number, rows):
+        return "".join(self.format_vehicle(number, row)
+                       for number, row in enumerate(rows, first_number))
+    
+    def footer(self, total_vehicles, total_value, total_tax):
+        return ("=" * 50 + "\n"
+                "FLEET SUMMARY\n"
+                f"Total vehicles: {total_vehicles}\n"
+                f"Total fleet value: €{total_value:.2f}\n"
+                f"Total tax: €{total_tax:.2f}\n"
+                + "=" * 50 + "\n")
+
+
+class CsvInventoryWriter(InventoryWriter):
+    """Spreadsheet friendly rows, one vehicle per line"""
+    newline = ''
+    fields = ['type', 'brand', 'model', 'price', 'tax', 'year',
+              'battery_capacity', 'autonomy', 'load_capacity',
+              'length', 'registration_date']
+    
+    def _write(self, write):
+        buffer = io.StringIO()
+        # tax_discount/extra_tax from to_dict() are not csv columns
+        write(csv.DictWriter(buffer, fieldnames=self.fields, extrasaction='ignore'))
+        return buffer.getvalue()
+    
+    def header(self):
+        return self._write(lambda writer: writer.writeheader())
+    
+    def format_chunk(self, first_number, rows):
+        # Rows go through csv.writer as plain lists (missing fields empty, as
+        # DictWriter would write them) without its per-row check of the keys
+        buffer = io.StringIO()
+        blanks = [''] * len(self.fields)
+        csv.writer(buffer).writerows([list(map(row.get, self.fields, blanks)) for row in rows])
+        return buffer.getvalue()
+
+
+class JsonInventoryWriter(InventoryWriter):
+    """Structured document; the totals are written after the vehicles"""
+    # Rows are flat, so the indented layout is just these separators; without
+    # `indent` json uses its C encoder
+    item_separator = ",\n            "
+    chunk_encoder = json.JSONEncoder(ensure_ascii=False, separators=(item_separator, ": "))
+    
+    def header(self):
+        return ("{\n"
+                f'    "export_date": {json.dumps(self.export_date)},\n'
+                '    "vehicles": [')
+    
+    def format_chunk(self, first_number, rows):
+        # Every vehicle but the first one is preceded by a comma
+        first = "\n        " if first_number == 1 else ",\n        "
+        # The whole chunk is encoded at once as [{...}<separator>{...}]; the
+        # separator holds a raw newline, which encoded strings never do, so
+        # "}<separator>{" can only be the gap between two rows
+        encoded = self.chunk_encoder.encode(rows)[2:-2]
+        encoded = encoded.replace("}" + self.item_separator + "{", "\n        },\n        {\n            ")
+        return first + "{\n            " + encoded + "\n        }"
+    
+    def footer(self, total_vehicles, total_value, total_tax):
+        return ("\n    ],\n"
+                f'    "total_vehicles": {json.dumps(total_vehicles)},\n'
+                f'    "total_value": {json.dumps(total_value)},\n'
+                f'    "total_tax": {json.dumps(total_tax)}\n'
+                "}")
+
+
+EXPORT_WRITERS = {
+    'txt': TxtInventoryWriter,
+    'csv': CsvInventoryWriter,
+    'json': JsonInventoryWriter
+}
+
+
+def format_export_shard(format_types, export_date, first_number, records):
+    """Format one shard of vehicle records in each format (runs in a worker process)"""
+    rows = [vehicle_from_record(record).to_dict() for record in records]
+    return [EXPORT_WRITERS[format_type](export_date).format_chunk(first_number, rows)
+            for format_type in format_types]
+
+
+def open_export_file(filename, newline=None):
+    """Open an export file for writing, gzip-compressed if it ends in .gz"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf-8', newline=newline)
+    return open(filename, 'w', encoding='utf-8', newline=newline)
+
+
+# ============================================
+# 3.3 BINARY SNAPSHOTS
+# ============================================
+# File layout (little-endian):
+#   header    magic, version, type count, vehicle count, string table
+#             offset and count, total value, total tax, next vehicle ID,
+#             last journal sequence included (see FleetJournal)
+#   sections  one per vehicle class: record count, offset, value, tax
+#   order     one type code (byte) per vehicle, in fleet order
+#   ids       one vehicle ID (int64) per vehicle, in fleet order
+#   records   fixed-width records, grouped by class
+#   strings   string table (uint32 length + UTF-8 bytes) for brand/model
+# Version 1 files (no IDs, next ID or sequence) can still be read.
+SNAPSHOT_MAGIC = b'FLEETSNP'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct('<8sIIQQQddQQ')
+SNAPSHOT_HEADER_V1 = struct.Struct('<8sIIQQQdd')
+SNAPSHOT_ID = struct.Struct('<q')
+SNAPSHOT_SECTION = struct.Struct('<QQdd')
+SNAPSHOT_STRING_LENGTH = struct.Struct('<I')
+
+# brand id, model id, price, year, registered_at [, extra fields], int flags
+SNAPSHOT_RECORDS = [
+    struct.Struct('<IIdiqB'),    # Vehicle
+    struct.Struct('<IIdiqddB'),  # ElectricCar: battery_capacity, autonomy
+    struct.Struct('<IIdiqddB')   # Truck: load_capacity, length
+]
+
+
+# Bit i of the flags is set when numeric field i (price, extra fields) was
+# an int, so that vehicles come back exactly as they were saved
+def snapshot_int_flags(record):
+    """Flags byte for Vehicle.to_record() (price and extra fields)"""
+    flags = isinstance(record[3], int)
+    for bit, value in enumerate(record[6:], 1):
+        flags |= isinstance(value, int) << bit
+    return flags
+
+
+def write_snapshot(filename, fleet, chunk_size=4096, sequence=0):
+    """Write a fleet to a snapshot file in a single pass
+    
+    The per-type counts from get_summary() fix every section offset up
+    front, so records are buffered per class and written chunk by chunk at
+    their final position; the string table goes last. `sequence` is the
+    last journal record the fleet includes (0 without a journal).
+    """
+    summary = fleet.get_summary()
+    count = summary['total']
+    
+    sections_offset = SNAPSHOT_HEADER.size
+    order_offset = sections_offset + SNAPSHOT_SECTION.size * len(VEHICLE_CLASSES)
+    ids_offset = order_offset + count
+    offsets = []
+    position = ids_offset + count * SNAPSHOT_ID.size
+    for code, cls in enumerate(VEHICLE_CLASSES):
+        offsets.append(position)
+        position += summary['by_type'].get(cls.__name__, 0) * SNAPSHOT_RECORDS[code].size
+    strings_offset = position
+    
+    strings = StringDictionary()
+    order = bytearray()
+    ids = array('q')
+    buffers = [[] for _ in VEHICLE_CLASSES]
+    positions = list(offsets)
+    order_position = order_offset
+    ids_position = ids_offset
+    
+    with open(filename, 'wb') as file:
+        def flush(code):
+            data = b''.join(buffers[code])
+            file.seek(positions[code])
+            file.write(data)
+            positions[code] += len(data)
+            buffers[code].clear()
+        
+        for vehicle in fleet:
+            record = vehicle.to_record()
+            code = VEHICLE_TYPE_CODES[record[0]]
+            buffers[code].append(SNAPSHOT_RECORDS[code].pack(
+                strings.encode(record[1]), strings.encode(record[2]), *record[3:],
+                snapshot_int_flags(record)))
+            if len(buffers[code]) == chunk_size:
+                flush(code)
+            
+            order.append(code)
+            ids.append(vehicle.vehicle_id)
+            if len(order) == chunk_size:
+                file.seek(order_position)
+                file.write(order)
+                order_position += len(order)
+                order.clear()
+                file.seek(ids_position)
+                file.write(ids.tobytes())
+                ids_position += len(ids) * SNAPSHOT_ID.size
+                del ids[:]
+        
+        for code in range(len(VEHICLE_CLASSES)):
+            flush(code)
+        file.seek(order_position)
+        file.write(order)
+        file.seek(ids_position)
+        file.write(ids.tobytes())
+        
+        # String table
+        file.seek(strings_offset)
+        for value in strings.values:
+            data = value.encode('utf-8')
+            file.write(SNAPSHOT_STRING_LENGTH.pack(len(data)) + data)
+        
+        # Header and sections
+        file.seek(0)
+        file.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(VEHICLE_CLASSES), count,
+            strings_offset, len(strings.values),
+            summary['total_value'], summary['total_tax'], fleet._next_id, sequence))
+        for code, cls in enumerate(VEHICLE_CLASSES):
+            name = cls.__name__
+            file.write(SNAPSHOT_SECTION.pack(
+                summary['by_type'].get(name, 0), offsets[code],
+                summary['value_by_type'].get(name, 0), summary['tax_by_type'].get(name, 0)))
+
+
+class FleetSnapshot:
+    """Read-only, memory-mapped view of a snapshot file
+    
+    Opening it only parses the header and the string table; vehicles are
+    unpacked from the mapped records while iterating.
+    """
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version = struct.unpack_from('<8sI', self._map) if len(self._map) >= 12 else (None, None)
+        header = {1: SNAPSHOT_HEADER_V1, SNAPSHOT_VERSION: SNAPSHOT_HEADER}.get(version)
+        if magic != SNAPSHOT_MAGIC or header is None or len(self._map) < header.size:
+            self.close()
+            raise ValueError(f"'{filename}' is not a fleet snapshot")
+        
+        (_, _, type_count, self._count, strings_offset, string_count,
+         self._total_value, self._total_tax, *ids_and_sequence) = header.unpack_from(self._map)
+        # Version 1 files have no IDs: the fleet numbers their vehicles again
+        self.next_id, self.sequence = ids_and_sequence or (1, 0)
+        self.has_ids = version > 1
+        
+        self._sections = [SNAPSHOT_SECTION.unpack_from(self._map, header.size + i * SNAPSHOT_SECTION.size)
+                          for i in range(type_count)]
+        self._order_offset = header.size + type_count * SNAPSHOT_SECTION.size
+        self._ids_offset = self._order_offset + self._count
+        
+        self._strings = []
+        position = strings_offset
+        for _ in range(string_count):
+            (length,) = SNAPSHOT_STRING_LENGTH.unpack_from(self._map, position)
+            position += SNAPSHOT_STRING_LENGTH.size
+            self._strings.append(sys.intern(self._map[position:position + length].decode('utf-8')))
+            position += length
+    
+    def __len__(self):
+        return self._count
+    
+    def get_summary(self):
+        """Fleet summary stored in the header (same keys as Fleet.get_summary)"""
+        summary = {
+            'total': self._count,
+            'total_value': self._total_value,
+            'total_tax': self._total_tax,
+            'by_type': {},
+            'value_by_type': {},
+            'tax_by_type': {}
+        }
+        for cls, (count, _, value, tax) in zip(VEHICLE_CLASSES, self._sections):
+            if count:
+                summary['by_type'][cls.__name__] = count
+                summary['value_by_type'][cls.__name__] = value
+                summary['tax_by_type'][cls.__name__] = tax
+        return summary
+    
+    def __iter__(self):
+        """Unpack the vehicles in fleet order"""
+        view = memoryview(self._map)
+        ids_view = ids = None
+        try:
+            records = []
+            for code, (count, offset, _, _) in enumerate(self._sections):
+                record = SNAPSHOT_RECORDS[code]
+                records.append(record.iter_unpack(view[offset:offset + count * record.size]))
+            
+            if self.has_ids:
+                ids_view = view[self._ids_offset:self._ids_offset + self._count * SNAPSHOT_ID.size]
+                ids = ids_view.cast('q')
+            
+            strings = self._strings
+            order = view[self._order_offset:self._order_offset + self._count]
+            for i, code in enumerate(order):
+                brand, model, price, year, registered_at, *extra, flags = next(records[code])
+                if flags:
+                    price = int(price) if flags & 1 else price
+                    extra = [int(value) if flags >> bit & 1 else value
+                             for bit, value in enumerate(extra, 1)]
+                vehicle = VEHICLE_CLASSES[code](strings[brand], strings[model], price, year, *extra)
+                vehicle.registered_at = registered_at
+                if ids is not None:
+                    vehicle.vehicle_id = ids[i]
+                yield vehicle
+        finally:
+            records = order = None
+            if ids is not None:
+                ids.release()
+                ids_view.release()
+            view.release()
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+# ============================================
+# 3.4 BULK IMPORT
+# ============================================
+def open_import_file(filename):
+    """Open an exported file for reading, decompressing it if it ends in .gz"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rt', encoding='utf-8', newline='')
+    return open(filename, 'r', encoding='utf-8', newline='')
+
+
+def parse_number(value):
+    """Numbers from csv come back as text: '25000' -> 25000, '12.5' -> 12.5"""
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    return value
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(text):
+    """Inverse of format_timestamp (cached: bulk data repeats timestamps)"""
+    return int(time.mktime(time.strptime(text, '%Y-%m-%d %H:%M:%S')))
+
+
+def vehicle_from_dict(data):
+    """Build a vehicle from Vehicle.to_dict() output (or a csv row of it)"""
+    vehicle_type = data['type']
+    args = [data['brand'], data['model'], parse_number(data['price']), int(data['year'])]
+    
+    if vehicle_type == 'ElectricCar':
+        vehicle = ElectricCar(*args, parse_number(data['battery_capacity']), parse_number(data['autonomy']))
+    elif vehicle_type == 'Truck':
+        vehicle = Truck(*args, parse_number(data['load_capacity']), parse_number(data['length']))
+    elif vehicle_type == 'Vehicle':
+        vehicle = Vehicle(*args)
+    else:
+        raise ValueError(f"Unknown vehicle type: {vehicle_type}")
+    
+    if data.get('registration_date'):
+        vehicle.registered_at = parse_timestamp(data['registration_date'])
+    return vehicle
+
+
+def iter_json_vehicles(file, chunk_size=1 << 16):
+    """Yield the objects of the "vehicles" array of a JSON export one by one
+    
+    Only chunk_size characters (plus the object being decoded) are held in
+    memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    
+    # Skip everything up to the opening bracket of the array
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        start = buffer.find('"vehicles"')
+        if start >= 0 and buffer.find('[', start) >= 0:
+            buffer = buffer[buffer.find('[', start) + 1:]
+            break
+        if not chunk:
+            raise ValueError('No "vehicles" array found')
+    
+    position = 0
+    while True:
+        # Skip separators between objects
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            try:
+                data, position = decoder.raw_decode(buffer, position)
+                yield data
+                continue
+            except json.JSONDecodeError:
+                pass  # object cut at the end of the buffer: read more
+        
+        chunk = file.read(chunk_size)
+        if not chunk:
+            raise ValueError("Unexpected end of the vehicles array")
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+# ============================================
+# 3.5 QUERIES
+# ============================================
+QUERY_ORDER_KEYS = {
+    'price': attrgetter('price'),
+    'year': attrgetter('year'),
+    'brand': attrgetter('brand'),
+    'model': attrgetter('model'),
+    'registration_date': attrgetter('registered_at'),
+    'tax': methodcaller('calculate_tax'),
+    'type': attrgetter('__class__.__name__'),
+}
+
+
+class FleetQuery:
+    """Combined filter over a fleet, built by chaining calls
+    
+        fleet.query().brand_prefix("to").year(2015).order_by("price").limit(10)
+    
+    Nothing runs until the query is iterated. The fleet then starts from its
+    most selective index (see Fleet._query_plan) and checks the remaining
+    criteria on those candidates only, streaming the matches.
+    """
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self.brand_name = None  # lowercase, exact match
+        self.prefix = None  # lowercase brand prefix
+        self.search_text = None  # words the brand/model must start with
+        self.min_year = None
+        self.max_year = None
+        self.min_price = None
+        self.max_price = None
+        self.vehicle_types = None  # set of class names
+        self.min_battery_capacity = None
+        self.min_load_capacity = None
+        self.order_field = None
+        self.descending = False
+        self.offset = 0
+        self.max_rows = None
+    
+    # Criteria (each call returns the query, so they chain)
+    def brand(self, brand):
+        """Brand equal to `brand` (case-insensitive)"""
+        self.brand_name = brand.lower()
+        return self
+    
+    def brand_prefix(self, prefix):
+        """Brand starting with `prefix` (case-insensitive)"""
+        self.prefix = prefix.lower()
+        return self
+    
+    def search(self, text):
+        """Every word of `text` starts a word of the brand or model (see Fleet.search)"""
+        self.search_text = text.lower() if text.split() else None
+        return self
+    
+    def year(self, min_year=None, max_year=None):
+        """Year between min_year and max_year (inclusive, either can be open)"""
+        self.min_year = min_year
+        self.max_year = max_year
+        return self
+    
+    def price(self, min_price=None, max_price=None):
+        """Price between min_price and max_price (inclusive, either can be open)"""
+        self.min_price = min_price
+        self.max_price = max_price
+        return self
+    
+    def types(self, *vehicle_types):
+        """Vehicle type (class name) is one of `vehicle_types`"""
+        self.vehicle_types = set(vehicle_types)
+        return self
+    
+    def min_battery(self, capacity):
+        """Electric cars with at least `capacity` kWh"""
+        self.min_battery_capacity = capacity
+        return self
+    
+    def min_load(self, capacity):
+        """Trucks that carry at least `capacity` tons"""
+        self.min_load_capacity = capacity
+        return self
+    
+    def order_by(self, field, descending=False):
+        """Sort the matches by one of QUERY_ORDER_KEYS"""
+        if field not in QUERY_ORDER_KEYS:
+            raise ValueError(f"Cannot order by {field!r}, use one of: {', '.join(QUERY_ORDER_KEYS)}")
+        self.order_field = field
+        self.descending = descending
+        return self
+    
+    def limit(self, count, offset=0):
+        """Return at most `count` matches, skipping the first `offset`"""
+        self.max_rows = count
+        self.offset = offset
+        return self
+    
+    # Evaluation
+    def allowed_types(self):
+        """Class names a match can have, or None for any"""
+        allowed = self.vehicle_types
+        for capacity, name in ((self.min_battery_capacity, "ElectricCar"),
+                               (self.min_load_capacity, "Truck")):
+            if capacity is not None:
+                allowed = {name} if allowed is None else allowed & {name}
+        return allowed
+    
+    def brand_matches(self, brand):
+        """Check a (lowercase) brand against the brand criteria"""
+        if self.brand_name is not None and brand != self.brand_name:
+            return False
+        return self.prefix is None or brand.startswith(self.prefix)
+    
+    def predicates(self):
+        """{criterion: check(vehicle)} for every criterion that is set"""
+        checks = {}
+        if self.brand_name is not None or self.prefix is not None:
+            checks['brand'] = lambda vehicle: self.brand_matches(vehicle.brand.lower())
+        if self.search_text is not None:
+            words = self.search_text.split()
+            checks['search'] = lambda vehicle: name_matches((vehicle.brand.lower(),
+                                                             vehicle.model.lower()), words)
+        if self.min_year is not None or self.max_year is not None:
+            first_year = -math.inf if self.min_year is None else self.min_year
+            last_year = math.inf if self.max_year is None else self.max_year
+            checks['year'] = lambda vehicle: first_year <= vehicle.year <= last_year
+        if self.min_price is not None or self.max_price is not None:
+            low = -math.inf if self.min_price is None else self.min_price
+            high = math.inf if self.max_price is None else self.max_price
+            checks['price'] = lambda vehicle: low <= vehicle.price <= high
+        
+        allowed = self.allowed_types()
+        if allowed is not None:
+            checks['type'] = lambda vehicle: vehicle.__class__.__name__ in allowed
+        if self.min_battery_capacity is not None:
+            checks['battery'] = lambda vehicle: vehicle.battery_capacity >= self.min_battery_capacity
+        if self.min_load_capacity is not None:
+            checks['load'] = lambda vehicle: vehicle.load_capacity >= self.min_load_capacity
+        return checks
+    
+    def explain(self):
+        """Describe how the query would run"""
+        plan = self.fleet._query_plan(self)
+        remaining = [name for name in self.predicates() if name not in plan.covered]
+        text = f"{plan.description}: {plan.estimate} candidate(s)"
+        if remaining:
+            text += f", then check {', '.join(remaining)}"
+        if self.order_field is not None:
+            text += f", ordered by {self.order_field}" + (" (from index)" if plan.ordered else "")
+        return text
+    
+    def __iter__(self):
+        plan = self.fleet._query_plan(self)
+        checks = [check for name, check in self.predicates().items() if name not in plan.covered]
+        
+        # Stacked filter() calls: a vehicle stops at the first check it fails
+        matches = iter(plan.candidates)
+        for check in checks:
+            matches = filter(check, matches)
+        
+        stop = None if self.max_rows is None else self.offset + self.max_rows
+        if self.order_field is not None and not plan.ordered:
+            key = QUERY_ORDER_KEYS[self.order_field]
+            if stop is None:
+                matches = sorted(matches, key=key, reverse=self.descending)
+            elif self.descending:
+                matches = heapq.nlargest(stop, matches, key=key)
+            else:
+                matches = heapq.nsmallest(stop, matches, key=key)
+        return islice(matches, self.offset, stop)
+    
+    def all(self):
+        """List of all the matches"""
+        return list(self)
+    
+    def count(self):
+        """Number of matches (streams them, nothing is kept)"""
+        return sum(1 for _ in self)
+    
+    def exact_count(self):
+        """Number of matches if the plan alone answers it, without iterating, else None"""
+        if self.offset or self.max_rows is not None:
+            return None
+        plan = self.fleet._query_plan(self)
+        if any(name not in plan.covered for name in self.predicates()):
+            return None
+        return plan.estimate
+
+
+# How a fleet will run a query: the candidate vehicles, how many there are,
+# which criteria they already satisfy and whether they come in query order
+QueryPlan = namedtuple('QueryPlan', 'description estimate candidates covered ordered')
+
+
+# ============================================
+# 3.6 SQLITE STORAGE
+# ============================================
+class SQLiteFleet(Fleet):
+    """Fleet stored in a SQLite database, so it survives restarts
+    
+    Each row holds the fields of Vehicle.to_record() plus lowercase keys for
+    brand and name searches; brand, year and type are indexed. The database
+    runs in WAL mode, add_vehicles() writes BATCH_SIZE rows per transaction,
+    and filters, queries and summaries run as SQL. Vehicles read back are
+    copies (changes to them are not written back, and extra numeric
+    attributes come back as floats), as with ColumnarFleet.
+    
+    The default path ':memory:' gives a throwaway database.
+    """
+    BATCH_SIZE = 10_000  # rows per transaction in add_vehicles
+    MAX_PARAMETERS = 500  # IDs bound per DELETE (SQLite limits bound parameters)
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vehicles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,  -- vehicle_id, never reused
+            type TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            price REAL NOT NULL,
+            year INTEGER NOT NULL,
+            registered_at INTEGER NOT NULL,
+            extra1 REAL,  -- battery_capacity (ElectricCar) or load_capacity (Truck)
+            extra2 REAL,  -- autonomy (ElectricCar) or length (Truck)
+            tax_multiplier REAL NOT NULL,
+            brand_key TEXT NOT NULL,  -- lowercase brand
+            name_key TEXT NOT NULL  -- lowercase "brand model"
+        );
+        CREATE INDEX IF NOT EXISTS vehicles_brand ON vehicles (brand_key);
+        CREATE INDEX IF NOT EXISTS vehicles_year ON vehicles (year);
+        CREATE INDEX IF NOT EXISTS vehicles_type ON vehicles (type);
+    """
+    COLUMNS = "id, type, brand, model, price, year, registered_at, extra1, extra2"
+    INSERT = ("INSERT INTO vehicles (id, type, brand, model, price, year, registered_at, extra1, extra2, "
+              "tax_multiplier, brand_key, name_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    TAX = "price * ? * tax_multiplier"  # same operation order as Vehicle.calculate_tax
+    ORDER_COLUMNS = {
+        'price': 'price',
+        'year': 'year',
+        'brand': 'brand',
+        'model': 'model',
+        'registration_date': 'registered_at',
+        'tax': TAX,
+        'type': 'type',
+    }
+    
+    def __init__(self, path=':memory:', debug=False):
+        super().__init__(debug=debug)
+        self.path = path
+        # The GUI uses the fleet from its thread and its background worker, one at a time.
+        # sqlite3 keeps the statements below prepared in its statement cache.
+        self.connection = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+        
+        row = self.connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'vehicles'").fetchone()
+        self._next_id = row[0] + 1 if row else 1
+    
+    def _row(self, vehicle, vehicle_id):
+        """INSERT row for a vehicle that is to get the given ID"""
+        if vehicle.__class__.__name__ not in VEHICLE_TYPES:
+            raise TypeError(f"Unsupported vehicle type: {vehicle.__class__.__name__}")
+        record = vehicle.to_record()
+        return ((vehicle_id,) + record + (None,) * (8 - len(record))
+                + (vehicle.TAX_MULTIPLIER, vehicle.brand.lower(), f"{vehicle.brand} {vehicle.model}".lower()))
+    
+    def _assign_ids(self, vehicles):
+        """Give vehicles whose rows were just committed their IDs"""
+        for vehicle_id, vehicle in enumerate(vehicles, self._next_id):
+            vehicle.vehicle_id = vehicle_id
+        self._next_id += len(vehicles)
+    
+    @staticmethod
+    def _vehicle(row):
+        """Build a vehicle from a row of COLUMNS"""
+        vehicle = vehicle_from_record(row[1:] if row[7] is not None else row[1:7])
+        vehicle.vehicle_id = row[0]
+        return vehicle
+    
+    def _rows(self, where="", params=(), order="id"):
+        """Vehicles selected by a WHERE clause, read one at a time"""
+        cursor = self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM vehicles {where} ORDER BY {order}", params)
+        return map(self._vehicle, cursor)
+    
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+    
+    @property
+    def vehicles(self):
+        """Read every vehicle (O(n), prefer the SQL-backed methods)"""
+        return list(self._rows())
+    
+    def __iter__(self):
+        return self._rows()
+    
+    def clear(self):
+        """Remove all vehicles from the fleet (IDs keep counting up)"""
+        with self.connection:
+            self.connection.execute("DELETE FROM vehicles")
+    
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+    
+    @classmethod
+    def load_snapshot(cls, filename, path=':memory:'):
+        """Load a fleet saved with save_snapshot() into the database at `path`
+        
+        Vehicles keep their saved IDs (old files without them get new ones).
+        """
+        fleet = cls(path)
+        snapshot = FleetSnapshot(filename)
+        try:
+            vehicles = iter(snapshot)
+            while True:
+                batch = list(islice(vehicles, cls.BATCH_SIZE))
+                if not batch:
+                    break
+                rows = []
+                for vehicle in batch:
+                    if vehicle.vehicle_id is None:
+                        vehicle.vehicle_id = fleet._next_id
+                    fleet._next_id = max(fleet._next_id, vehicle.vehicle_id + 1)
+                    rows.append(fleet._row(vehicle, vehicle.vehicle_id))
+                with fleet.connection:
+                    fleet.connection.executemany(fleet.INSERT, rows)
+            fleet._next_id = max(fleet._next_id, snapshot.next_id)
+            with fleet.connection:
+                # IDs of vehicles removed before the save are not reused after a restart
+                fleet.connection.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'vehicles'",
+                                         (fleet._next_id - 1,))
+        finally:
+            snapshot.close()
+        return fleet
+    
+    @log_operation
+    def add_vehicle(self, vehicle):
+        """Add a vehicle to the fleet"""
+        with self.connection:
+            self.connection.execute(self.INSERT, self._row(vehicle, self._next_id))
+        self._assign_ids([vehicle])
+        return True
+    
+    @log_operation
+    def add_vehicles(self, vehicles):
+        """Add many vehicles, BATCH_SIZE rows per transaction
+        
+        Vehicles only get their IDs once their batch is committed.
+        """
+        vehicles = iter(vehicles)
+        count = 0
+        while True:
+            batch = list(islice(vehicles, self.BATCH_SIZE))
+            if not batch:
+                return count
+            rows = [self._row(vehicle, vehicle_id) for vehicle_id, vehicle in enumerate(batch, self._next_id)]
+            with self.connection:
+                self.connection.executemany(self.INSERT, rows)
+            self._assign_ids(batch)
+            count += len(batch)
+    
+    def get_vehicle(self, vehicle_id):
+        """Vehicle with the given ID, or None"""
+        return next(self._rows("WHERE id = ?", (vehicle_id,)), None)
+    
+    def compact(self):
+        """Nothing to do: deleted rows are gone from the table right away"""
+    
+    def _fold_adjustments(self):
+        """Nothing to do: discounts update the price column right away"""
+    
+    def _delete(self, vehicle_ids):
+        """Delete rows by ID in one transaction; returns the vehicles deleted"""
+        vehicle_ids = list(vehicle_ids)
+        removed = []
+        with self.connection:
+            for start in range(0, len(vehicle_ids), self.MAX_PARAMETERS):
+                ids = vehicle_ids[start:start + self.MAX_PARAMETERS]
+                where = f"WHERE id IN ({', '.join('?' * len(ids))})"
+                removed.extend(self._rows(where, ids))
+                self.connection.execute(f"DELETE FROM vehicles {where}", ids)
+        return removed
+    
+    @log_operation
+    def remove_vehicle(self, index):
+        """Remove a vehicle from the fleet by index (position in fleet.vehicles)"""
+        if index < 0:
+            return None
+        row = self.connection.execute(
+            "SELECT id FROM vehicles ORDER BY id LIMIT 1 OFFSET ?", (index,)).fetchone()
+        return self._delete(row)[0] if row else None
+    
+    @log_operation
+    def remove_vehicle_by_id(self, vehicle_id):
+        """Remove a vehicle by its ID; returns it, or None"""
+        removed = self._delete([vehicle_id])
+        return removed[0] if removed else None
+    
+    @log_operation
+    def remove_vehicles(self, vehicle_ids):
+        """Remove many vehicles by ID; returns the ones that were removed"""
+        return self._delete(vehicle_ids)
+    
+    def apply_global_discount(self, percentage):
+        """Apply a percentage discount/adjustment to all vehicles (one UPDATE)"""
+        factor = 1 - percentage/100
+        with self.connection:
+            self.connection.execute("UPDATE vehicles SET price = price * ?", (factor,))
+        return len(self)
+    
+    def compute_taxes(self):
+        """Tax of every vehicle, computed by SQLite"""
+        cursor = self.connection.execute(f"SELECT {self.TAX} FROM vehicles ORDER BY id", (Vehicle.VAT_RATE,))
+        return array('d', chain.from_iterable(cursor))
+    
+    def get_summary(self):
+        """Get fleet summary statistics with one GROUP BY query"""
+        summary = {
+            'total': 0,
+            'total_value': 0,
+            'total_tax': 0,
+            'by_type': {},
+            'value_by_type': {},
+            'tax_by_type': {}
+        }
+        
+        # Types in order of first appearance, as in Fleet
+        rows = self.connection.execute(
+            f"SELECT type, COUNT(*), SUM(price), SUM({self.TAX}) FROM vehicles "
+            "GROUP BY type ORDER BY MIN(id)", (Vehicle.VAT_RATE,))
+        for vehicle_type, count, value, tax in rows:
+            summary['total'] += count
+            summary['total_value'] += value
+            summary['total_tax'] += tax
+            summary['by_type'][vehicle_type] = count
+            summary['value_by_type'][vehicle_type] = value
+            summary['tax_by_type'][vehicle_type] = tax
+        
+        return summary
+    
+    def _scenario_groups(self, by_brand):
+        """Group totals for evaluate_scenarios, summed by SQLite"""
+        if not by_brand:
+            return super()._scenario_groups(by_brand)
+        rows = self.connection.execute(
+            f"SELECT type, brand_key, SUM(price), SUM({self.TAX}) FROM vehicles "
+            "GROUP BY type, brand_key", (Vehicle.VAT_RATE,))
+        return {(vehicle_type, brand): (value, tax) for vehicle_type, brand, value, tax in rows}
+    
+    def _group_rows(self, key):
+        """{group: vehicles} for group_by, hashed from the rows read back"""
+        vehicles = self.vehicles
+        if callable(key):
+            keys = map(key, vehicles)
+        elif key == 'type':
+            keys = map(attrgetter('__class__.__name__'), vehicles)
+        else:
+            keys = map(attrgetter(key), vehicles)
+        
+        groups = hash_groups(keys, vehicles)
+        if key in ('brand', 'model'):
+            groups = merge_groups(groups, first_spelling(groups))
+        return groups
+    
+    # FILTERS (pushed down to SQL)
+    def filter_by_brand(self, brand):
+        """Filter vehicles by brand (case-insensitive, uses the brand index)"""
+        return list(self._rows("WHERE brand_key = ?", (brand.lower(),)))
+    
+    def filter_by_year(self, min_year):
+        """Filter vehicles by minimum year (ordered by year, uses the year index)"""
+        return list(self._rows("WHERE year >= ?", (min_year,), "year, id"))
+    
+    def filter_by_type(self, vehicle_type):
+        """Filter vehicles by type (class), uses the type index"""
+        return list(self._rows("WHERE type = ?", (vehicle_type,)))
+    
+    def search(self, text):
+        """Vehicles whose brand/model words start with every word of `text`"""
+        clauses, params = self._where(FleetQuery(self).search(text))
+        if not clauses:
+            return self.vehicles
+        return list(self._rows("WHERE " + " AND ".join(clauses), params))
+    
+    def _where(self, query):
+        """SQL conditions and their parameters for the criteria of a FleetQuery"""
+        clauses = []
+        params = []
+        if query.brand_name is not None:
+            clauses.append("brand_key = ?")
+            params.append(query.brand_name)
+        if query.prefix is not None:
+            clauses.append("brand_key >= ? AND brand_key < ?")
+            params += [query.prefix, query.prefix + '\U0010ffff']
+        if query.search_text is not None:
+            # A word matches at the start of name_key or right after a space
+            for word in query.search_text.split():
+                clauses.append("' ' || name_key LIKE ? ESCAPE '\\'")
+                escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(f"% {escaped}%")
+        
+        for column, low, high in (('year', query.min_year, query.max_year),
+                                  ('price', query.min_price, query.max_price)):
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+        
+        allowed = query.allowed_types()
+        if allowed is not None:
+            clauses.append(f"type IN ({', '.join('?' * len(allowed))})")
+            params += sorted(allowed)
+        # The type criterion above already limits these to electric cars / trucks
+        for capacity in (query.min_battery_capacity, query.min_load_capacity):
+            if capacity is not None:
+                clauses.append("extra1 >= ?")
+                params.append(capacity)
+        return clauses, params
+    
+    def _query_plan(self, query):
+        """The whole query (criteria and order) runs as one SELECT
+        
+        The description is SQLite's own EXPLAIN QUERY PLAN.
+        """
+        clauses, params = self._where(query)
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        estimate = self.connection.execute(f"SELECT COUNT(*) FROM vehicles {where}", params).fetchone()[0]
+        
+        order = "id"
+        if query.order_field is not None:
+            # id breaks ties, like the stable sort of FleetQuery
+            order = self.ORDER_COLUMNS[query.order_field] + (" DESC" if query.descending else "") + ", id"
+            if query.order_field == 'tax':
+                params = params + [Vehicle.VAT_RATE]
+        
+        steps = self.connection.execute(
+            f"EXPLAIN QUERY PLAN SELECT {self.COLUMNS} FROM vehicles {where} ORDER BY {order}", params)
+        description = "sqlite " + "; ".join(step[-1] for step in steps)
+        return QueryPlan(description, estimate, self._rows(where, params, order),
+                         tuple(query.predicates()), query.order_field is not None)
+
+
+# ============================================
+# 3.7 MUTATION JOURNAL
+# ============================================
+# Every record is framed as: body length (uint32), CRC-32 of the body,
+# sequence number (uint64), body. The body starts with its kind (byte):
+#   add       kind, type code, vehicle ID, price, year, registered_at,
+#             int flags (see snapshot_int_flags), brand and model byte
+#             lengths [, extra fields], then brand and model in UTF-8
+#   remove    kind, vehicle ID
+#   price     kind, vehicle ID, price, int flag
+#   discount  kind, percentage
+#   clear     kind
+JOURNAL_ADD, JOURNAL_REMOVE, JOURNAL_PRICE, JOURNAL_DISCOUNT, JOURNAL_CLEAR = range(5)
+JOURNAL_FRAME = struct.Struct('<IIQ')
+JOURNAL_ADD_RECORDS = [
+    struct.Struct('<BBqdiqBHH'),    # Vehicle
+    struct.Struct('<BBqdiqBHHdd'),  # ElectricCar: battery_capacity, autonomy
+    struct.Struct('<BBqdiqBHHdd')   # Truck: load_capacity, length
+]
+JOURNAL_REMOVE_RECORD = struct.Struct('<Bq')
+JOURNAL_PRICE_RECORD = struct.Struct('<BqdB')
+JOURNAL_DISCOUNT_RECORD = struct.Struct('<Bd')
+JOURNAL_CLEAR_RECORD = struct.Struct('<B')
+
+
+class FleetJournal:
+    """Append-only log of the changes made to a Fleet, so they survive a crash
+    
+    While attached (fleet.journal), every add, removal, price change,
+    discount and clear appends a compact binary record. Records are queued
+    in memory and a daemon thread writes everything queued every `interval`
+    seconds followed by a single fsync (group commit), so many changes cost
+    one disk flush. commit() writes the queue right away.
+    
+    recover() rebuilds the fleet on startup from the last checkpoint
+    snapshot plus the records written after it; checkpoint() saves a new
+    snapshot and empties the journal. A record torn by a crash (bad length
+    or CRC) ends the replay and is cut off the file.
+    """
+    def __init__(self, filename, snapshot_filename, interval=0.05):
+        self.filename = filename
+        self.snapshot_filename = snapshot_filename
+        self.interval = interval
+        self.fleet = None
+        self.sequence = 0  # sequence number of the last record
+        self.commits = 0  # group commits (fsyncs) so far
+        self._pending = deque()
+        self._lock = threading.Lock()  # numbers records in queue order
+        self._commit_lock = threading.Lock()  # one writer to the file at a time
+        self._file = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    # Recording (called by Fleet)
+    def _append(self, bodies):
+        with self._lock:
+            frames = []
+            for body in bodies:
+                self.sequence += 1
+                frames.append(JOURNAL_FRAME.pack(len(body), zlib.crc32(body), self.sequence))
+                frames.append(body)
+            self._pending.append(b''.join(frames))
+    
+    def record_add(self, vehicles):
+        bodies = []
+        for vehicle in vehicles:
+            record = vehicle.to_record()
+            code = VEHICLE_TYPE_CODES[record[0]]
+            brand = record[1].encode('utf-8')
+            model = record[2].encode('utf-8')
+            bodies.append(JOURNAL_ADD_RECORDS[code].pack(
+                JOURNAL_ADD, code, vehicle.vehicle_id, *record[3:6], snapshot_int_flags(record),
+                len(brand), len(model), *record[6:]) + brand + model)
+        self._append(bodies)
+    
+    def record_remove(self, vehicle_id):
+        self._append([JOURNAL_REMOVE_RECORD.pack(JOURNAL_REMOVE, vehicle_id)])
+    
+    def record_price(self, vehicle_id, price):
+        self._append([JOURNAL_PRICE_RECORD.pack(JOURNAL_PRICE, vehicle_id, price, isinstance(price, int))])
+    
+    def record_discount(self, percentage):
+        self._append([JOURNAL_DISCOUNT_RECORD.pack(JOURNAL_DISCOUNT, percentage)])
+    
+    def record_clear(self):
+        self._append([JOURNAL_CLEAR_RECORD.pack(JOURNAL_CLEAR)])
+    
+    # Writing
+    def commit(self):
+        """Write every queued record and fsync once (a group commit)"""
+        with self._commit_lock:
+            chunks = []
+            while self._pending:
+                chunks.append(self._pending.popleft())
+            if chunks:
+                self._file.write(b''.join(chunks))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.commits += 1
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.commit()
+    
+    def start(self, fleet):
+        """Attach to a fleet and start group-committing its changes"""
+        self._file = open(self.filename, 'ab')
+        self.fleet = fleet
+        fleet.journal = self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        """Commit what is queued, stop the thread and detach from the fleet"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+        if self.fleet is not None:
+            self.fleet.journal = None
+            self.fleet = None
+    
+    # Recovery
+    def recover(self):
+        """Load the last checkpoint, replay the journal on it and start recording
+        
+        Returns the recovered Fleet.
+        """
+        if os.path.exists(self.snapshot_filename):
+            fleet = Fleet.load_snapshot(self.snapshot_filename)
+            self.sequence = fleet._snapshot.sequence
+        else:
+            fleet = Fleet()
+        
+        if os.path.exists(self.filename):
+            with open(self.filename, 'rb') as file:
+                data = file.read()
+            end, self.sequence = self.replay(data, fleet, self.sequence)
+            if end < len(data):
+                # Torn or corrupt tail from a crash: drop it before appending
+                with open(self.filename, 'r+b') as file:
+                    file.truncate(end)
+        
+        self.start(fleet)
+        return fleet
+    
+    @staticmethod
+    def replay(data, fleet, after=0):
+        """Apply the records of journal bytes with a sequence above `after` to a fleet
+        
+        Consecutive adds and removals are applied in batches. Returns
+        (bytes of valid records, last sequence number).
+        """
+        adds = []
+        removals = []
+        strings = {}  # encoded brand/model -> str, decoded once and shared
+        
+        def apply_batches():
+            if adds:
+                first_id = adds[0][0]
+                if fleet._next_id != first_id:
+                    raise ValueError(f"Journal expects vehicle ID {first_id}, fleet is at {fleet._next_id}")
+                fleet.add_vehicles(vehicle for _, vehicle in adds)
+                adds.clear()
+            if removals:
+                fleet.remove_vehicles(removals)
+                removals.clear()
+        
+        unpack_frame = JOURNAL_FRAME.unpack_from
+        crc32 = zlib.crc32
+        position = 0
+        sequence = after
+        while position + JOURNAL_FRAME.size <= len(data):
+            length, checksum, record_sequence = unpack_frame(data, position)
+            start = position + JOURNAL_FRAME.size
+            body = data[start:start + length]
+            if len(body) < length or crc32(body) != checksum or not body:
+                break
+            position = start + length
+            if record_sequence <= sequence:
+                continue  # already in the checkpoint snapshot
+            sequence = record_sequence
+            
+            kind = body[0]
+            if kind == JOURNAL_ADD:
+                record = JOURNAL_ADD_RECORDS[body[1]]
+                _, code, vehicle_id, price, year, registered_at, flags, brand_length, model_length, *extra = \
+                    record.unpack_from(body)
+                if flags:
+                    price = int(price) if flags & 1 else price
+                    extra = [int(value) if flags >> bit & 1 else value
+                             for bit, value in enumerate(extra, 1)]
+                start = record.size
+                encoded = body[start:start + brand_length]
+                brand = strings.get(encoded)
+                if brand is None:
+                    brand = strings[encoded] = encoded.decode('utf-8')
+                start += brand_length
+                encoded = body[start:start + model_length]
+                model = strings.get(encoded)
+                if model is None:
+                    model = strings[encoded] = encoded.decode('utf-8')
+                vehicle = VEHICLE_CLASSES[code](brand, model, price, year, *extra)
+                vehicle.registered_at = registered_at
+                if removals:
+                    apply_batches()
+                adds.append((vehicle_id, vehicle))
+            elif kind == JOURNAL_REMOVE:
+                if adds:
+                    apply_batches()
+                removals.append(JOURNAL_REMOVE_RECORD.unpack_from(body)[1])
+            else:
+                apply_batches()
+                if kind == JOURNAL_PRICE:
+                    _, vehicle_id, price, is_int = JOURNAL_PRICE_RECORD.unpack_from(body)
+                    fleet.get_vehicle(vehicle_id).price = int(price) if is_int else price
+                elif kind == JOURNAL_DISCOUNT:
+                    fleet.apply_global_discount(JOURNAL_DISCOUNT_RECORD.unpack_from(body)[1])
+                elif kind == JOURNAL_CLEAR:
+                    fleet.clear()
+        
+        apply_batches()
+        return position, sequence
+    
+    # Checkpoints
+    def checkpoint(self):
+        """Save the fleet to the snapshot file and empty the journal
+        
+        The snapshot is written to a temporary file and renamed over the
+        old one, and it stores the last sequence it includes, so a crash at
+        any point leaves a snapshot + journal pair that recovers the same
+        fleet. The fleet must not change while this runs. Returns False when
+        nothing was recorded since the last checkpoint, or when the journal
+        isn't open (before start()/recover() or after close()).
+        """
+        with self._commit_lock:
+            if self._file is None:
+                return False
+            if not self._pending and not os.fstat(self._file.fileno()).st_size:
+                return False
+            with self._lock:
+                sequence = self.sequence
+                chunks = list(self._pending)
+                self._pending.clear()
+            if chunks:
+                self._file.write(b''.join(chunks))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            
+            fleet = self.fleet
+            if fleet._snapshot is not None:
+                fleet._materialize_snapshot()  # it maps the file about to be replaced
+            fleet._fold_adjustments()
+            
+            temporary = self.snapshot_filename + '.tmp'
+            write_snapshot(temporary, fleet, sequence=sequence)
+            with open(temporary, 'rb+') as file:
+                os.fsync(file.fileno())
+            os.replace(temporary, self.snapshot_filename)
+            
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            return True
+    
+    @property
+    def size(self):
+        """Bytes in the journal file (written since the last checkpoint)"""
+        return os.fstat(self._file.fileno()).st_size if self._file is not None else 0
+
+# ============================================
+# 3.8 CONCURRENT FLEET (several threads at once)
+# ============================================
+def synchronized(method):
+    """Run a ConcurrentFleet method under its lock, after merging the insert buffers"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            self._merge_buffers()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ConcurrentFleet(Fleet):
+    """Fleet that many threads can add to, change and read at the same time
+    
+    add_vehicle() only appends to an insert buffer owned by the calling
+    thread, so ingestion threads don't wait on each other; a buffer is
+    merged into the fleet as one add_vehicles() batch when it holds
+    BUFFER_SIZE vehicles. Every other operation holds the fleet lock and
+    merges all buffers first, so it sees every vehicle added before it.
+    
+    Reads are consistent: get_summary() runs under the lock, and filters,
+    searches, query candidates and vehicles are copied under it, so they
+    never mix in half of a concurrent change. Vehicles get their IDs when
+    their buffer is merged (flush() merges every buffer).
+    """
+    BUFFER_SIZE = 256
+    
+    def __init__(self, debug=False):
+        super().__init__(debug)
+        self._lock = threading.RLock()
+        self._buffers = []  # (thread, deque of vehicles) for every thread that added
+        self._local = threading.local()
+    
+    def _merge_buffers(self):
+        """Move every buffered vehicle into the fleet (hold the lock)"""
+        vehicles = []
+        for _, buffer in self._buffers:
+            # The owner may append while this runs; only take what is there now
+            vehicles.extend([buffer.popleft() for _ in range(len(buffer))])
+        if vehicles:
+            Fleet.add_vehicles(self, vehicles)
+            self._buffers = [(thread, buffer) for thread, buffer in self._buffers
+                             if buffer or thread.is_alive()]
+    
+    @log_operation
+    def add_vehicle(self, vehicle):
+        """Queue a vehicle in this thread's insert buffer (merged in batches)"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = deque()
+            with self._lock:
+                self._buffers.append((threading.current_thread(), buffer))
+        buffer.append(vehicle)
+        if len(buffer) >= self.BUFFER_SIZE:
+            with self._lock:
+                self._merge_buffers()
+        return True
+    
+    def flush(self):
+        """Merge every insert buffer now, so all added vehicles have their IDs"""
+        with self._lock:
+            self._merge_buffers()
+    
+    # Changes
+    add_vehicles = synchronized(Fleet.add_vehicles)
+    remove_vehicle_by_id = synchronized(Fleet.remove_vehicle_by_id)
+    remove_vehicles = synchronized(Fleet.remove_vehicles)
+    apply_global_discount = synchronized(Fleet.apply_global_discount)
+    compact = synchronized(Fleet.compact)
+    clear = synchronized(Fleet.clear)
+    close = synchronized(Fleet.close)
+    _set_price = synchronized(Fleet._set_price)
+    
+    @log_operation
+    @synchronized
+    def remove_vehicle(self, index):
+        """Remove a vehicle from the fleet by index (position in fleet.vehicles)"""
+        vehicles = Fleet.vehicles.fget(self)  # the live list, not a copy
+        if 0 <= index < len(vehicles):
+            vehicle = self._remove(vehicles[index].vehicle_id)
+            self._maybe_compact()
+            return vehicle
+        return None
+    
+    def _fold(self, vehicle):
+        # Called when reading a price; it must not interleave with a discount
+        with self._lock:
+            super()._fold(vehicle)
+    
+    # Reads
+    get_summary = synchronized(Fleet.get_summary)
+    get_vehicle = synchronized(Fleet.get_vehicle)
+    preview_discount = synchronized(Fleet.preview_discount)
+    evaluate_scenarios = synchronized(Fleet.evaluate_scenarios)
+    group_by = synchronized(Fleet.group_by)
+    compute_taxes = synchronized(Fleet.compute_taxes)
+    export_inventory = synchronized(Fleet.export_inventory)
+    export_inventories = synchronized(Fleet.export_inventories)
+    save_snapshot = synchronized(Fleet.save_snapshot)
+    _shared_columns = synchronized(Fleet._shared_columns)
+    __len__ = synchronized(Fleet.__len__)
+    
+    @property
+    def vehicles(self):
+        """Copy of the list of vehicles"""
+        with self._lock:
+            self._merge_buffers()
+            return list(Fleet.vehicles.fget(self))
+    
+    @synchronized
+    def __iter__(self):
+        return iter(list(Fleet.__iter__(self)))
+    
+    @synchronized
+    def filter_by_brand(self, brand):
+        return FilterResult([list(super().filter_by_brand(brand))])
+    
+    @synchronized
+    def filter_by_year(self, min_year):
+        return FilterResult([list(super().filter_by_year(min_year))])
+    
+    @synchronized
+    def filter_by_type(self, vehicle_type):
+        return FilterResult([list(super().filter_by_type(vehicle_type))])
+    
+    @synchronized
+    def search(self, text):
+        found = super().search(text)
+        return SearchResult(found.text, found.names, [list(found)])
+    
+    @synchronized
+    def _query_plan(self, query):
+        plan = super()._query_plan(query)
+        candidates = plan.candidates
+        if plan.ordered and query.max_rows is not None and set(query.predicates()) <= set(plan.covered):
+            # Nothing left to check: the first rows of the index are the answer
+            candidates = islice(candidates, query.offset + query.max_rows)
+        return plan._replace(candidates=list(candidates))
+
+# ============================================
+# 3.9 PARALLEL ANALYTICS (shared memory)
+# ============================================
+# Columns copied into one shared memory block, in this order (widest items
+# first, so every column stays aligned): name, array typecode
+SHARED_COLUMNS = (
+    ('price', 'd'),
+    ('autonomy', 'd'),
+    ('load_capacity', 'd'),
+    ('year', 'i'),
+    ('brand', 'I'),  # code into SharedFleetColumns.brands
+    ('model', 'I'),  # code into SharedFleetColumns.models
+    ('type', 'b'),  # index into VEHICLE_CLASSES
+)
+# (VAT rate, tax multiplier) per type code, for taxes computed like calculate_tax
+SHARED_TAX_RATES = [(cls.VAT_RATE, cls.TAX_MULTIPLIER) for cls in VEHICLE_CLASSES]
+
+
+def shared_column_views(buffer, count):
+    """{column: memoryview} over a shared block holding `count` rows"""
+    views = {}
+    position = 0
+    for name, typecode in SHARED_COLUMNS:
+        size = count * array(typecode).itemsize
+        views[name] = buffer[position:position + size].cast(typecode)
+        position += size
+    return views
+
+
+def aggregate_columns(columns, keys, metrics):
+    """Per-group aggregates of some rows given as {column: sequence} (see SHARED_COLUMNS)
+    
+    Rows are grouped by the values of the `keys` columns (a tuple of column
+    names). Returns {group: [rows, {metric: (count, total, min, max)}]};
+    metrics only some types have (see GROUP_METRICS) skip the other rows.
+    """
+    types = columns['type']
+    prices = columns['price']
+    key_columns = [columns[key] for key in keys]
+    groups = hash_groups(zip(*key_columns) if len(keys) > 1 else key_columns[0], range(len(types)))
+    
+    partials = {}
+    for group, rows in groups.items():
+        stats = {}
+        for metric in metrics:
+            only = GROUP_METRICS[metric]
+            if only is None:
+                selected = rows
+            else:
+                code = VEHICLE_TYPE_CODES[only]
+                selected = [row for row in rows if types[row] == code]
+                if not selected:
+                    continue
+            if metric == 'tax':
+                # Same operation order as Vehicle.calculate_tax
+                values = [prices[row] * SHARED_TAX_RATES[types[row]][0] * SHARED_TAX_RATES[types[row]][1]
+                          for row in selected]
+            else:
+                values = list(map(columns[metric].__getitem__, selected))
+            stats[metric] = (len(values), sum(values), min(values), max(values))
+        partials[group] = [len(rows), stats]
+    return partials
+
+
+def shared_aggregate_shard(name, count, start, stop, keys, metrics):
+    """aggregate_columns() over rows [start, stop) of a shared block (runs in a worker)"""
+    memory = shared_memory.SharedMemory(name=name)
+    views = shared_column_views(memory.buf, count)
+    shard = {column: view[start:stop] for column, view in views.items()}
+    try:
+        return aggregate_columns(shard, keys, metrics)
+    finally:
+        # Every view must be released before the block can be closed
+        for view in chain(shard.values(), views.values()):
+            view.release()
+        memory.close()
+
+
+def merge_partials(partials, rename=None):
+    """Combine the {group: [rows, stats]} results of shared_aggregate_shard
+    
+    `rename(group)` maps groups that belong together to one key.
+    """
+    merged = {}
+    for shard in partials:
+        for group, (rows, stats) in shard.items():
+            if rename is not None:
+                group = rename(group)
+            total = merged.get(group)
+            if total is None:
+                merged[group] = [rows, dict(stats)]
+                continue
+            total[0] += rows
+            for metric, (count, value, low, high) in stats.items():
+                current = total[1].get(metric)
+                if current is None:
+                    total[1][metric] = (count, value, low, high)
+                else:
+                    total[1][metric] = (current[0] + count, current[1] + value,
+                                        min(current[2], low), max(current[3], high))
+    return merged
+
+
+class SharedFleetColumns:
+    """Numeric columns of a fleet in shared memory, aggregated by worker processes
+    
+    The fleet is copied once into a shared memory block (prices with any
+    queued discounts folded in); worker processes attach to it by name and
+    reduce their own shard of rows to per-group partial totals, so no
+    Vehicle is pickled and only small dicts travel back. The copy does not
+    follow later changes to the fleet: build a new one (or call refresh())
+    after changing it.
+    
+    Percentiles need every value of a group in one place, so group_by()
+    here returns MetricStats without them (see Fleet.group_by).
+    
+    Use as a context manager, or call close() to free the block and workers.
+    """
+    def __init__(self, fleet, workers=None, shards_per_worker=4):
+        self.workers = workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self.memory = None
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.refresh(fleet)
+    
+    def refresh(self, fleet):
+        """Copy the current state of the fleet into a new shared block"""
+        columns, self.brands, self.models = fleet._shared_columns()
+        self.count = len(columns['type'])
+        size = sum(self.count * array(typecode).itemsize for _, typecode in SHARED_COLUMNS)
+        
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        position = 0
+        for name, typecode in SHARED_COLUMNS:
+            data = memoryview(columns[name]).cast('B')
+            memory.buf[position:position + len(data)] = data
+            position += len(data)
+        self._release()
+        self.memory = memory
+    
+    def _release(self):
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+    
+    def close(self):
+        """Stop the workers and free the shared block"""
+        self.executor.shutdown()
+        self._release()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _aggregate(self, keys, metrics, rename=None):
+        """Merged per-group aggregates of every row, computed by the workers"""
+        shards = self.workers * self.shards_per_worker
+        shard_size = max(1, -(-self.count // shards))
+        futures = [self.executor.submit(shared_aggregate_shard, self.memory.name, self.count,
+                                        start, min(start + shard_size, self.count), keys, metrics)
+                   for start in range(0, self.count, shard_size)]
+        return merge_partials((future.result() for future in futures), rename)
+    
+    def get_summary(self):
+        """Same dict as Fleet.get_summary(), totalled by the workers"""
+        groups = self._aggregate(('type',), ('price', 'tax'))
+        summary = {'total': self.count, 'total_value': 0, 'total_tax': 0,
+                   'by_type': {}, 'value_by_type': {}, 'tax_by_type': {}}
+        for code, (rows, stats) in sorted(groups.items()):
+            vehicle_type = VEHICLE_CLASSES[code].__name__
+            summary['by_type'][vehicle_type] = rows
+            summary['value_by_type'][vehicle_type] = stats['price'][1]
+            summary['tax_by_type'][vehicle_type] = stats['tax'][1]
+        summary['total_value'] = sum(summary['value_by_type'].values())
+        summary['total_tax'] = sum(summary['tax_by_type'].values())
+        return summary
+    
+    def group_by(self, key, metrics=('price', 'tax'), bucket=None):
+        """Fleet.group_by() computed by the workers (MetricStats have no percentiles)"""
+        if key not in GROUP_KEYS:
+            raise ValueError(f"Cannot group by {key!r}, use one of: {', '.join(GROUP_KEYS)}")
+        unknown = [metric for metric in metrics if metric not in GROUP_METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+        if bucket is not None and key != 'year':
+            raise ValueError("Only years can be grouped in buckets")
+        
+        if key == 'type':
+            rename = lambda code: VEHICLE_CLASSES[code].__name__
+        elif key == 'year':
+            rename = None if bucket is None else (lambda year: year - year % bucket)
+        else:
+            # Spellings that only differ in case are one group, shown as the first one
+            names = self.brands if key == 'brand' else self.models
+            spelling = first_spelling(names)
+            rename = lambda code: spelling(names[code])
+        groups = self._aggregate((key,), metrics, rename)
+        
+        results = {}
+        for group in sorted(groups):
+            rows, stats = groups[group]
+            results[group] = {'count': rows}
+            for metric in metrics:
+                values = stats.get(metric)
+                if values is None:
+                    results[group][metric] = None
+                else:
+                    count, total, low, high = values
+                    results[group][metric] = MetricStats(count, total, total / count, low, high, {})
+        return results
+    
+    def evaluate_scenarios(self, scenarios):
+        """Fleet.evaluate_scenarios() with the group totals computed by the workers"""
+        scenarios = as_scenarios(scenarios)
+        if any(scenario.by_brand for scenario in scenarios):
+            lowered = [brand.lower() for brand in self.brands]
+            rename = lambda group: (VEHICLE_CLASSES[group[0]].__name__, lowered[group[1]])
+            groups = self._aggregate(('type', 'brand'), ('price', 'tax'), rename)
+        else:
+            # A single key column gives plain type codes as groups, not tuples
+            rename = lambda code: (VEHICLE_CLASSES[code].__name__, None)
+            groups = self._aggregate(('type',), ('price', 'tax'), rename)
+        return price_scenarios(scenarios, {group: (stats['price'][1], stats['tax'][1])
+                                           for group, (_, stats) in groups.items()})
+
+# ============================================
+# 4. GRAPHICAL INTERFACE
+# ============================================
+class BackgroundTask:
+    """Handle given to a function running in a BackgroundWorker"""
+    def __init__(self, description):
+        self.description = description
+        self.done = 0
+        self.total = 0  # 0 while the total is unknown
+        self._cancelled = threading.Event()
+    
+    def progress(self, done, total=0):
+        """Report progress (from the worker); raises OperationCancelled after cancel()"""
+        self.done = done
+        self.total = total
+        if self._cancelled.is_set():
+            raise OperationCancelled(f"{self.description} cancelled")
+    
+    def cancel(self):
+        """Ask the task to stop at its next progress() call"""
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class BackgroundWorker:
+    """Runs long fleet operations off the Tk main thread
+    
+    Tasks run one at a time on a single worker thread (the fleet itself is
+    not thread-safe). The Tk thread polls the future with after() and calls
+    the callbacks there, so widgets are never touched from the worker.
+    """
+    POLL_MS = 50
+    
+    def __init__(self, widget, on_progress):
+        self.widget = widget
+        self.on_progress = on_progress  # on_progress(task), or (None) when it ends
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-worker")
+        self.current = None
+    
+    @property
+    def busy(self):
+        return self.current is not None
+    
+    def submit(self, description, function, on_done, on_error):
+        """Run function(task) in the worker, then on_done(result) or on_error(exception)"""
+        task = BackgroundTask(description)
+        future = self.executor.submit(function, task)
+        self.current = task
+        self.widget.after(self.POLL_MS, self._poll, task, future, on_done, on_error)
+        return task
+    
+    def _poll(self, task, future, on_done, on_error):
+        if not future.done():
+            self.on_progress(task)
+            self.widget.after(self.POLL_MS, self._poll, task, future, on_done, on_error)
+            return
+        
+        self.current = None
+        self.on_progress(None)
+        try:
+            result = future.result()
+        except Exception as e:
+            on_error(e)
+        else:
+            on_done(result)
+    
+    def shutdown(self):
+        """Cancel the running task and wait until the worker thread is done with it"""
+        if self.current is not None:
+            self.current.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Treeview column -> QUERY_ORDER_KEYS field, for the sortable vehicle lists
+VEHICLE_SORT_FIELDS = {
+    "Type": "type",
+    "Brand": "brand",
+    "Model": "model",
+    "Price": "price",
+    "Year": "year",
+    "Tax": "tax",
+}
+
+
+class VehicleTable:
+    """Virtualized Treeview: only the rows in view exist in Tk
+    
+    Vehicles are pulled from `source` (a FleetQuery, a Fleet, a FilterResult
+    or a list; it is iterated again when needed) in pages as the user scrolls,
+    and only the visible rows are formatted by format_row(index, vehicle).
+    Clicking a sortable column heading orders the rows by that column;
+    the top rows are picked with heapq (or the query's own planner) instead
+    of sorting and formatting the whole result.
+    
+    While is_busy() is true (a background task may be changing the fleet)
+    the source is left alone: scrolling only shows rows already fetched,
+    and heading clicks are ignored.
+    """
+    PAGE_SIZE = 200
+    
+    def __init__(self, master, columns, format_row, height=15, sort_fields=None, is_busy=None):
+        self.format_row = format_row
+        self.is_busy = is_busy or (lambda: False)
+        self.height = height
+        self.sort_fields = sort_fields or {}  # column -> QUERY_ORDER_KEYS field
+        self.columns = columns
+        
+        self.tree = ttk.Treeview(master, columns=columns, show="headings", height=height)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+            if col in self.sort_fields:
+                self.tree.heading(col, command=lambda col=col: self.sort_by(col))
+        
+        # The scrollbar is driven by hand: it tracks the row offset, not the tree
+        self.scrollbar = ttk.Scrollbar(master, orient="vertical", command=self.yview)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
         
-        return len(self.vehicles)
+        self.set_source([])
     
-    # LIST COMPREHENSION FOR FILTERING
-    def filter_by_brand(self, brand):
-        """Filter vehicles by brand using list comprehension"""
-        return [v for v in self.vehicles if v.brand.lower() == brand.lower()]
+    def pack(self, **options):
+        self.tree.pack(side="left", fill="both", expand=True, **options)
+        self.scrollbar.pack(side="right", fill="y")
     
-    def filter_by_year(self, min_year):
-        """Filter vehicles by minimum year"""
-        return [v for v in self.vehicles if v.year >= min_year]
+    def set_source(self, source, total=None):
+        """Show the vehicles of `source`; total is its length if len() can't tell"""
+        self.source = source
+        self.total = len(source) if total is None and hasattr(source, '__len__') else total
+        self.order_column = None
+        self.descending = False
+        self._update_headings()
+        self.refresh(keep_offset=False)
     
-    def filter_by_type(self, vehicle_type):
-        """Filter vehicles by type (class)"""
-        return [v for v in self.vehicles if v.__class__.__name__ == vehicle_type]
+    def refresh(self, keep_offset=True):
+        """Fetch the rows again (after the fleet changed), keeping the scroll position"""
+        if hasattr(self.source, '__len__'):
+            self.total = len(self.source)
+        self._rows = []
+        self._exhausted = False
+        self._selected = set()
+        if not keep_offset:
+            self.offset = 0
+        self._render()
     
-    # FILE WRITING
-    def export_inventory(self, filename, format_type='csv'):
-        """Export inventory to file (txt, csv, or json)"""
-        if not self.vehicles:
-            return False, "No vehicles to export!"
-        
-        try:
-            if format_type == 'txt':
-                with open(filename, 'w', encoding='utf-8') as file:
-                    file.write("=" * 50 + "\n")
-                    file.write("FLEET INVENTORY\n")
-                    file.write(f"Export date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    file.write("=" * 50 + "\n\n")
-                    
-                    for i, vehicle in enumerate(self.vehicles, 1):
-                        file.write(f"VEHICLE {i}:\n")
-                        file.write(f"  Type: {vehicle.__class__.__name__}\n")
-                        file.write(f"  Brand: {vehicle.brand}\n")
-                        file.write(f"  Model: {vehicle.model}\n")
-                        file.write(f"  Price: €{vehicle.price:.2f}\n")
-                        file.write(f"  Tax: €{vehicle.calculate_tax():.2f}\n")
-                        file.write(f"  Year: {vehicle.year}\n")
-                        
-                        if isinstance(vehicle, ElectricCar):
-                            file.write(f"  Battery capacity: {vehicle.battery_capacity}kWh\n")
-                            file.write(f"  Autonomy: {vehicle.autonomy}km\n")
-                        elif isinstance(vehicle, Truck):
-                            file.write(f"  Load capacity: {vehicle.load_capacity}t\n")
-                            file.write(f"  Length: {vehicle.length}m\n")
-                        
-                        file.write("\n" + "-" * 40 + "\n\n")
-                    
-                    # Summary
-                    file.write("=" * 50 + "\n")
-                    file.write("FLEET SUMMARY\n")
-                    file.write(f"Total vehicles: {len(self.vehicles)}\n")
-                    file.write(f"Total fleet value: €{sum(v.price for v in self.vehicles):.2f}\n")
-                    file.write(f"Total tax: €{sum(v.calculate_tax() for v in self.vehicles):.2f}\n")
-                    file.write("=" * 50 + "\n")
-            
-            elif format_type == 'csv':
-                with open(filename, 'w', newline='', encoding='utf-8') as file:
-                    fields = ['type', 'brand', 'model', 'price', 'tax', 'year', 
-                             'battery_capacity', 'autonomy', 'load_capacity', 
-                             'length', 'registration_date']
-                    
-                    writer = csv.DictWriter(file, fieldnames=fields)
-                    writer.writeheader()
-                    
-                    for vehicle in self.vehicles:
-                        writer.writerow(vehicle.to_dict())
-            
-            elif format_type == 'json':
-                data = {
-                    'export_date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'total_vehicles': len(self.vehicles),
-                    'total_value': sum(v.price for v in self.vehicles),
-                    'total_tax': sum(v.calculate_tax() for v in self.vehicles),
-                    'vehicles': [vehicle.to_dict() for vehicle in self.vehicles]
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as file:
-                    json.dump(data, file, indent=4, ensure_ascii=False)
-            
-            else:
-                return False, "Unsupported format!"
-            
-            return True, f"Inventory exported successfully to '{filename}'!"
-        
-        except Exception as e:
-            return False, f"Error exporting inventory: {str(e)}"
+    def sort_by(self, column):
+        """Order by a column; clicking the same column again reverses the order"""
+        if self.is_busy():
+            return
+        if column == self.order_column:
+            self.descending = not self.descending
+        else:
+            self.order_column = column
+            self.descending = False
+        self._update_headings()
+        self.refresh(keep_offset=False)
     
-    def get_summary(self):
-        """Get fleet summary statistics"""
-        if not self.vehicles:
-            return {
-                'total': 0,
-                'total_value': 0,
-                'total_tax': 0,
-                'by_type': {}
-            }
-        
-        summary = {
-            'total': len(self.vehicles),
-            'total_value': sum(v.price for v in self.vehicles),
-            'total_tax': sum(v.calculate_tax() for v in self.vehicles),
-            'by_type': {}
-        }
-        
-        for vehicle in self.vehicles:
-            vehicle_type = vehicle.__class__.__name__
-            if vehicle_type not in summary['by_type']:
-                summary['by_type'][vehicle_type] = 0
-            summary['by_type'][vehicle_type] += 1
-        
-        return summary
+    def _update_headings(self):
+        for col in self.sort_fields:
+            arrow = (" ▼" if self.descending else " ▲") if col == self.order_column else ""
+            self.tree.heading(col, text=col + arrow)
+    
+    def selected_vehicles(self):
+        """Selected vehicles, including rows scrolled out of view"""
+        return [self._rows[index] for index in sorted(self._selected) if index < len(self._rows)]
+    
+    # Data
+    def _fetch(self, count):
+        """First `count` vehicles of the source in the current order"""
+        field = self.sort_fields.get(self.order_column)
+        if field is None:
+            return list(islice(self.source, count))
+        if isinstance(self.source, FleetQuery):
+            return self.source.order_by(field, self.descending).limit(count).all()
+        select = heapq.nlargest if self.descending else heapq.nsmallest
+        return select(count, self.source, key=QUERY_ORDER_KEYS[field])
+    
+    def _ensure(self, count):
+        """Make sure the first `count` rows are fetched (pages double in size)"""
+        if count <= len(self._rows) or self._exhausted or self.is_busy():
+            return
+        wanted = max(count + self.PAGE_SIZE, 2 * len(self._rows))
+        self._rows = self._fetch(wanted)
+        self._exhausted = len(self._rows) < wanted
+    
+    def _row_count(self):
+        if self.total is not None:
+            return self.total
+        # Unknown length: let the scrollbar reach one page past what is loaded
+        return len(self._rows) + (0 if self._exhausted else self.PAGE_SIZE)
+    
+    # View
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')"""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * self._row_count())
+        elif args[0] == "scroll":
+            step = self.height if args[2] == "pages" else 1
+            self.offset += int(args[1]) * step
+        self._render()
+    
+    def scroll(self, rows):
+        self.offset += rows
+        self._render()
+        return "break"
+    
+    def _render(self):
+        """Put the rows in view (and only those) in the tree"""
+        self._ensure(self.offset + 2 * self.height)
+        total = self._row_count()
+        self.offset = max(0, min(self.offset, total - self.height))
+        
+        rows = self._rows[self.offset:self.offset + self.height]
+        self.tree.delete(*self.tree.get_children())
+        for index, vehicle in enumerate(rows, self.offset):
+            self.tree.insert("", "end", iid=str(index), values=self.format_row(index, vehicle))
+        
+        visible = [str(index) for index in self._selected
+                   if self.offset <= index < self.offset + len(rows)]
+        self.tree.selection_set(visible)
+        
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def _on_select(self, event=None):
+        first, last = self.offset, self.offset + self.height
+        self._selected = {index for index in self._selected if not first <= index < last}
+        self._selected.update(map(int, self.tree.selection()))
 
 
-# ============================================
-# 4. GRAPHICAL INTERFACE
-# ============================================
 class FleetManagementApp(ctk.CTk):
     """Main application window"""
-    def __init__(self):
+    COMPACT_INTERVAL_MS = 30_000  # how often removed vehicles are compacted away
+    CHECKPOINT_INTERVAL_MS = 60_000  # how often a journaled fleet is checkpointed
+    SEARCH_DEBOUNCE_MS = 150  # typing pause before the filter view searches
+    BREAKDOWN_SYNC_LIMIT = 50_000  # larger fleets get their breakdown and recent vehicles in the background
+    BREAKDOWN_RETRY_MS = 250  # wait for the worker before computing a breakdown or recent vehicles
+    # Dashboard breakdown choices: label -> (group_by key, year bucket)
+    BREAKDOWNS = {
+        "Brand": ('brand', None),
+        "Model": ('model', None),
+        "Type": ('type', None),
+        "Year": ('year', None),
+        "5 Years": ('year', 5),
+    }
+    
+    def __init__(self, fleet=None):
         super().__init__()
         
-        self.fleet = Fleet()
+        # Any Fleet implementation works here (e.g. ColumnarFleet for large
+        # fleets, SQLiteFleet to keep the fleet between runs, ConcurrentFleet
+        # to feed it from other threads too)
+        self.fleet = fleet if fleet is not None else Fleet()
+        self.worker = BackgroundWorker(self, self.show_progress)
+        
+        # Views are built once and kept; data_version tells them when to refresh
+        self.fonts = {}
+        self.views = {}
+        self.view_versions = {}
+        self.current_view = None
+        self.data_version = 0
+        self.search_job = None
+        self.breakdown_job = None
+        self.breakdowns = {}  # (key, bucket) -> group_by() result for breakdowns_version
+        self.breakdowns_version = None
+        self.recent_job = None
+        self.recent = []  # newest vehicles, for recent_version
+        self.recent_version = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.setup_ui()
-        self.load_sample_data()
+        
+        # Show dashboard initially. Emptiness is checked first, because for a
+        # large fleet the dashboard already starts the background worker.
+        empty = not len(self.fleet)
+        self.update_status()
+        self.show_dashboard()
+        if empty:
+            self.load_sample_data()
+        self.after(self.COMPACT_INTERVAL_MS, self.compact_fleet)
+        self.after(self.CHECKPOINT_INTERVAL_MS, self.checkpoint_fleet)
+    
+    def compact_fleet(self):
+        """Periodically drop the tombstones left by removed vehicles"""
+        if not self.worker.busy:
+            self.fleet.compact()
+        self.after(self.COMPACT_INTERVAL_MS, self.compact_fleet)
+    
+    def checkpoint_fleet(self):
+        """Periodically fold the journal of a journaled fleet into its snapshot"""
+        journal = self.fleet.journal
+        if journal is not None and not self.worker.busy:
+            journal.checkpoint()
+        self.after(self.CHECKPOINT_INTERVAL_MS, self.checkpoint_fleet)
+    
+    def on_close(self):
+        """Cancel any running operation and close the window
+        
+        The worker is waited for, so the final checkpoint sees a fleet that
+        no longer changes.
+        """
+        self.worker.shutdown()
+        journal = self.fleet.journal
+        if journal is not None:
+            journal.checkpoint()
+            journal.close()
+        self.fleet.close()
+        self.destroy()
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -291,11 +3923,12 @@ class FleetManagementApp(ctk.CTk):
         title_label = ctk.CTkLabel(
             sidebar, 
             text="Fleet Manager", 
-            font=ctk.CTkFont(size=20, weight="bold")
+            font=self.font(20, "bold")
         )
         title_label.pack(pady=(20, 30))
         
-        # Navigation buttons
+        # Navigation buttons (disabled while a background operation runs)
+        self.nav_buttons = []
         buttons_info = [
             ("📊 Dashboard", self.show_dashboard),
             ("🚗 Add Vehicle", self.show_add_vehicle),
@@ -314,15 +3947,16 @@ class FleetManagementApp(ctk.CTk):
                 command=command,
                 height=40,
                 corner_radius=8,
-                font=ctk.CTkFont(size=14)
+                font=self.font(14)
             )
             btn.pack(pady=5, padx=10)
+            self.nav_buttons.append(btn)
         
         # Version info
         version_label = ctk.CTkLabel(
             sidebar, 
             text="Version 1.0.0\n© 2024 Fleet Management",
-            font=ctk.CTkFont(size=10)
+            font=self.font(10)
         )
         version_label.pack(side="bottom", pady=10)
     
@@ -335,16 +3969,13 @@ class FleetManagementApp(ctk.CTk):
         self.content_title = ctk.CTkLabel(
             self.content_frame, 
             text="Dashboard", 
-            font=ctk.CTkFont(size=24, weight="bold")
+            font=self.font(24, "bold")
         )
         self.content_title.pack(pady=(20, 10))
         
         # Content container
         self.content_container = ctk.CTkScrollableFrame(self.content_frame, corner_radius=10)
         self.content_container.pack(fill="both", expand=True, padx=20, pady=(0, 20))
-        
-        # Show dashboard initially
-        self.show_dashboard()
     
     def create_status_bar(self):
         """Create status bar at the bottom"""
@@ -354,15 +3985,28 @@ class FleetManagementApp(ctk.CTk):
         self.status_label = ctk.CTkLabel(
             status_bar, 
             text="Ready",
-            font=ctk.CTkFont(size=12)
+            font=self.font(12)
         )
         self.status_label.pack(side="left", padx=10)
         
+        # Progress of background operations (only shown while one runs)
+        self.progress_bar = ctk.CTkProgressBar(status_bar, width=200)
+        self.progress_bar.set(0)
+        self.cancel_button = ctk.CTkButton(
+            status_bar,
+            text="Cancel",
+            command=self.cancel_task,
+            width=70,
+            height=22,
+            fg_color="#D32F2F",
+            hover_color="#B71C1C"
+        )
+        
         # Vehicle count
         self.vehicle_count_label = ctk.CTkLabel(
             status_bar, 
             text="Vehicles: 0",
-            font=ctk.CTkFont(size=12)
+            font=self.font(12)
         )
         self.vehicle_count_label.pack(side="right", padx=10)
         
@@ -375,34 +4019,125 @@ class FleetManagementApp(ctk.CTk):
         summary = self.fleet.get_summary()
         self.vehicle_count_label.configure(text=f"Vehicles: {summary['total']}")
     
-    def clear_content(self):
-        """Clear the content container"""
-        for widget in self.content_container.winfo_children():
-            widget.destroy()
+    def worker_idle(self):
+        """Is the background worker free? Warns the user when it isn't
+        
+        The fleet is not thread-safe, so every handler that reads or changes
+        it from here checks this first.
+        """
+        if self.worker.busy:
+            messagebox.showwarning("Busy", f"Please wait: {self.worker.current.description.lower()} is still running.")
+            return False
+        return True
     
-    def show_dashboard(self):
-        """Show dashboard with statistics"""
-        self.clear_content()
-        self.content_title.configure(text="Dashboard")
+    def run_task(self, description, function, on_done):
+        """Run function(task) in the background worker, then on_done(result) here"""
+        if not self.worker_idle():
+            return
         
-        summary = self.fleet.get_summary()
+        for button in self.nav_buttons:
+            button.configure(state="disabled")
+        self.status_label.configure(text=f"{description}...")
+        self.worker.submit(description, function, on_done, self.task_failed)
+    
+    def task_failed(self, error):
+        """Report a background operation that was cancelled or raised"""
+        if isinstance(error, OperationCancelled):
+            self.update_status(str(error))
+        else:
+            self.update_status("Operation failed")
+            messagebox.showerror("Error", f"Operation failed: {error}")
+    
+    def cancel_task(self):
+        if self.worker.current is not None:
+            self.worker.current.cancel()
+            self.status_label.configure(text="Cancelling...")
+    
+    def show_progress(self, task):
+        """Update the status bar progress (task is None once it finished)"""
+        if task is None:
+            self.progress_bar.pack_forget()
+            self.cancel_button.pack_forget()
+            for button in self.nav_buttons:
+                button.configure(state="normal")
+            return
+        
+        if not self.progress_bar.winfo_ismapped():
+            self.cancel_button.pack(side="left", padx=5)
+            self.progress_bar.pack(side="left", padx=10)
+        if task.cancelled:
+            return
+        if task.total:
+            self.progress_bar.set(task.done / task.total)
+            self.status_label.configure(text=f"{task.description}... {task.done:,}/{task.total:,}")
+        else:
+            self.progress_bar.set(0)
+            self.status_label.configure(text=f"{task.description}... {task.done:,}")
+    
+    def font(self, size, weight="normal", family=None):
+        """Shared CTkFont for a size/weight/family (created once)"""
+        key = (size, weight, family)
+        font = self.fonts.get(key)
+        if font is None:
+            options = {'family': family} if family else {}
+            font = self.fonts[key] = ctk.CTkFont(size=size, weight=weight, **options)
+        return font
+    
+    def show_view(self, name, title):
+        """Switch the content area to a cached view
         
+        Returns (frame, built): built is True the first time, when the caller
+        has to create the view's widgets in the frame; afterwards it only
+        refreshes the values that depend on the fleet.
+        """
+        self.content_title.configure(text=title)
+        if self.current_view is not None:
+            self.views[self.current_view].pack_forget()
+        
+        view = self.views.get(name)
+        built = view is None
+        if built:
+            view = self.views[name] = ctk.CTkFrame(self.content_container, fg_color="transparent")
+        view.pack(fill="both", expand=True)
+        self.current_view = name
+        return view, built
+    
+    def is_stale(self, name):
+        """Did the fleet change since the view last showed it?"""
+        return self.view_versions.get(name) != self.data_version
+    
+    def fleet_changed(self):
+        """Mark every view stale and refresh the one on screen"""
+        self.data_version += 1
+        if self.current_view is not None:
+            getattr(self, f"show_{self.current_view}")()
+    
+    def show_dashboard(self):
+        """Show dashboard with statistics"""
+        view, built = self.show_view("dashboard", "Dashboard")
+        if built:
+            self.build_dashboard(view)
+        self.refresh_dashboard()
+    
+    def build_dashboard(self, view):
+        """Create the dashboard widgets; refresh_dashboard() fills in the values"""
         # Create statistics frame
-        stats_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        stats_frame = ctk.CTkFrame(view, corner_radius=10)
         stats_frame.pack(fill="x", pady=(0, 20))
         
         # Statistics cards
-        stats_data = [
-            ("Total Vehicles", f"{summary['total']}", "#4CC9F0"),
-            ("Total Value", f"€{summary['total_value']:,.2f}", "#4361EE"),
-            ("Total Tax", f"€{summary['total_tax']:,.2f}", "#3A0CA3"),
-            ("Avg. Value", f"€{summary['total_value']/max(summary['total'], 1):,.2f}", "#7209B7")
+        stats_cards = [
+            ("Total Vehicles", "#4CC9F0"),
+            ("Total Value", "#4361EE"),
+            ("Total Tax", "#3A0CA3"),
+            ("Avg. Value", "#7209B7")
         ]
         
         row_frame = ctk.CTkFrame(stats_frame)
         row_frame.pack(fill="x", padx=20, pady=20)
         
-        for i, (title, value, color) in enumerate(stats_data):
+        self.stat_labels = {}
+        for title, color in stats_cards:
             card = ctk.CTkFrame(row_frame, width=200, height=100, corner_radius=10)
             card.pack(side="left", padx=10, expand=True, fill="both")
             
@@ -410,99 +4145,255 @@ class FleetManagementApp(ctk.CTk):
             title_label = ctk.CTkLabel(
                 card, 
                 text=title,
-                font=ctk.CTkFont(size=14)
+                font=self.font(14)
             )
             title_label.pack(pady=(15, 5))
             
             # Value
             value_label = ctk.CTkLabel(
                 card, 
-                text=value,
-                font=ctk.CTkFont(size=22, weight="bold"),
+                text="",
+                font=self.font(22, "bold"),
                 text_color=color
             )
             value_label.pack(pady=5)
+            self.stat_labels[title] = value_label
+        
+        # Vehicle type distribution (one row per type, created when the type shows up)
+        self.dist_frame = ctk.CTkFrame(view, corner_radius=10)
+        dist_label = ctk.CTkLabel(
+            self.dist_frame,
+            text="Vehicle Distribution by Type",
+            font=self.font(16, "bold")
+        )
+        dist_label.pack(pady=(15, 10))
+        self.type_rows = {}
+        
+        # Breakdown per brand/model/type/year (Fleet.group_by)
+        self.breakdown_frame = ctk.CTkFrame(view, corner_radius=10)
+        breakdown_header = ctk.CTkFrame(self.breakdown_frame, fg_color="transparent")
+        breakdown_header.pack(fill="x", padx=20, pady=(15, 10))
+        
+        breakdown_label = ctk.CTkLabel(
+            breakdown_header,
+            text="Breakdown by",
+            font=self.font(16, "bold")
+        )
+        breakdown_label.pack(side="left")
+        
+        self.breakdown_var = ctk.StringVar(value="Brand")
+        breakdown_combo = ctk.CTkComboBox(
+            breakdown_header,
+            values=list(self.BREAKDOWNS),
+            variable=self.breakdown_var,
+            command=lambda choice: self.refresh_breakdown(),
+            width=150
+        )
+        breakdown_combo.pack(side="left", padx=10)
+        
+        columns = ("Group", "Vehicles", "Avg. Price", "Median Price", "P90 Price",
+                   "Min Price", "Max Price", "Avg. Tax")
+        self.breakdown_tree = ttk.Treeview(self.breakdown_frame, columns=columns, show="headings", height=6)
+        for col in columns:
+            self.breakdown_tree.heading(col, text=col)
+            self.breakdown_tree.column(col, width=100)
+        self.breakdown_tree.pack(fill="x", padx=20, pady=(0, 15))
+        
+        # Recent vehicles
+        self.recent_frame = ctk.CTkFrame(view, corner_radius=10)
+        recent_label = ctk.CTkLabel(
+            self.recent_frame,
+            text="Recent Vehicles",
+            font=self.font(16, "bold")
+        )
+        recent_label.pack(pady=(15, 10))
+        
+        self.recent_rows = []
+        for _ in range(5):
+            vehicle_frame = ctk.CTkFrame(self.recent_frame, height=50)
+            vehicle_info = ctk.CTkLabel(vehicle_frame, text="", font=self.font(12))
+            vehicle_info.pack(side="left", padx=10)
+            tax_label = ctk.CTkLabel(vehicle_frame, text="", font=self.font(12))
+            tax_label.pack(side="right", padx=10)
+            self.recent_rows.append((vehicle_frame, vehicle_info, tax_label))
+    
+    def refresh_dashboard(self):
+        """Update the dashboard values from the fleet summary (no widgets rebuilt)"""
+        summary = self.fleet.get_summary()
+        self.view_versions["dashboard"] = self.data_version
+        
+        stats_data = {
+            "Total Vehicles": f"{summary['total']}",
+            "Total Value": f"€{summary['total_value']:,.2f}",
+            "Total Tax": f"€{summary['total_tax']:,.2f}",
+            "Avg. Value": f"€{summary['total_value']/max(summary['total'], 1):,.2f}"
+        }
+        for title, value in stats_data.items():
+            self.stat_labels[title].configure(text=value)
+        
+        # Sections are re-packed in order, so hidden ones come back in place
+        self.dist_frame.pack_forget()
+        self.breakdown_frame.pack_forget()
+        self.recent_frame.pack_forget()
         
         # Vehicle type distribution
         if summary['by_type']:
-            dist_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
-            dist_frame.pack(fill="x", pady=(0, 20))
-            
-            dist_label = ctk.CTkLabel(
-                dist_frame,
-                text="Vehicle Distribution by Type",
-                font=ctk.CTkFont(size=16, weight="bold")
-            )
-            dist_label.pack(pady=(15, 10))
+            self.dist_frame.pack(fill="x", pady=(0, 20))
+            for type_frame, _, _ in self.type_rows.values():
+                type_frame.pack_forget()
             
             for vehicle_type, count in summary['by_type'].items():
-                type_frame = ctk.CTkFrame(dist_frame, height=40)
-                type_frame.pack(fill="x", padx=20, pady=5)
+                row = self.type_rows.get(vehicle_type)
+                if row is None:
+                    type_frame = ctk.CTkFrame(self.dist_frame, height=40)
+                    type_label = ctk.CTkLabel(
+                        type_frame,
+                        text=vehicle_type,
+                        font=self.font(14)
+                    )
+                    type_label.pack(side="left", padx=10)
+                    
+                    progress_bar = ctk.CTkProgressBar(type_frame)
+                    progress_bar.pack(side="left", padx=10, expand=True, fill="x")
+                    
+                    count_label = ctk.CTkLabel(type_frame, text="", font=self.font(14))
+                    count_label.pack(side="right", padx=10)
+                    row = self.type_rows[vehicle_type] = (type_frame, progress_bar, count_label)
                 
-                type_label = ctk.CTkLabel(
-                    type_frame,
-                    text=vehicle_type,
-                    font=ctk.CTkFont(size=14)
-                )
-                type_label.pack(side="left", padx=10)
+                type_frame, progress_bar, count_label = row
+                type_frame.pack(fill="x", padx=20, pady=5)
                 
                 # Progress bar
                 progress = (count / summary['total']) * 100
-                progress_bar = ctk.CTkProgressBar(type_frame)
-                progress_bar.pack(side="left", padx=10, expand=True, fill="x")
                 progress_bar.set(progress / 100)
-                
-                count_label = ctk.CTkLabel(
-                    type_frame,
-                    text=f"{count} ({progress:.1f}%)",
-                    font=ctk.CTkFont(size=14)
-                )
-                count_label.pack(side="right", padx=10)
+                count_label.configure(text=f"{count} ({progress:.1f}%)")
+        
+        # Breakdown (counted from the summary: the worker may be materializing a snapshot)
+        if summary['total']:
+            self.breakdown_frame.pack(fill="x", pady=(0, 20))
+            self.refresh_breakdown()
         
         # Recent vehicles
-        if self.fleet.vehicles:
-            recent_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
-            recent_frame.pack(fill="x")
+        if summary['total']:
+            self.recent_frame.pack(fill="x")
+            self.refresh_recent()
+    
+    def refresh_recent(self):
+        """Show the 5 newest vehicles, newest first
+        
+        Fleet answers this from its registration date order index, but a
+        ColumnarFleet, or a Fleet still backed by its snapshot, has to read
+        every row first. So large fleets get the list on the background
+        worker, as with the breakdown, and it is kept until the fleet changes.
+        """
+        if self.recent_job is not None:
+            self.after_cancel(self.recent_job)
+            self.recent_job = None
+        if self.recent_version == self.data_version:
+            self.show_recent(self.recent)
+            return
+        
+        query = self.fleet.query().order_by('registration_date', descending=True).limit(5)
+        if self.worker.busy:
+            self.recent_job = self.after(self.BREAKDOWN_RETRY_MS, self.refresh_recent)
+        elif len(self.fleet) < self.BREAKDOWN_SYNC_LIMIT:
+            self.recent = query.all()
+            self.recent_version = self.data_version
+            self.show_recent(self.recent)
+        else:
+            version = self.data_version
             
-            recent_label = ctk.CTkLabel(
-                recent_frame,
-                text="Recent Vehicles",
-                font=ctk.CTkFont(size=16, weight="bold")
-            )
-            recent_label.pack(pady=(15, 10))
+            def done(recent):
+                self.update_status()
+                if version == self.data_version:
+                    self.recent = recent
+                    self.recent_version = version
+                    if self.current_view == "dashboard":
+                        self.show_recent(recent)
             
-            # Show last 5 vehicles
-            for vehicle in self.fleet.vehicles[-5:]:
-                vehicle_frame = ctk.CTkFrame(recent_frame, height=50)
+            self.run_task("Finding recent vehicles", lambda task: query.all(), done)
+    
+    def show_recent(self, recent):
+        """Fill the recent vehicles rows"""
+        for i, (vehicle_frame, vehicle_info, tax_label) in enumerate(self.recent_rows):
+            if i < len(recent):
+                vehicle_info.configure(text=str(recent[i]))
+                tax_label.configure(text=f"Tax: €{recent[i].calculate_tax():.2f}")
                 vehicle_frame.pack(fill="x", padx=20, pady=5)
-                
-                vehicle_info = ctk.CTkLabel(
-                    vehicle_frame,
-                    text=str(vehicle),
-                    font=ctk.CTkFont(size=12)
-                )
-                vehicle_info.pack(side="left", padx=10)
-                
-                tax_label = ctk.CTkLabel(
-                    vehicle_frame,
-                    text=f"Tax: €{vehicle.calculate_tax():.2f}",
-                    font=ctk.CTkFont(size=12)
-                )
-                tax_label.pack(side="right", padx=10)
+            else:
+                vehicle_frame.pack_forget()
+    
+    def refresh_breakdown(self):
+        """Show the chosen breakdown, computing it if the fleet changed since
+        
+        Large fleets are grouped on the background worker; results are kept
+        until the fleet changes, so switching back and forth is instant.
+        """
+        if self.breakdown_job is not None:
+            self.after_cancel(self.breakdown_job)
+            self.breakdown_job = None
+        if self.breakdowns_version != self.data_version:
+            self.breakdowns = {}
+            self.breakdowns_version = self.data_version
+        
+        choice = self.BREAKDOWNS[self.breakdown_var.get()]
+        groups = self.breakdowns.get(choice)
+        if groups is not None:
+            self.show_breakdown(choice, groups)
+            return
+        
+        key, bucket = choice
+        if self.worker.busy:
+            self.breakdown_job = self.after(self.BREAKDOWN_RETRY_MS, self.refresh_breakdown)
+        elif len(self.fleet) < self.BREAKDOWN_SYNC_LIMIT:
+            self.breakdowns[choice] = self.fleet.group_by(key, bucket=bucket)
+            self.show_breakdown(choice, self.breakdowns[choice])
+        else:
+            version = self.data_version
+            
+            def done(groups):
+                self.update_status()
+                if version == self.breakdowns_version:
+                    self.breakdowns[choice] = groups
+                    if self.current_view == "dashboard":
+                        self.refresh_breakdown()
+            
+            self.run_task("Computing breakdown", lambda task: self.fleet.group_by(key, bucket=bucket), done)
+    
+    def show_breakdown(self, choice, groups):
+        """Fill the breakdown table with a group_by() result"""
+        tree = self.breakdown_tree
+        tree.delete(*tree.get_children())
+        
+        _, bucket = choice
+        for group, stats in groups.items():
+            price = stats['price']
+            name = f"{group}-{group + bucket - 1}" if bucket else str(group)
+            tree.insert("", "end", values=(
+                name,
+                stats['count'],
+                f"€{price.mean:,.2f}",
+                f"€{price.percentiles[50]:,.2f}",
+                f"€{price.percentiles[90]:,.2f}",
+                f"€{price.min:,.2f}",
+                f"€{price.max:,.2f}",
+                f"€{stats['tax'].mean:,.2f}"
+            ))
     
     def show_add_vehicle(self):
         """Show add vehicle form"""
-        self.clear_content()
-        self.content_title.configure(text="Add New Vehicle")
+        view, built = self.show_view("add_vehicle", "Add New Vehicle")
+        if not built:
+            return
         
-        form_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        form_frame = ctk.CTkFrame(view, corner_radius=10)
         form_frame.pack(fill="x", pady=(0, 20), padx=20)
         
         # Vehicle type selection
         type_label = ctk.CTkLabel(
             form_frame,
             text="Vehicle Type:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         type_label.grid(row=0, column=0, padx=20, pady=20, sticky="w")
         
@@ -527,7 +4418,7 @@ class FleetManagementApp(ctk.CTk):
         
         self.entries = {}
         for i, (label_text, entry_name) in enumerate(fields, 1):
-            label = ctk.CTkLabel(form_frame, text=label_text, font=ctk.CTkFont(size=14))
+            label = ctk.CTkLabel(form_frame, text=label_text, font=self.font(14))
             label.grid(row=i, column=0, padx=20, pady=10, sticky="w")
             
             entry = ctk.CTkEntry(form_frame, width=200)
@@ -584,7 +4475,7 @@ class FleetManagementApp(ctk.CTk):
             return
         
         for i, (label_text, entry_name) in enumerate(fields):
-            label = ctk.CTkLabel(self.special_fields_frame, text=label_text, font=ctk.CTkFont(size=14))
+            label = ctk.CTkLabel(self.special_fields_frame, text=label_text, font=self.font(14))
             label.grid(row=i, column=0, padx=20, pady=10, sticky="w")
             
             entry = ctk.CTkEntry(self.special_fields_frame, width=200)
@@ -593,6 +4484,8 @@ class FleetManagementApp(ctk.CTk):
     
     def add_vehicle_submit(self):
         """Handle add vehicle form submission"""
+        if not self.worker_idle():
+            return
         try:
             # Get common fields
             brand = self.entries['brand_entry'].get()
@@ -623,6 +4516,8 @@ class FleetManagementApp(ctk.CTk):
                 messagebox.showinfo("Success", f"Vehicle added successfully!\n\n{vehicle}")
                 self.clear_add_form()
                 self.update_status(f"Added {brand} {model}")
+                # Every view is stale now; the dashboard refreshes as it is shown
+                self.data_version += 1
                 self.show_dashboard()
         
         except ValueError as e:
@@ -637,64 +4532,39 @@ class FleetManagementApp(ctk.CTk):
     
     def show_remove_vehicle(self):
         """Show remove vehicle interface"""
-        self.clear_content()
-        self.content_title.configure(text="Remove Vehicle")
-        
-        if not self.fleet.vehicles:
-            no_vehicles_label = ctk.CTkLabel(
-                self.content_container,
-                text="No vehicles in the fleet!",
-                font=ctk.CTkFont(size=16)
-            )
-            no_vehicles_label.pack(pady=50)
-            return
+        view, built = self.show_view("remove_vehicle", "Remove Vehicle")
+        if built:
+            self.build_remove_vehicle(view)
+        if self.is_stale("remove_vehicle"):
+            self.refresh_remove_vehicle()
+    
+    def build_remove_vehicle(self, view):
+        """Create the remove vehicle widgets"""
+        self.no_vehicles_label = ctk.CTkLabel(
+            view,
+            text="No vehicles in the fleet!",
+            font=self.font(16)
+        )
         
         # Vehicle list
-        list_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
-        list_frame.pack(fill="both", expand=True, padx=20, pady=20)
-        
-        # Create a treeview
-        columns = ("#", "Type", "Brand", "Model", "Price", "Year", "Tax")
-        self.tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=15)
-        
-        # Define headings
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=100)
-        
-        self.tree.column("#", width=50)
-        self.tree.column("Type", width=100)
-        self.tree.column("Brand", width=100)
-        self.tree.column("Model", width=150)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.remove_list_frame = ctk.CTkFrame(view, corner_radius=10)
         
-        self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Populate treeview
-        for i, vehicle in enumerate(self.fleet.vehicles, 1):
-            vehicle_type = vehicle.__class__.__name__
-            values = (
-                i,
-                vehicle_type,
-                vehicle.brand,
-                vehicle.model,
-                f"€{vehicle.price:.2f}",
-                vehicle.year,
-                f"€{vehicle.calculate_tax():.2f}"
-            )
-            self.tree.insert("", "end", values=values)
+        # Create a virtualized treeview over the whole fleet
+        columns = ("ID", "Type", "Brand", "Model", "Price", "Year", "Tax")
+        self.vehicle_table = VehicleTable(
+            self.remove_list_frame, columns, self.format_vehicle_row,
+            sort_fields=VEHICLE_SORT_FIELDS, is_busy=lambda: self.worker.busy
+        )
+        self.vehicle_table.tree.column("ID", width=50)
+        self.vehicle_table.tree.column("Model", width=150)
+        self.vehicle_table.pack()
         
         # Remove button
-        button_frame = ctk.CTkFrame(self.content_container)
-        button_frame.pack(pady=20)
+        self.remove_button_frame = ctk.CTkFrame(view)
         
         remove_button = ctk.CTkButton(
-            button_frame,
-            text="Remove Selected Vehicle",
+            self.remove_button_frame,
+            text="Remove Selected Vehicles",
             command=self.remove_selected_vehicle,
             height=40,
             width=200,
@@ -703,49 +4573,83 @@ class FleetManagementApp(ctk.CTk):
         )
         remove_button.pack(pady=10)
     
+    def refresh_remove_vehicle(self):
+        """Show the current fleet in the remove vehicle list"""
+        self.view_versions["remove_vehicle"] = self.data_version
+        self.no_vehicles_label.pack_forget()
+        self.remove_list_frame.pack_forget()
+        self.remove_button_frame.pack_forget()
+        
+        if not len(self.fleet):
+            self.no_vehicles_label.pack(pady=50)
+            return
+        
+        self.remove_list_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        self.remove_button_frame.pack(pady=20)
+        self.vehicle_table.set_source(self.fleet.query(), total=len(self.fleet))
+    
+    def format_vehicle_row(self, index, vehicle):
+        """Treeview values for the remove vehicle list"""
+        return (
+            vehicle.vehicle_id,
+            vehicle.__class__.__name__,
+            vehicle.brand,
+            vehicle.model,
+            f"€{vehicle.price:.2f}",
+            vehicle.year,
+            f"€{vehicle.calculate_tax():.2f}"
+        )
+    
     def remove_selected_vehicle(self):
-        """Remove the selected vehicle from the treeview"""
-        selection = self.tree.selection()
+        """Remove the selected vehicles from the fleet and the treeview"""
+        if not self.worker_idle():
+            return
+        selection = self.vehicle_table.selected_vehicles()
         if not selection:
             messagebox.showwarning("Warning", "Please select a vehicle to remove!")
             return
         
-        # Get selected item index
-        item = self.tree.item(selection[0])
-        index = int(item['values'][0]) - 1
-        
         # Confirm removal
-        confirm = messagebox.askyesno(
-            "Confirm Removal",
-            f"Are you sure you want to remove vehicle {index + 1}?\n\n{item['values'][2]} {item['values'][3]}"
-        )
+        if len(selection) == 1:
+            vehicle = selection[0]
+            question = (f"Are you sure you want to remove vehicle {vehicle.vehicle_id}?"
+                        f"\n\n{vehicle.brand} {vehicle.model}")
+        else:
+            question = f"Are you sure you want to remove {len(selection)} vehicles?"
+        confirm = messagebox.askyesno("Confirm Removal", question)
         
         if confirm:
-            removed_vehicle = self.fleet.remove_vehicle(index)
-            if removed_vehicle:
-                self.tree.delete(selection[0])
-                self.update_status(f"Removed {removed_vehicle.brand} {removed_vehicle.model}")
-                messagebox.showinfo("Success", "Vehicle removed successfully!")
-                
-                # Update treeview numbering
-                for i, item_id in enumerate(self.tree.get_children(), 1):
-                    values = list(self.tree.item(item_id, 'values'))
-                    values[0] = i
-                    self.tree.item(item_id, values=values)
+            # Vehicles are removed by ID, so the other rows keep their numbers
+            removed = self.fleet.remove_vehicles(vehicle.vehicle_id for vehicle in selection)
+            if removed:
+                if len(self.fleet):
+                    # Refresh in place, keeping the scroll position
+                    self.vehicle_table.total = len(self.fleet)
+                    self.vehicle_table.refresh()
+                    self.data_version += 1
+                    self.view_versions["remove_vehicle"] = self.data_version
+                else:
+                    self.fleet_changed()
+                if len(removed) == 1:
+                    self.update_status(f"Removed {removed[0].brand} {removed[0].model}")
+                else:
+                    self.update_status(f"Removed {len(removed)} vehicles")
+                messagebox.showinfo("Success", f"{len(removed)} vehicle(s) removed successfully!")
     
     def show_discount(self):
         """Show discount application interface"""
-        self.clear_content()
-        self.content_title.configure(text="Apply Global Discount/Tax")
+        view, built = self.show_view("discount", "Apply Global Discount/Tax")
+        if not built:
+            return
         
-        discount_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        discount_frame = ctk.CTkFrame(view, corner_radius=10)
         discount_frame.pack(fill="x", padx=100, pady=50)
         
         # Instructions
         instructions = ctk.CTkLabel(
             discount_frame,
             text="Apply a percentage discount (positive) or tax increase (negative) to all vehicles",
-            font=ctk.CTkFont(size=14),
+            font=self.font(14),
             wraplength=400
         )
         instructions.pack(pady=(30, 20))
@@ -757,7 +4661,7 @@ class FleetManagementApp(ctk.CTk):
         percentage_label = ctk.CTkLabel(
             input_frame,
             text="Percentage:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         percentage_label.pack(side="left", padx=(0, 10))
         
@@ -767,7 +4671,7 @@ class FleetManagementApp(ctk.CTk):
         percent_label = ctk.CTkLabel(
             input_frame,
             text="%",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         percent_label.pack(side="left", padx=(5, 20))
         
@@ -775,7 +4679,7 @@ class FleetManagementApp(ctk.CTk):
         example_label = ctk.CTkLabel(
             discount_frame,
             text="Example: +10% = 10% discount, -5% = 5% tax increase",
-            font=ctk.CTkFont(size=12),
+            font=self.font(12),
             text_color="gray"
         )
         example_label.pack(pady=10)
@@ -814,16 +4718,22 @@ class FleetManagementApp(ctk.CTk):
             )
             
             if confirm:
-                count = self.fleet.apply_global_discount(percentage)
-                messagebox.showinfo("Success", f"Applied to {count} vehicles!")
-                self.update_status(f"Applied {percentage}% to all vehicles")
-                self.show_dashboard()
+                def done(count):
+                    messagebox.showinfo("Success", f"Applied to {count} vehicles!")
+                    self.update_status(f"Applied {percentage}% to all vehicles")
+                    self.fleet_changed()
+                    self.show_dashboard()
+                
+                self.run_task("Applying discount",
+                              lambda task: self.fleet.apply_global_discount(percentage), done)
         
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid percentage!")
     
     def preview_discount(self):
         """Preview discount effects"""
+        if not self.worker_idle():
+            return
         try:
             percentage = float(self.percentage_entry.get())
             
@@ -833,45 +4743,41 @@ class FleetManagementApp(ctk.CTk):
             preview_window = ctk.CTkToplevel(self)
             preview_window.title("Discount Preview")
             preview_window.geometry("600x400")
+            # Modal: no background task can start while it reads the live fleet
+            preview_window.grab_set()
             
-            # Create treeview for preview
-            columns = ("Brand", "Model", "Old Price", "New Price", "Change")
-            tree = ttk.Treeview(preview_window, columns=columns, show="headings", height=15)
-            
-            for col in columns:
-                tree.heading(col, text=col)
-                tree.column(col, width=120)
-            
-            scrollbar = ttk.Scrollbar(preview_window, orient="vertical", command=tree.yview)
-            tree.configure(yscrollcommand=scrollbar.set)
-            
-            tree.pack(side="left", fill="both", expand=True, padx=10, pady=10)
-            scrollbar.pack(side="right", fill="y")
-            
-            # Populate with preview data
-            for vehicle in self.fleet.vehicles:
+            # Create a virtualized treeview for preview
+            def format_row(index, vehicle):
                 new_price = adjust_price(vehicle.price, percentage)
                 change = new_price - vehicle.price
                 change_percent = (change / vehicle.price) * 100 if vehicle.price != 0 else 0
-                
-                values = (
+                return (
                     vehicle.brand,
                     vehicle.model,
                     f"€{vehicle.price:.2f}",
                     f"€{new_price:.2f}",
                     f"{change_percent:+.1f}%"
                 )
-                tree.insert("", "end", values=values)
             
-            # Summary
-            total_old = sum(v.price for v in self.fleet.vehicles)
-            total_new = sum(adjust_price(v.price, percentage) for v in self.fleet.vehicles)
-            total_change = total_new - total_old
+            columns = ("Brand", "Model", "Old Price", "New Price", "Change")
+            table = VehicleTable(preview_window, columns, format_row, sort_fields={
+                "Brand": "brand", "Model": "model", "Old Price": "price", "New Price": "price"
+            }, is_busy=lambda: self.worker.busy)
+            for col in columns:
+                table.tree.column(col, width=120)
+            table.pack(padx=10, pady=10)
+            
+            # Summary, from the fleet totals
+            preview = self.fleet.preview_discount(percentage)
+            table.set_source(self.fleet.query(), total=preview['total'])
+            total_old = preview['total_value']
+            total_change = preview['new_total_value'] - total_old
+            change_percent = (total_change / total_old) * 100 if total_old != 0 else 0
             
             summary_label = ctk.CTkLabel(
                 preview_window,
-                text=f"Total change: €{total_change:+.2f} ({total_new - total_old:+.1f}%)",
-                font=ctk.CTkFont(size=14, weight="bold")
+                text=f"Total change: €{total_change:+.2f} ({change_percent:+.1f}%)",
+                font=self.font(14, "bold")
             )
             summary_label.pack(pady=10)
         
@@ -880,34 +4786,39 @@ class FleetManagementApp(ctk.CTk):
     
     def show_filter(self):
         """Show vehicle filtering interface"""
-        self.clear_content()
-        self.content_title.configure(text="Filter Vehicles")
+        view, built = self.show_view("filter", "Filter Vehicles")
+        if not built:
+            # Results are only recomputed when the fleet changed
+            if self.is_stale("filter"):
+                self.apply_filter()
+            return
         
-        filter_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        filter_frame = ctk.CTkFrame(view, corner_radius=10)
         filter_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
         # Filter options
         options_frame = ctk.CTkFrame(filter_frame)
         options_frame.pack(fill="x", pady=20, padx=20)
         
-        # Filter by brand
+        # Search brand/model as you type
         brand_frame = ctk.CTkFrame(options_frame)
         brand_frame.pack(fill="x", pady=10)
         
         brand_label = ctk.CTkLabel(
             brand_frame,
-            text="Filter by Brand:",
-            font=ctk.CTkFont(size=14)
+            text="Search Brand/Model:",
+            font=self.font(14)
         )
         brand_label.pack(side="left", padx=(0, 10))
         
-        self.brand_filter_entry = ctk.CTkEntry(brand_frame, width=150)
-        self.brand_filter_entry.pack(side="left")
+        self.search_entry = ctk.CTkEntry(brand_frame, width=150, placeholder_text="e.g. toy cor")
+        self.search_entry.pack(side="left")
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
         
         brand_button = ctk.CTkButton(
             brand_frame,
             text="Filter",
-            command=lambda: self.apply_filter("brand"),
+            command=self.apply_filter,
             width=80
         )
         brand_button.pack(side="left", padx=10)
@@ -919,7 +4830,7 @@ class FleetManagementApp(ctk.CTk):
         year_label = ctk.CTkLabel(
             year_frame,
             text="Filter by Year (min):",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         year_label.pack(side="left", padx=(0, 10))
         
@@ -929,7 +4840,7 @@ class FleetManagementApp(ctk.CTk):
         year_button = ctk.CTkButton(
             year_frame,
             text="Filter",
-            command=lambda: self.apply_filter("year"),
+            command=self.apply_filter,
             width=80
         )
         year_button.pack(side="left", padx=10)
@@ -941,7 +4852,7 @@ class FleetManagementApp(ctk.CTk):
         type_label = ctk.CTkLabel(
             type_frame,
             text="Filter by Type:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         type_label.pack(side="left", padx=(0, 10))
         
@@ -958,7 +4869,7 @@ class FleetManagementApp(ctk.CTk):
         type_button = ctk.CTkButton(
             type_frame,
             text="Filter",
-            command=lambda: self.apply_filter("type"),
+            command=self.apply_filter,
             width=80
         )
         type_button.pack(side="left", padx=10)
@@ -968,92 +4879,104 @@ class FleetManagementApp(ctk.CTk):
         self.results_frame.pack(fill="both", expand=True, pady=20, padx=20)
         
         # Show all vehicles initially
-        self.display_filtered_vehicles(self.fleet.vehicles)
-    
-    def apply_filter(self, filter_type):
-        """Apply filter and display results"""
-        if filter_type == "brand":
-            brand = self.brand_filter_entry.get()
-            if brand:
-                filtered = self.fleet.filter_by_brand(brand)
-            else:
-                filtered = self.fleet.vehicles
-        elif filter_type == "year":
-            try:
-                min_year = int(self.year_filter_entry.get())
-                filtered = self.fleet.filter_by_year(min_year)
-            except ValueError:
-                filtered = self.fleet.vehicles
-        elif filter_type == "type":
-            vehicle_type = self.type_filter_var.get()
-            if vehicle_type == "All":
-                filtered = self.fleet.vehicles
-            else:
-                filtered = self.fleet.filter_by_type(vehicle_type)
-        else:
-            filtered = self.fleet.vehicles
+        self.apply_filter()
+    
+    def schedule_search(self, event=None):
+        """Re-run the filter once the user pauses typing (one search per pause, not per key)"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DEBOUNCE_MS, self.run_search)
+    
+    def run_search(self):
+        self.search_job = None
+        if self.worker.busy:
+            # Try again when the current background count is done
+            self.search_job = self.after(self.SEARCH_DEBOUNCE_MS, self.run_search)
+            return
+        self.apply_filter()
+    
+    def apply_filter(self):
+        """Apply every filled-in filter at once and display the results
         
-        self.display_filtered_vehicles(filtered)
+        When the fleet's indexes answer the query exactly (e.g. a search
+        alone) the results are shown right away; otherwise the matches are
+        counted in the background first.
+        """
+        if not self.worker_idle():
+            return
+        query = self.fleet.query().search(self.search_entry.get())
+        try:
+            query.year(min_year=int(self.year_filter_entry.get()))
+        except ValueError:
+            pass
+        vehicle_type = self.type_filter_var.get()
+        if vehicle_type != "All":
+            query.types(vehicle_type)
+        
+        def count_matches(task):
+            count = 0
+            for count, _ in enumerate(query, 1):
+                if not count % 10_000:
+                    task.progress(count)
+            return count
+        
+        self.view_versions["filter"] = self.data_version
+        count = query.exact_count()
+        if count is not None:
+            self.display_filtered_vehicles(query, count)
+            return
+        self.run_task("Filtering", count_matches, lambda count: self.display_filtered_vehicles(query, count))
     
-    def display_filtered_vehicles(self, vehicles):
-        """Display filtered vehicles in results frame"""
+    def display_filtered_vehicles(self, query, count):
+        """Display the `count` vehicles of a FleetQuery in results frame"""
         # Clear results frame
         for widget in self.results_frame.winfo_children():
             widget.destroy()
         
-        if not vehicles:
+        if not count:
             no_results_label = ctk.CTkLabel(
                 self.results_frame,
                 text="No vehicles found matching the criteria",
-                font=ctk.CTkFont(size=14)
+                font=self.font(14)
             )
             no_results_label.pack(pady=50)
             return
         
-        # Create treeview for results
-        columns = ("Brand", "Model", "Type", "Price", "Year", "Tax")
-        tree = ttk.Treeview(self.results_frame, columns=columns, show="headings", height=10)
-        
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
-        
-        tree.column("Brand", width=120)
-        tree.column("Model", width=150)
-        
-        scrollbar = ttk.Scrollbar(self.results_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        
-        tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Populate treeview
-        for vehicle in vehicles:
-            vehicle_type = vehicle.__class__.__name__
-            values = (
-                vehicle.brand,
-                vehicle.model,
-                vehicle_type,
-                f"€{vehicle.price:.2f}",
-                vehicle.year,
-                f"€{vehicle.calculate_tax():.2f}"
-            )
-            tree.insert("", "end", values=values)
-        
         # Count label
         count_label = ctk.CTkLabel(
             self.results_frame,
-            text=f"Found {len(vehicles)} vehicle(s)",
-            font=ctk.CTkFont(size=12)
+            text=f"Found {count} vehicle(s)",
+            font=self.font(12)
+        )
+        count_label.pack(side="bottom", pady=10)
+        
+        # Create a virtualized treeview for results
+        columns = ("Brand", "Model", "Type", "Price", "Year", "Tax")
+        table = VehicleTable(self.results_frame, columns, self.format_filtered_row,
+                             height=10, sort_fields=VEHICLE_SORT_FIELDS, is_busy=lambda: self.worker.busy)
+        table.tree.column("Brand", width=120)
+        table.tree.column("Model", width=150)
+        table.pack()
+        table.set_source(query, total=count)
+    
+    def format_filtered_row(self, index, vehicle):
+        """Treeview values for the filter results"""
+        return (
+            vehicle.brand,
+            vehicle.model,
+            vehicle.__class__.__name__,
+            f"€{vehicle.price:.2f}",
+            vehicle.year,
+            f"€{vehicle.calculate_tax():.2f}"
         )
-        count_label.pack(pady=10)
     
     def show_export(self):
         """Show export interface"""
-        self.clear_content()
-        self.content_title.configure(text="Export Inventory")
+        view, built = self.show_view("export", "Export Inventory")
+        if not built:
+            return
         
-        export_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        export_frame = ctk.CTkFrame(view, corner_radius=10)
         export_frame.pack(fill="both", expand=True, padx=50, pady=50)
         
         # Export options
@@ -1064,7 +4987,7 @@ class FleetManagementApp(ctk.CTk):
         format_label = ctk.CTkLabel(
             options_frame,
             text="Export Format:",
-            font=ctk.CTkFont(size=16)
+            font=self.font(16)
         )
         format_label.pack(pady=(0, 20))
         
@@ -1073,7 +4996,8 @@ class FleetManagementApp(ctk.CTk):
         formats = [
             ("CSV (Excel compatible)", "csv"),
             ("Text (Human readable)", "txt"),
-            ("JSON (Structured data)", "json")
+            ("JSON (Structured data)", "json"),
+            ("All three (one pass)", "all")
         ]
         
         for text, value in formats:
@@ -1082,7 +5006,7 @@ class FleetManagementApp(ctk.CTk):
                 text=text,
                 variable=self.format_var,
                 value=value,
-                font=ctk.CTkFont(size=14)
+                font=self.font(14)
             )
             radio.pack(pady=5)
         
@@ -1093,7 +5017,7 @@ class FleetManagementApp(ctk.CTk):
         file_label = ctk.CTkLabel(
             file_frame,
             text="File Name:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         file_label.pack(side="left", padx=(0, 10))
         
@@ -1101,6 +5025,16 @@ class FleetManagementApp(ctk.CTk):
         self.filename_entry.pack(side="left")
         self.filename_entry.insert(0, f"fleet_export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
         
+        # Compression
+        self.compress_var = ctk.BooleanVar(value=False)
+        compress_check = ctk.CTkCheckBox(
+            export_frame,
+            text="Compress (gzip)",
+            variable=self.compress_var,
+            font=self.font(14)
+        )
+        compress_check.pack(pady=10)
+        
         # Buttons
         button_frame = ctk.CTkFrame(export_frame)
         button_frame.pack(pady=30)
@@ -1123,27 +5057,80 @@ class FleetManagementApp(ctk.CTk):
             fg_color="gray"
         )
         preview_button.pack(pady=10)
+        
+        import_button = ctk.CTkButton(
+            button_frame,
+            text="Import Inventory",
+            command=self.import_inventory_submit,
+            height=40,
+            width=200,
+            fg_color="gray"
+        )
+        import_button.pack(pady=10)
     
     def export_inventory_submit(self):
         """Handle export submission"""
-        filename = self.filename_entry.get()
+        name = self.filename_entry.get()
         format_type = self.format_var.get()
+        format_types = ['csv', 'txt', 'json'] if format_type == "all" else [format_type]
+        
+        targets = {}
+        for format_type in format_types:
+            # Add extension if not present
+            filename = name
+            extension = f'.{format_type}.gz' if self.compress_var.get() else f'.{format_type}'
+            if filename.endswith(f'.{format_type}') and extension.endswith('.gz'):
+                filename += '.gz'
+            elif not filename.endswith(extension):
+                filename += extension
+            targets[filename] = format_type
+        
+        def export(task):
+            try:
+                # Several formats are written in a single pass over the fleet
+                return self.fleet.export_inventories(targets, progress=task.progress)
+            except OperationCancelled:
+                for filename in targets:
+                    os.remove(filename)  # don't leave a truncated export behind
+                raise
+        
+        def done(result):
+            success, message = result
+            if success:
+                messagebox.showinfo("Success", message)
+                self.update_status(f"Exported to {', '.join(targets)}")
+            else:
+                self.update_status("Export failed")
+                messagebox.showerror("Error", message)
         
-        # Add extension if not present
-        if not filename.endswith(f'.{format_type}'):
-            filename += f'.{format_type}'
+        self.run_task("Exporting", export, done)
+    
+    def import_inventory_submit(self):
+        """Handle import of a csv/json inventory file"""
+        filename = filedialog.askopenfilename(
+            title="Import Inventory",
+            filetypes=[("Inventory files", "*.csv *.json *.csv.gz *.json.gz"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
         
-        success, message = self.fleet.export_inventory(filename, format_type)
+        def done(result):
+            success, message = result
+            if success:
+                messagebox.showinfo("Success", message)
+                self.update_status(f"Imported {filename}")
+                self.fleet_changed()
+            else:
+                self.update_status("Import failed")
+                messagebox.showerror("Error", message)
         
-        if success:
-            messagebox.showinfo("Success", message)
-            self.update_status(f"Exported to {filename}")
-        else:
-            messagebox.showerror("Error", message)
+        self.run_task("Importing", lambda task: self.fleet.import_inventory(filename, progress=task.progress), done)
     
     def preview_export(self):
         """Preview export data"""
-        if not self.fleet.vehicles:
+        if not self.worker_idle():
+            return
+        if not len(self.fleet):
             messagebox.showinfo("Info", "No vehicles to preview!")
             return
         
@@ -1152,14 +5139,15 @@ class FleetManagementApp(ctk.CTk):
         preview_window.geometry("800x500")
         
         # Create text widget for preview
-        text_widget = ctk.CTkTextbox(preview_window, font=ctk.CTkFont(family="Courier", size=12))
+        text_widget = ctk.CTkTextbox(preview_window, font=self.font(12, family="Courier"))
         text_widget.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Generate preview text
         preview_text = "EXPORT PREVIEW\n"
         preview_text += "=" * 50 + "\n\n"
         
-        for i, vehicle in enumerate(self.fleet.vehicles[:10], 1):  # Show first 10
+        # Show the first 10 (read_vehicles() leaves a snapshot-backed fleet unmaterialized)
+        for i, vehicle in enumerate(islice(self.fleet.read_vehicles(), 10), 1):
             preview_text += f"Vehicle {i}:\n"
             preview_text += f"  Type: {vehicle.__class__.__name__}\n"
             preview_text += f"  Brand: {vehicle.brand}\n"
@@ -1177,8 +5165,8 @@ class FleetManagementApp(ctk.CTk):
             
             preview_text += "\n"
         
-        if len(self.fleet.vehicles) > 10:
-            preview_text += f"... and {len(self.fleet.vehicles) - 10} more vehicles\n\n"
+        if len(self.fleet) > 10:
+            preview_text += f"... and {len(self.fleet) - 10} more vehicles\n\n"
         
         # Summary
         summary = self.fleet.get_summary()
@@ -1197,10 +5185,12 @@ class FleetManagementApp(ctk.CTk):
     
     def show_settings(self):
         """Show settings interface"""
-        self.clear_content()
-        self.content_title.configure(text="Settings")
+        view, built = self.show_view("settings", "Settings")
+        if not built:
+            self.settings_info.configure(text=self.settings_info_text())
+            return
         
-        settings_frame = ctk.CTkFrame(self.content_container, corner_radius=10)
+        settings_frame = ctk.CTkFrame(view, corner_radius=10)
         settings_frame.pack(fill="both", expand=True, padx=50, pady=50)
         
         # Appearance settings
@@ -1210,7 +5200,7 @@ class FleetManagementApp(ctk.CTk):
         appearance_label = ctk.CTkLabel(
             appearance_frame,
             text="Appearance",
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=self.font(16, "bold")
         )
         appearance_label.pack(pady=(0, 10))
         
@@ -1218,7 +5208,7 @@ class FleetManagementApp(ctk.CTk):
         theme_label = ctk.CTkLabel(
             appearance_frame,
             text="Theme:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         theme_label.pack(pady=5)
         
@@ -1238,7 +5228,7 @@ class FleetManagementApp(ctk.CTk):
         color_label = ctk.CTkLabel(
             appearance_frame,
             text="Color Theme:",
-            font=ctk.CTkFont(size=14)
+            font=self.font(14)
         )
         color_label.pack(pady=5)
         
@@ -1261,30 +5251,17 @@ class FleetManagementApp(ctk.CTk):
         info_label = ctk.CTkLabel(
             info_frame,
             text="System Information",
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=self.font(16, "bold")
         )
         info_label.pack(pady=(0, 10))
         
-        info_text = f"""
-        Fleet Management System v1.0.0
-        Total vehicles in system: {len(self.fleet.vehicles)}
-        Last update: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        Features:
-        • Vehicle management (add/remove)
-        • Tax calculation (VAT 23%)
-        • Discount application
-        • Filtering and search
-        • Export to multiple formats
-        """
-        
-        info_display = ctk.CTkLabel(
+        self.settings_info = ctk.CTkLabel(
             info_frame,
-            text=info_text,
-            font=ctk.CTkFont(size=12),
+            text=self.settings_info_text(),
+            font=self.font(12),
             justify="left"
         )
-        info_display.pack(pady=10)
+        self.settings_info.pack(pady=10)
         
         # Reset button
         reset_button = ctk.CTkButton(
@@ -1296,6 +5273,20 @@ class FleetManagementApp(ctk.CTk):
         )
         reset_button.pack(pady=20)
     
+    def settings_info_text(self):
+        return f"""
+        Fleet Management System v1.0.0
+        Total vehicles in system: {len(self.fleet)}
+        Last update: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        
+        Features:
+        • Vehicle management (add/remove)
+        • Tax calculation (VAT 23%)
+        • Discount application
+        • Filtering and search
+        • Export to multiple formats
+        """
+    
     def change_theme(self, theme):
         """Change application theme"""
         ctk.set_appearance_mode(theme)
@@ -1305,10 +5296,7 @@ class FleetManagementApp(ctk.CTk):
         ctk.set_default_color_theme(theme)
     
     def load_sample_data(self):
-        """Load sample data for demonstration"""
-        # Clear existing data
-        self.fleet.vehicles.clear()
-        
+        """Load sample data for demonstration (replaces the current fleet)"""
         # Add sample vehicles
         sample_vehicles = [
             Vehicle("Toyota", "Corolla", 25000, 2022),
@@ -1323,11 +5311,16 @@ class FleetManagementApp(ctk.CTk):
             Truck("MAN", "TGX", 78000, 2019, 16, 11.8)
         ]
         
-        for vehicle in sample_vehicles:
-            self.fleet.add_vehicle(vehicle)
+        def load(task):
+            self.fleet.clear()
+            return self.fleet.add_vehicles(sample_vehicles)
+        
+        def done(count):
+            self.update_status("Loaded sample data")
+            self.fleet_changed()
+            messagebox.showinfo("Sample Data", f"{count} sample vehicles loaded successfully!")
         
-        self.update_status("Loaded sample data")
-        messagebox.showinfo("Sample Data", "10 sample vehicles loaded successfully!")
+        self.run_task("Loading sample data", load, done)
 
 
 # ============================================
@@ -1378,8 +5371,20 @@ def main():
     # Run preparation exercises
     preparation_exercises()
     
-    # Create and run the application
-    app = FleetManagementApp()
+    # Log fleet operations to the console without slowing them down
+    METRICS.sink = BufferedLogSink()
+    
+    # Create and run the application; `python teste.py fleet.db` keeps the
+    # fleet in a SQLite database, `python teste.py fleet` in memory with a
+    # journal (fleet.journal) and checkpoints (fleet.snapshot)
+    fleet = None
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        if path.endswith('.db'):
+            fleet = SQLiteFleet(path)
+        else:
+            fleet = FleetJournal(path + '.journal', path + '.snapshot').recover()
+    app = FleetManagementApp(fleet)
     app.mainloop()
 
 